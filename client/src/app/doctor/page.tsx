@@ -9,6 +9,32 @@ import { motion } from 'framer-motion';
 import { triageRepository } from '@/repositories';
 import { TriageRecord, SOAPNote } from '@/types';
 
+// Only reviewable records. Priority: highest risk first, then UNSEEN first, then newest first
+function prioritize(records: TriageRecord[]): TriageRecord[] {
+    const filtered = records.filter(item => item.status === 'ready_for_review' || item.status === 'finalized' || item.status === 'exported');
+
+    return filtered.sort((a, b) => {
+        // Secondary score for risk tiers
+        const tierScore = (t: string) => {
+            if (t === 'EMERGENCY') return 4;
+            if (t === 'URGENT') return 3;
+            if (t === 'SEMI_URGENT') return 2;
+            return 1;
+        };
+
+        const scoreA = tierScore(a.triage_tier);
+        const scoreB = tierScore(b.triage_tier);
+
+        if (scoreA !== scoreB) return scoreB - scoreA;
+
+        // If same priority, unseen comes first
+        if (a.is_seen !== b.is_seen) return a.is_seen ? 1 : -1;
+
+        // If same status, newest first
+        return new Date(b.created_at).getTime() - new Date(a.created_at).getTime();
+    });
+}
+
 export default function DoctorPage() {
     const { user, token, logout, isLoading } = useAuth();
     const router = useRouter();
@@ -26,13 +52,27 @@ export default function DoctorPage() {
     }, [user, isLoading, router]);
 
     useEffect(() => {
-        if (user) {
-            fetchQueue();
-            const interval = setInterval(fetchQueue, 10000); // 10s — faster for demo
-            return () => clearInterval(interval);
-        }
+        if (!user) return;
+        fetchQueue();
+        // Live updates over SSE instead of polling; refetch on every (re)connect
+        return triageRepository.subscribeToEvents({
+            onRecord: (_event, record) => setQueue(prev => prioritize([...prev.filter(p => p.id !== record.id), record])),
+            onConnected: fetchQueue,
+        }, { specialty: filterSpecialty === 'All' ? undefined : filterSpecialty });
     }, [user, filterSpecialty]);
 
+    // Sync selected patient if it was updated in the background
+    useEffect(() => {
+        if (!selectedPatient) return;
+        const updated = queue.find(p => p.id === selectedPatient.id);
+        if (updated && JSON.stringify(updated.soap_note) !== JSON.stringify(selectedPatient.soap_note)) {
+            setSelectedPatient(updated);
+            if (!editedSoap || (editedSoap.subjective === '' && updated.soap_note)) {
+                setEditedSoap(updated.soap_note ? { ...updated.soap_note } : { subjective: '', objective: '', assessment: '', plan: '' });
+            }
+        }
+    }, [queue]);
+
     if (isLoading || !user || user.role !== 'doctor') {
         return null;
     }
@@ -41,42 +81,7 @@ export default function DoctorPage() {
         if (!user) return;
         try {
             const records = await triageRepository.getQueue(filterSpecialty === 'All' ? undefined : filterSpecialty);
-            const filtered = records.filter(item => item.status === 'ready_for_review' || item.status === 'finalized' || item.status === 'exported');
-
-            // Priority: Highest risk first, then UNSEEN first, then newest first
-            const sorted = filtered.sort((a, b) => {
-                // Secondary score for risk tiers
-                const tierScore = (t: string) => {
-                    if (t === 'EMERGENCY') return 4;
-                    if (t === 'URGENT') return 3;
-                    if (t === 'SEMI_URGENT') return 2;
-                    return 1;
-                };
-
-                const scoreA = tierScore(a.triage_tier);
-                const scoreB = tierScore(b.triage_tier);
-
-                if (scoreA !== scoreB) return scoreB - scoreA;
-
-                // If same priority, unseen comes first
-                if (a.is_seen !== b.is_seen) return a.is_seen ? 1 : -1;
-
-                // If same status, newest first
-                return new Date(b.created_at).getTime() - new Date(a.created_at).getTime();
-            });
-
-            setQueue(sorted);
-
-            // Sync selected patient if it was updated in the background
-            if (selectedPatient) {
-                const updated = sorted.find(p => p.id === selectedPatient.id);
-                if (updated && JSON.stringify(updated.soap_note) !== JSON.stringify(selectedPatient.soap_note)) {
-                    setSelectedPatient(updated);
-                    if (!editedSoap || (editedSoap.subjective === '' && updated.soap_note)) {
-                        setEditedSoap(updated.soap_note ? { ...updated.soap_note } : { subjective: '', objective: '', assessment: '', plan: '' });
-                    }
-                }
-            }
+            setQueue(prioritize(records));
         } catch (e) {
             console.error(e);
         }
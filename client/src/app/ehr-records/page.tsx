@@ -1,6 +1,7 @@
 "use client"
 import React, { useState, useEffect } from 'react';
 import { ehrRepository, EHRRecord } from '@/repositories/ehr-repository';
+import { triageRepository } from '@/repositories';
 import { motion, AnimatePresence } from 'framer-motion';
 import {
     FileText,
@@ -21,20 +22,26 @@ export default function EHRDashboard() {
     const [records, setRecords] = useState<EHRRecord[]>([]);
     const [selectedRecord, setSelectedRecord] = useState<EHRRecord | null>(null);
     const [isLoading, setIsLoading] = useState(true);
+    const [nextCursor, setNextCursor] = useState<string | null>(null);
+    const [isLoadingMore, setIsLoadingMore] = useState(false);
 
     useEffect(() => {
         fetchRecords();
-        const interval = setInterval(fetchRecords, 5000);
-        return () => clearInterval(interval);
+        // Refetch when a triage is exported instead of polling every 5s
+        return triageRepository.subscribeToEvents({
+            onRecord: (event) => { if (event === 'exported') fetchRecords(); },
+            onConnected: fetchRecords,
+        });
     }, []);
 
     const fetchRecords = async () => {
         setIsLoading(true);
         try {
-            const data = await ehrRepository.getRecords();
-            setRecords(data);
-            if (data.length > 0 && !selectedRecord) {
-                setSelectedRecord(data[0]);
+            const page = await ehrRepository.getRecords();
+            setRecords(page.items);
+            setNextCursor(page.next_cursor);
+            if (page.items.length > 0 && !selectedRecord) {
+                setSelectedRecord(page.items[0]);
             }
         } catch (e) {
             console.error("Error fetching EHR records:", e);
@@ -43,6 +50,20 @@ export default function EHRDashboard() {
         }
     };
 
+    const loadOlderRecords = async () => {
+        if (!nextCursor) return;
+        setIsLoadingMore(true);
+        try {
+            const page = await ehrRepository.getRecords(nextCursor);
+            setRecords(prev => [...prev, ...page.items]);
+            setNextCursor(page.next_cursor);
+        } catch (e) {
+            console.error("Error fetching older EHR records:", e);
+        } finally {
+            setIsLoadingMore(false);
+        }
+    };
+
     return (
         <div className="min-h-screen bg-[#F8FAFC]">
             {/* Header */}
@@ -117,6 +138,15 @@ export default function EHRDashboard() {
                                     </button>
                                 ))
                             )}
+                            {!isLoading && nextCursor && (
+                                <button
+                                    onClick={loadOlderRecords}
+                                    disabled={isLoadingMore}
+                                    className="w-full p-3 rounded-xl border border-slate-200 bg-white text-xs font-bold text-slate-500 hover:border-teal-200 hover:text-teal-600 transition-all disabled:opacity-50"
+                                >
+                                    {isLoadingMore ? 'Loading...' : 'Load older exports'}
+                                </button>
+                            )}
                         </div>
                     </div>
                 </div>
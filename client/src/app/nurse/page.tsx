@@ -48,10 +48,34 @@ export default function NurseIntakePage() {
         }
     }, [user, isLoading, router]);
 
+    // Follow the submitted triage: MedGemma-refined precautions, the vitals fallback zone and the final zone
+    useEffect(() => {
+        if (!triageId) return;
+        const applyRecord = (event: string, record: TriageRecord) => {
+            if (event === 'precautions' || event === 'updated') {
+                setPrecautions(record.preliminary_precautions || []);
+            }
+            if (event === 'preliminary_zone' && record.preliminary_zone) {
+                setPreliminaryZone(record.preliminary_zone);
+            }
+            if (record.status === 'ready_for_review' && record.triage_tier) {
+                setFinalZone(record.triage_tier);
+            }
+        };
+        return triageRepository.subscribeToEvents({
+            onRecord: applyRecord,
+            // Catch up on anything written before the stream opened
+            onConnected: () => triageRepository.getTriage(triageId).then(record => applyRecord('updated', record)).catch(console.error),
+        }, { triageIds: [triageId] });
+    }, [triageId]);
+
     if (isLoading || !user || user.role !== 'nurse') {
         return null;
     }
 
+    // ABNORMAL from the vitals check; EMERGENCY / URGENT once the vitals fallback zone arrives
+    const isAbnormal = preliminaryZone === 'ABNORMAL' || preliminaryZone === 'EMERGENCY' || preliminaryZone === 'URGENT';
+
     const handleVitalsChange = (e: React.ChangeEvent<HTMLInputElement>) => {
         setVitals({
             ...vitals,
@@ -376,7 +400,7 @@ export default function NurseIntakePage() {
                                         exit={{ opacity: 0, y: 10 }}
                                         className="mt-8 w-full"
                                     >
-                                        <div className={`p-6 rounded-2xl border-2 flex flex-col items-center gap-4 transition-all duration-500 ${uploadStatus === 'processed' ? (preliminaryZone === 'ABNORMAL' ? 'bg-red-50 border-red-200' : 'bg-green-50 border-green-200') : 'bg-slate-50 border-slate-200 border-dashed'}`}>
+                                        <div className={`p-6 rounded-2xl border-2 flex flex-col items-center gap-4 transition-all duration-500 ${uploadStatus === 'processed' ? (isAbnormal ? 'bg-red-50 border-red-200' : 'bg-green-50 border-green-200') : 'bg-slate-50 border-slate-200 border-dashed'}`}>
                                             <div className="flex items-center gap-3 self-start">
                                                 <div className={`w-8 h-8 rounded-lg flex items-center justify-center text-white ${uploadStatus === 'uploading' ? 'bg-slate-400' :
                                                     finalZone === 'EMERGENCY' ? 'bg-red-500' :
@@ -415,14 +439,14 @@ export default function NurseIntakePage() {
                                                 </div>
                                             ) : uploadStatus === 'processed' ? (
                                                 <div className="flex flex-col items-center w-full py-4 text-center">
-                                                    <div className={`mb-4 w-20 h-20 rounded-3xl flex items-center justify-center shadow-lg transition-transform hover:scale-105 duration-300 ${preliminaryZone === 'ABNORMAL' ? 'bg-red-500 text-white' : 'bg-green-500 text-white'}`}>
-                                                        {preliminaryZone === 'ABNORMAL' ? <AlertTriangle size={48} /> : <Shield size={48} />}
+                                                    <div className={`mb-4 w-20 h-20 rounded-3xl flex items-center justify-center shadow-lg transition-transform hover:scale-105 duration-300 ${isAbnormal ? 'bg-red-500 text-white' : 'bg-green-500 text-white'}`}>
+                                                        {isAbnormal ? <AlertTriangle size={48} /> : <Shield size={48} />}
                                                     </div>
-                                                    <h2 className={`text-2xl font-black uppercase tracking-tighter ${preliminaryZone === 'ABNORMAL' ? 'text-red-600' : 'text-green-600'}`}>
+                                                    <h2 className={`text-2xl font-black uppercase tracking-tighter ${isAbnormal ? 'text-red-600' : 'text-green-600'}`}>
                                                         {preliminaryZone} VITALS
                                                     </h2>
 
-                                                    {preliminaryZone === 'ABNORMAL' && precautions.length > 0 && (
+                                                    {isAbnormal && precautions.length > 0 && (
                                                         <div className="mt-4 w-full text-left bg-white p-4 rounded-xl border border-red-100 shadow-inner">
                                                             <p className="text-[10px] font-bold text-red-500 uppercase tracking-widest mb-2 flex items-center gap-1">
                                                                 <Shield size={10} /> MedGemma First Aid Actions
@@ -6,9 +6,18 @@ export interface EHRRecord {
     fhir_bundle: any;
 }
 
+export interface EHRRecordPage {
+    items: EHRRecord[];
+    next_cursor: string | null;
+}
+
 export const ehrRepository = {
-    getRecords: async (): Promise<EHRRecord[]> => {
-        const response = await apiClient.get<EHRRecord[]>('/ehr/records');
-        return response.data;
+    // One page of exports, newest first, with full bundles. Pass next_cursor back for older ones.
+    getRecords: async (cursor?: string): Promise<EHRRecordPage> => {
+        const response = await apiClient.get<EHRRecordPage>('/ehr/exports', {
+            params: { include_bundles: true, cursor }
+        });
+        // A bundle that could not be fetched from S3 comes back as null
+        return { ...response.data, items: response.data.items.filter(item => item.fhir_bundle) };
     }
 };
@@ -1,6 +1,23 @@
-import { apiClient } from '../api/api-client';
+import { apiClient, API_BASE_URL } from '../api/api-client';
 import { TriageRecord, SOAPNote, VitalSigns } from '../types';
 
+// Event names sent by GET /triage/events (server/services/triage_events.py)
+const TRIAGE_EVENT_TYPES = [
+    'created', 'status', 'preliminary_zone', 'transcript', 'soap_ready', 'soap_updated',
+    'vitals', 'precautions', 'seen', 'finalized', 'exported', 'updated',
+];
+
+export interface TriageEventFilter {
+    specialty?: string;
+    triageIds?: string[];
+}
+
+export interface TriageEventHandlers {
+    onRecord: (event: string, record: TriageRecord) => void;
+    // Called on every (re)connect: refetch whatever the stream may not have replayed
+    onConnected?: () => void;
+}
+
 export const triageRepository = {
     createTriage: async (formData: FormData, idempotencyKey?: string): Promise<TriageRecord> => {
         const response = await apiClient.post<TriageRecord>('/triage/', formData, {
@@ -66,6 +83,34 @@ export const triageRepository = {
     markAsSeen: async (id: string): Promise<TriageRecord> => {
         const response = await apiClient.post<TriageRecord>(`/triage/${id}/seen`);
         return response.data;
+    },
+
+    // Server-Sent Events instead of polling. EventSource reconnects by itself and sends
+    // Last-Event-ID, so missed events are replayed. Returns a function that closes the stream.
+    subscribeToEvents: (handlers: TriageEventHandlers, filter: TriageEventFilter = {}): (() => void) => {
+        const params = new URLSearchParams();
+        if (filter.specialty) params.set('specialty', filter.specialty);
+        if (filter.triageIds?.length) params.set('triage_id', filter.triageIds.join(','));
+        const query = params.toString() ? `?${params}` : '';
+        let source: EventSource | null = null;
+
+        const connect = () => {
+            source = new EventSource(`${API_BASE_URL}/triage/events${query}`);
+            source.onopen = () => handlers.onConnected?.();
+            const onEvent = (e: MessageEvent) => {
+                const data = JSON.parse(e.data);
+                handlers.onRecord(data.event, data.record as TriageRecord);
+            };
+            TRIAGE_EVENT_TYPES.forEach(type => source!.addEventListener(type, onEvent as EventListener));
+            // The server dropped us for falling behind: start a fresh stream (no replay) and refetch
+            source.addEventListener('resync', () => {
+                source?.close();
+                connect();
+            });
+        };
+
+        connect();
+        return () => source?.close();
     }
 };
 
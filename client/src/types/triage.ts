@@ -30,6 +30,7 @@ export interface TriageRecord {
     preliminary_zone?: 'EMERGENCY' | 'URGENT' | 'SEMI_URGENT' | 'ROUTINE' | 'STABLE' | 'ABNORMAL' | null; // vitals-only fast estimate
     vitals_status?: 'STABLE' | 'ABNORMAL';
     preliminary_precautions?: string[];
+    precautions_source?: 'rules' | 'ai';
     specialty: string;
     patient_age?: number | null;
     status: 'pending' | 'in_progress' | 'ready_for_review' | 'finalized' | 'exported' | 'failed';
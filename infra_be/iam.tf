@@ -111,11 +111,36 @@ resource "aws_iam_role_policy" "ecs_task_dynamodb" {
         data.terraform_remote_state.storage.outputs.triage_table_arn,
         "${data.terraform_remote_state.storage.outputs.triage_table_arn}/index/*",
         data.terraform_remote_state.storage.outputs.patients_table_arn,
+        data.terraform_remote_state.storage.outputs.ehr_exports_table_arn,
+        "${data.terraform_remote_state.storage.outputs.ehr_exports_table_arn}/index/*",
+        data.terraform_remote_state.storage.outputs.triage_events_table_arn,
       ]
     }]
   })
 }
 
+# SQS: API produces, workers consume the triage-jobs queue
+resource "aws_iam_role_policy" "ecs_task_sqs" {
+  name = "sqs-triage-jobs"
+  role = aws_iam_role.ecs_task.id
+
+  policy = jsonencode({
+    Version = "2012-10-17"
+    Statement = [{
+      Sid    = "TriageJobsQueue"
+      Effect = "Allow"
+      Action = [
+        "sqs:SendMessage",
+        "sqs:ReceiveMessage",
+        "sqs:DeleteMessage",
+        "sqs:ChangeMessageVisibility",
+        "sqs:GetQueueAttributes"
+      ]
+      Resource = [data.terraform_remote_state.sqs.outputs.queue_arn]
+    }]
+  })
+}
+
 # SageMaker: invoke MedGemma endpoint only
 resource "aws_iam_role_policy" "ecs_task_sagemaker" {
   name = "sagemaker-medgemma-invoke"
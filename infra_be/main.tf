@@ -26,6 +26,11 @@ data "terraform_remote_state" "infra" {
   config  = { path = "../infra/terraform.tfstate" }
 }
 
+data "terraform_remote_state" "sqs" {
+  backend = "local"
+  config  = { path = "../infra_sqs/terraform.tfstate" }
+}
+
 # ── ECR Repository ───────────────────────────────────────────────────────────
 
 resource "aws_ecr_repository" "api" {
@@ -124,7 +129,7 @@ resource "aws_lb_target_group" "api" {
   target_type = "ip" # required for Fargate awsvpc networking
 
   health_check {
-    path                = "/health"
+    path                = "/health/ready" # 503 until the warm-up step has loaded the models
     port                = "traffic-port"
     protocol            = "HTTP"
     healthy_threshold   = 2
@@ -211,9 +216,15 @@ resource "aws_ecs_task_definition" "api" {
         { name = "FHIR_S3_BUCKET",               value = data.terraform_remote_state.storage.outputs.fhir_bucket_name },
         { name = "DYNAMODB_TRIAGE_TABLE",        value = data.terraform_remote_state.storage.outputs.triage_table_name },
         { name = "DYNAMODB_PATIENTS_TABLE",      value = data.terraform_remote_state.storage.outputs.patients_table_name },
+        { name = "DYNAMODB_EHR_EXPORTS_TABLE",   value = data.terraform_remote_state.storage.outputs.ehr_exports_table_name },
+        { name = "DYNAMODB_TRIAGE_EVENTS_TABLE", value = data.terraform_remote_state.storage.outputs.triage_events_table_name },
         { name = "SAGEMAKER_MEDGEMMA_ENDPOINT",  value = var.medgemma_endpoint_name },
         { name = "SAGEMAKER_ASYNC_BUCKET",       value = data.terraform_remote_state.infra.outputs.medgemma_async_bucket },
         { name = "FRONTEND_URL",                 value = var.frontend_url },
+        { name = "SQS_TRIAGE_QUEUE_URL",         value = data.terraform_remote_state.sqs.outputs.queue_url },
+        { name = "TRIAGE_INLINE_WORKER",         value = "0" },
+        # Per-process MedGemma budget: the API only refines precautions; SOAP + FHIR run in the workers
+        { name = "LLM_MAX_INFLIGHT",             value = "1" },
       ]
 
       # HF_TOKEN from SSM Parameter Store — not in plaintext env vars
@@ -239,6 +250,84 @@ resource "aws_ecs_task_definition" "api" {
   tags = { Name = "${local.name_prefix}-api-task" }
 }
 
+# ── Triage Worker (consumes triage-jobs) ────────────────────────────────────
+# Same image, different entrypoint: model server + triage_worker.py (the task
+# stops if either dies). Scales independently of the API; no load balancer.
+
+resource "aws_ecs_task_definition" "worker" {
+  family                   = "${local.name_prefix}-worker"
+  requires_compatibilities = ["FARGATE"]
+  network_mode             = "awsvpc"
+  cpu                      = "4096"
+  memory                   = "16384"
+  execution_role_arn       = aws_iam_role.ecs_execution.arn
+  task_role_arn            = aws_iam_role.ecs_task.arn
+
+  runtime_platform {
+    operating_system_family = "LINUX"
+    cpu_architecture        = "X86_64"
+  }
+
+  container_definitions = jsonencode([
+    {
+      name      = "worker"
+      image     = "${aws_ecr_repository.api.repository_url}:demo"
+      essential = true
+      command   = ["./entrypoint.sh", "worker"]
+
+      environment = [
+        { name = "APP_ENV",                      value = "demo" },
+        { name = "AWS_REGION",                   value = var.aws_region },
+        { name = "AUDIO_S3_BUCKET",              value = data.terraform_remote_state.storage.outputs.audio_bucket_name },
+        { name = "FHIR_S3_BUCKET",               value = data.terraform_remote_state.storage.outputs.fhir_bucket_name },
+        { name = "DYNAMODB_TRIAGE_TABLE",        value = data.terraform_remote_state.storage.outputs.triage_table_name },
+        { name = "DYNAMODB_PATIENTS_TABLE",      value = data.terraform_remote_state.storage.outputs.patients_table_name },
+        { name = "DYNAMODB_EHR_EXPORTS_TABLE",   value = data.terraform_remote_state.storage.outputs.ehr_exports_table_name },
+        { name = "DYNAMODB_TRIAGE_EVENTS_TABLE", value = data.terraform_remote_state.storage.outputs.triage_events_table_name },
+        { name = "SAGEMAKER_MEDGEMMA_ENDPOINT",  value = var.medgemma_endpoint_name },
+        { name = "SAGEMAKER_ASYNC_BUCKET",       value = data.terraform_remote_state.infra.outputs.medgemma_async_bucket },
+        { name = "SQS_TRIAGE_QUEUE_URL",         value = data.terraform_remote_state.sqs.outputs.queue_url },
+        # SOAP notes and FHIR exports share this admission queue; replicas x this = load on the endpoint
+        { name = "LLM_MAX_INFLIGHT",             value = "3" },
+      ]
+
+      secrets = [
+        { name = "HF_TOKEN", valueFrom = var.hf_token_ssm_param_arn }
+      ]
+
+      logConfiguration = {
+        logDriver = "awslogs"
+        options = {
+          awslogs-group         = aws_cloudwatch_log_group.ecs_api.name
+          awslogs-region        = var.aws_region
+          awslogs-stream-prefix = "worker"
+        }
+      }
+
+      startTimeout = 120
+      stopTimeout  = 120 # let in-flight jobs finish; unfinished ones are redelivered
+    }
+  ])
+
+  tags = { Name = "${local.name_prefix}-worker-task" }
+}
+
+resource "aws_ecs_service" "worker" {
+  name            = "${local.name_prefix}-worker-service"
+  cluster         = aws_ecs_cluster.main.id
+  task_definition = aws_ecs_task_definition.worker.arn
+  desired_count   = var.worker_count
+  launch_type     = "FARGATE"
+
+  network_configuration {
+    subnets          = data.aws_subnets.default.ids
+    security_groups  = [aws_security_group.ecs_tasks.id]
+    assign_public_ip = true
+  }
+
+  tags = { Name = "${local.name_prefix}-worker-service" }
+}
+
 # ── ECS Service ──────────────────────────────────────────────────────────────
 
 # ── Secure HTTPS Proxy (API Gateway v2) ─────────────────────────────────────
@@ -39,3 +39,9 @@ variable "hf_token_ssm_param_arn" {
   # Create with: aws ssm put-parameter --name /vaidyasaarathi/hf-token --value "hf_..." --type SecureString
   # Then copy the ARN here: arn:aws:ssm:ap-south-1:<account>:parameter/vaidyasaarathi/hf-token
 }
+
+variable "worker_count" {
+  description = "Number of triage worker replicas consuming the triage-jobs queue"
+  type        = number
+  default     = 1
+}
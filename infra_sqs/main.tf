@@ -85,11 +85,11 @@ resource "aws_cloudwatch_metric_alarm" "dlq_not_empty" {
 }
 
 # ── CloudWatch Alarm: Queue Depth Spike ────────────────────────────────────
-# Fires if > 10 messages accumulate — indicates Lambda worker is not keeping up.
+# Fires if > 10 messages accumulate — indicates triage workers are not keeping up.
 
 resource "aws_cloudwatch_metric_alarm" "queue_depth" {
   alarm_name          = "${local.name_prefix}-queue-depth-high"
-  alarm_description   = "Triage queue has > 10 pending jobs — Lambda worker may be stalled."
+  alarm_description   = "Triage queue has > 10 pending jobs — triage workers may be stalled or under-scaled."
   comparison_operator = "GreaterThanThreshold"
   threshold           = 10
   evaluation_periods  = 2
@@ -110,6 +110,11 @@ resource "aws_dynamodb_table" "triage" {
     type = "S"
   }
 
+  attribute {
+    name = "updated_at"
+    type = "S"
+  }
+
   # GSI 1 — per-patient triage history
   global_secondary_index {
     name            = "patient_id-index"
@@ -132,6 +137,14 @@ resource "aws_dynamodb_table" "triage" {
     projection_type = "ALL"
   }
 
+  # GSI 4 — incremental doctor-queue re-sync: records written since the last sync, per status
+  global_secondary_index {
+    name            = "status-updated-index"
+    hash_key        = "status"
+    range_key       = "updated_at"
+    projection_type = "ALL"
+  }
+
   # TTL — auto-expire demo records after 30 days
   ttl {
     attribute_name = "expires_at"
@@ -163,3 +176,72 @@ resource "aws_dynamodb_table" "patients" {
 
   tags = { Name = "${local.name_prefix}-patients" }
 }
+
+# ── DynamoDB: EHR Export Manifest ────────────────────────────────────────────
+# One small item per FHIR export (patient, triage, time, S3 key, size), written at
+# export time. The EHR listing pages through this instead of crawling the bucket.
+
+resource "aws_dynamodb_table" "ehr_exports" {
+  name         = "${local.name_prefix}-ehr-exports"
+  billing_mode = "PAY_PER_REQUEST"
+  hash_key     = "manifest"
+  range_key    = "sort_key"
+
+  attribute {
+    name = "manifest"
+    type = "S"
+  }
+
+  attribute {
+    name = "sort_key"
+    type = "S"
+  }
+
+  attribute {
+    name = "patient_id"
+    type = "S"
+  }
+
+  # GSI — per-patient export history, newest first
+  global_secondary_index {
+    name            = "patient_id-sort-index"
+    hash_key        = "patient_id"
+    range_key       = "sort_key"
+    projection_type = "ALL"
+  }
+
+  point_in_time_recovery {
+    enabled = true
+  }
+
+  tags = { Name = "${local.name_prefix}-ehr-exports" }
+}
+
+# ── Triage event log (SSE fan-out across API and worker tasks) ─────────────
+# Every task appends its triage change events to partition "triage" under a
+# dense sequence number (counter item in partition "counter"); API tasks tail
+# the partition and push events to their SSE subscribers.
+resource "aws_dynamodb_table" "triage_events" {
+  name         = "${local.name_prefix}-triage-events"
+  billing_mode = "PAY_PER_REQUEST"
+  hash_key     = "stream"
+  range_key    = "seq"
+
+  attribute {
+    name = "stream"
+    type = "S"
+  }
+
+  attribute {
+    name = "seq"
+    type = "N"
+  }
+
+  # TTL — events are only needed for Last-Event-ID replay; expire after a day
+  ttl {
+    attribute_name = "expires_at"
+    enabled        = true
+  }
+
+  tags = { Name = "${local.name_prefix}-triage-events" }
+}
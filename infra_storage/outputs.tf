@@ -42,3 +42,23 @@ output "patients_table_arn" {
   description = "ARN of the patients table (used in IAM policies)"
   value       = aws_dynamodb_table.patients.arn
 }
+
+output "ehr_exports_table_name" {
+  description = "DynamoDB EHR export manifest — set as DYNAMODB_EHR_EXPORTS_TABLE in ECS env"
+  value       = aws_dynamodb_table.ehr_exports.name
+}
+
+output "ehr_exports_table_arn" {
+  description = "ARN of the EHR export manifest table (used in IAM policies)"
+  value       = aws_dynamodb_table.ehr_exports.arn
+}
+
+output "triage_events_table_name" {
+  description = "DynamoDB triage event log — set as DYNAMODB_TRIAGE_EVENTS_TABLE in ECS env"
+  value       = aws_dynamodb_table.triage_events.name
+}
+
+output "triage_events_table_arn" {
+  description = "ARN of the triage event log table (used in IAM policies)"
+  value       = aws_dynamodb_table.triage_events.arn
+}
@@ -1,16 +1,36 @@
-from fastapi import APIRouter, HTTPException
-from typing import List, Dict, Any
-from services.ehr_service import ehr_service
+from fastapi import APIRouter, HTTPException, Query
+from typing import List, Dict, Any, Optional
+from services.ehr_service import ehr_service, EHR_PAGE_SIZE, EHR_MAX_PAGE_SIZE
 
 router = APIRouter(prefix="/ehr", tags=["EHR"])
 
 @router.get("/records", response_model=List[Dict[str, Any]])
 async def get_ehr_records():
     """
-    Returns the list of all exported FHIR records in the internal repository.
-    Used by the Mock EHR Dashboard for hackathon verification.
+    Returns the newest page (EHR_PAGE_SIZE) of exported FHIR records, with full bundles;
+    older exports are not included. Page through them with GET /ehr/exports?include_bundles=true,
+    as the Mock EHR Dashboard does.
     """
     try:
         return await ehr_service.get_exported_records()
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/exports", response_model=Dict[str, Any])
+async def list_ehr_exports(
+    limit: int = Query(EHR_PAGE_SIZE, ge=1, le=EHR_MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    patient_id: Optional[str] = None,
+    include_bundles: bool = False
+):
+    """
+    Pages through the export manifest, newest first: {"items": [...], "next_cursor": ...}.
+    Items are summaries (export_id, triage_id, patient_id, exported_at, s3_key, size_bytes);
+    include_bundles=true also fetches each full FHIR bundle.
+    """
+    try:
+        return await ehr_service.list_exports(limit, cursor, patient_id, include_bundles)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
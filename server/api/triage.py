@@ -1,12 +1,24 @@
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException, BackgroundTasks, Header
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, BackgroundTasks, Header, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
 from typing import Optional, List
 import datetime
+import io
 import os
 import json
+import wave
 import logging
 import time
+import threading
+import numpy as np
 from services.triage_service import get_triage_service, TriageRecord, VitalSigns, SOAPNote
 from services.ai_service import AudioProcessor, AIServiceError
+from services.streaming_asr import StreamingTranscriber
+from services.model_client import ModelServerClient, ModelServerError, MODEL_SERVER_SOCKET
+from services.job_queue import get_job_queue
+from services.symptom_matcher import SYMPTOM_MATCHER
+from services.triage_events import TRIAGE_EVENTS
+from services.write_behind import TriageWriteBehind
+from services.metrics import HEAR_SECONDS, FHIR_EXPORT_SECONDS, PIPELINE_SECONDS, PIPELINE_INFLIGHT
 
 logger = logging.getLogger(__name__)
 
@@ -18,13 +30,67 @@ os.makedirs(AUDIO_DIR, exist_ok=True)
 
 router = APIRouter(prefix="/triage", tags=["triage"])
 triage_service = get_triage_service()
+SSE_HEARTBEAT_S = float(os.getenv("SSE_HEARTBEAT_S", "15"))  # keeps proxies from closing idle event streams
+
+# The AI processor is built on first use (or by the warm-up step in main.py), not at import:
+# loading Whisper + HeAR here kept /health dark for the whole model load.
+# With MODEL_SERVER_SOCKET set, Whisper + HeAR run in the shared model server and
+# this worker only keeps the lightweight client — so uvicorn can run several workers.
+MODEL_SERVER_WAIT_S = float(os.getenv("MODEL_SERVER_WAIT_S", "300"))
+_ai_processor: Optional[AudioProcessor] = None
+_ai_processor_loaded = False
+_ai_processor_lock = threading.Lock()
+
+
+def get_ai_processor() -> Optional[AudioProcessor]:
+    """Blocking: build the shared AudioProcessor once. None if initialisation failed."""
+    global _ai_processor, _ai_processor_loaded
+    if _ai_processor_loaded:
+        return _ai_processor
+    with _ai_processor_lock:
+        if not _ai_processor_loaded:
+            try:
+                if MODEL_SERVER_SOCKET:
+                    _ai_processor = AudioProcessor(model_client=ModelServerClient(MODEL_SERVER_SOCKET))
+                else:
+                    _ai_processor = AudioProcessor()
+            except Exception as e:
+                logger.warning(json.dumps({"event": "ai_processor_init_failed", "error": str(e)}))
+                _ai_processor = None
+            _ai_processor_loaded = True
+    return _ai_processor
+
+
+async def get_ai_processor_async() -> Optional[AudioProcessor]:
+    if _ai_processor_loaded:
+        return _ai_processor
+    return await run_in_threadpool(get_ai_processor)
+
+
+def warm_up_ai_processor():
+    """Warm-up step: load the models (or wait until the model server answers a ping)."""
+    processor = get_ai_processor()
+    if processor is None:
+        raise RuntimeError("AI processor failed to initialise")
+    if processor.model_client:
+        deadline = time.time() + MODEL_SERVER_WAIT_S
+        while True:
+            try:
+                processor.model_client.ping()  # a socket file alone may be left over from a crashed server
+                return
+            except ModelServerError:
+                if time.time() > deadline:
+                    raise RuntimeError(f"model server at {processor.model_client.socket_path} not up after {MODEL_SERVER_WAIT_S:.0f}s")
+                time.sleep(0.5)
+
+
+async def check_model_server():
+    """Readiness: raises ModelServerError if the shared model server does not answer (no-op without one)."""
+    if MODEL_SERVER_SOCKET:
+        processor = await get_ai_processor_async()
+        if processor and processor.model_client:
+            await processor.model_client.ping_async()
 
-# Initialize AI processor at startup
-try:
-    ai_processor = AudioProcessor()
-except Exception as e:
-    logger.warning(json.dumps({"event": "ai_processor_init_failed", "error": str(e)}))
-    ai_processor = None
 
 from starlette.concurrency import run_in_threadpool
 import asyncio
@@ -74,32 +140,122 @@ def upload_audio(audio_bytes: bytes, filename: str) -> str:
     return file_path
 
 
-async def _process_triage_audio_task(triage_id: str, audio_bytes: bytes, language: str):
+def load_audio(uri: str) -> bytes:
+    """Inverse of upload_audio(): read a stored recording back (S3 URI or local path)."""
+    if uri.startswith("s3://"):
+        import boto3
+        bucket, key = uri[len("s3://"):].split("/", 1)
+        s3 = boto3.client("s3", region_name=os.getenv("AWS_REGION", "ap-south-1"))
+        return s3.get_object(Bucket=bucket, Key=key)["Body"].read()
+    with open(uri, "rb") as f:
+        return f.read()
+
+
+async def enqueue_triage_job(triage_id: str, audio_uri: str, language: str, transcribed: bool = False) -> str:
+    """Hand the AI pipeline for a stored recording to the durable job queue (see triage_worker.py)."""
+    job_id = await get_job_queue().send({
+        "triage_id": triage_id,
+        "audio_uri": audio_uri,
+        "language": language,
+        "transcribed": transcribed,
+        "enqueued_at": time.time()
+    })
+    logger.info(json.dumps({"event": "triage_job_enqueued", "triage_id": triage_id, "job_id": job_id}))
+    return job_id
+
+
+async def enqueue_ehr_export_job(triage_id: str) -> str:
+    """
+    FHIR export also runs in the triage workers, so its MedGemma call waits in the
+    same admission queue as SOAP notes and yields to urgent ones (services/inference_provider.py).
+    """
+    job_id = await get_job_queue().send({"kind": "ehr_export", "triage_id": triage_id, "enqueued_at": time.time()})
+    logger.info(json.dumps({"event": "ehr_export_enqueued", "triage_id": triage_id, "job_id": job_id}))
+    return job_id
+
+
+async def run_triage_job(job: dict):
+    """
+    Job-queue handler. Deliveries are at-least-once, so a job whose record is
+    already past the pipeline is acknowledged without re-running it.
+    Raises on pipeline failure so the queue retries (and eventually dead-letters) the job.
+    """
+    triage_id = job["triage_id"]
+    record = await triage_service.get_triage(triage_id)
+    if not record:
+        # Never ack: with a per-process store another process may own the record. A record
+        # that never shows up is retried and then dead-lettered like any failed job.
+        logger.warning(json.dumps({"event": "triage_job_orphaned", "triage_id": triage_id}))
+        raise LookupError(f"Triage record {triage_id} not found")
+    if job.get("kind") == "ehr_export":
+        await _process_ehr_export_task(triage_id)
+        return
+    if record.status in ("ready_for_review", "finalized", "exported"):
+        logger.info(json.dumps({"event": "triage_job_duplicate", "triage_id": triage_id, "status": record.status}))
+        return
+
+    audio_bytes = await run_in_threadpool(load_audio, job["audio_uri"])
+    # Streamed recordings were transcribed live; the transcript is already on the record
+    transcript = record.transcription if job.get("transcribed") else None
+    await _process_triage_audio_task(
+        triage_id, audio_bytes, job.get("language", "English"), transcript=transcript, raise_errors=True, record=record
+    )
+
+
+async def _process_triage_audio_task(
+    triage_id: str,
+    audio_bytes: bytes,
+    language: str,
+    pcm: Optional[np.ndarray] = None,
+    transcript: Optional[str] = None,
+    raise_errors: bool = False,
+    record: Optional[TriageRecord] = None
+):
     """
     Background task: run the full AI pipeline.
 
+    Streamed recordings pass the already-decoded `pcm` and the live `transcript`,
+    so decode and Whisper are skipped and only HeAR + MedGemma remain.
+    `record` is the caller's fresh read, if any; record writes go through a
+    write-behind buffer (services/write_behind.py), so no re-reads in between.
+
     Phase 1 (parallel):  Whisper ASR + HeAR bioacoustic analysis
     Vitals fallback:      If MedGemma takes > 10s, write preliminary_zone from vitals only
     Phase 2 (sequential): MedGemma SOAP note + triage zone
     """
+    ai_processor = await get_ai_processor_async()
     if not ai_processor:
         await triage_service.update_triage_status(triage_id, "failed")
         logger.error(json.dumps({"event": "pipeline_failed", "triage_id": triage_id, "reason": "ai_processor_not_initialized"}))
         return
 
+    record = record or await triage_service.get_triage(triage_id)
+    if not record:
+        logger.error(json.dumps({"event": "pipeline_failed", "triage_id": triage_id, "reason": "record_not_found"}))
+        return
+    writes = TriageWriteBehind(triage_service, record)
+
+    PIPELINE_INFLIGHT.inc()
     try:
-        await triage_service.update_triage_status(triage_id, "in_progress")
+        # Usually already set by the upload — then this costs no write at all
+        writes.stage(status="in_progress")
         pipeline_start = time.time()
 
         # ── Phase 1: Serialized Whisper + HeAR (Optimized for 4 vCPU throughput) ──
         # Running these serially prevents CPU thrashing and actually lowers wall-clock time
         t_p1_start = time.time()
         
-        # 1. Whisper first (High CPU)
-        transcript = await run_in_threadpool(ai_processor.transcribe, audio_bytes, language)
+        # 0. Decode once — the same read-only 16 kHz PCM buffer feeds every stage
+        if pcm is None:
+            pcm = await run_in_threadpool(ai_processor.decode_pcm, audio_bytes)
+
+        # 1. Whisper first (High CPU) — batched with other in-flight triages
+        if transcript is None:
+            transcript = await ai_processor.transcribe_async(pcm, language)
         
         # 2. HeAR second (High CPU/Memory)
-        anomalies = await run_in_threadpool(ai_processor.detect_anomalies, audio_bytes)
+        with HEAR_SECONDS.time():
+            anomalies = await run_in_threadpool(ai_processor.detect_anomalies, pcm)
         
         t_p1_end = time.time()
         logger.info(json.dumps({
@@ -108,19 +264,22 @@ async def _process_triage_audio_task(triage_id: str, audio_bytes: bytes, languag
             "latency_s": round(t_p1_end - t_p1_start, 2)
         }))
 
-        # ── Fetch record for vitals (for fallback and MedGemma context) ───────
-        record = await triage_service.get_triage(triage_id)
-        vitals_dict = record.vitals.dict() if (record and record.vitals) else None
+        # ── Vitals from the working copy (for fallback and MedGemma context) ──
+        record = writes.record
+        vitals_dict = record.vitals.dict() if record.vitals else None
 
         # ── Phase 2: MedGemma with 10-second vitals-only fallback ────────────
         t_soap_start = time.time()
         fallback_written = False
 
+        # Vitals zone decides this job's place in the shared MedGemma admission queue
+        vitals_zone = _calculate_preliminary_zone(record.vitals)
+
         async def _medgemma_with_fallback():
             nonlocal fallback_written
-            # Run MedGemma in a thread — shield() prevents wait_for from cancelling it on timeout
+            # Run MedGemma as its own task — shield() prevents wait_for from cancelling it on timeout
             medgemma_task = asyncio.ensure_future(
-                run_in_threadpool(ai_processor.generate_soap_note, transcript, anomalies, vitals_dict, record.patient_age)
+                ai_processor.generate_soap_note(transcript, anomalies, vitals_dict, record.patient_age, zone=vitals_zone)
             )
             try:
                 # asyncio.shield() keeps medgemma_task alive even if wait_for times out
@@ -128,10 +287,11 @@ async def _process_triage_audio_task(triage_id: str, audio_bytes: bytes, languag
                 return analysis
             except asyncio.TimeoutError:
                 # Write vitals-only guardrail zone while MedGemma continues in background
-                if record and record.vitals:
-                    prelim = _calculate_preliminary_zone(record.vitals)
+                if record.vitals:
+                    prelim = vitals_zone
                     try:
-                        await _update_preliminary_zone(triage_id, prelim)
+                        # Clinically significant — flushed immediately (re-ranks the doctor queue)
+                        await writes.flush(preliminary_zone=prelim)
                         fallback_written = True
                         logger.info(json.dumps({
                             "event": "preliminary_zone_written",
@@ -153,19 +313,19 @@ async def _process_triage_audio_task(triage_id: str, audio_bytes: bytes, languag
             "fallback_was_shown": fallback_written
         }))
 
-        # ── Write final results to DynamoDB ───────────────────────────────────
-        record = await triage_service.get_triage(triage_id)
+        # ── Write final results (one versioned partial update, with anything still staged) ──
+        record = await writes.flush(
+            transcription=transcript,
+            soap_note=SOAPNote(**analysis.get("soap", {})),
+            specialty=analysis.get("specialty", "General Medicine"),
+            risk_score=analysis.get("risk_score", 0),
+            triage_tier=analysis.get("triage_tier", "ROUTINE"),
+            preliminary_zone=None,  # clear fallback — final zone is now set
+            status="ready_for_review"
+        )
         if record:
-            record.transcription = transcript
-            record.soap_note = SOAPNote(**analysis.get("soap", {}))
-            record.specialty = analysis.get("specialty", "General Medicine")
-            record.risk_score = analysis.get("risk_score", 0)
-            record.triage_tier = analysis.get("triage_tier", "ROUTINE")
-            record.preliminary_zone = None  # clear fallback — final zone is now set
-            record.status = "ready_for_review"
-            # save_triage_record() does a full put_item — persists ALL fields, not just status
-            await triage_service.save_triage_record(record)
 
+            PIPELINE_SECONDS.observe(time.time() - pipeline_start)
             total = round(time.time() - pipeline_start, 2)
             p1_time = round(t_p1_end - t_p1_start, 2)
             soap_time = round(t_soap_end - t_soap_start, 2)
@@ -199,10 +359,9 @@ async def _process_triage_audio_task(triage_id: str, audio_bytes: bytes, languag
             "triage_id": triage_id,
             "error": str(e)
         }))
-        await triage_service.update_triage_status(triage_id, "failed")
-        # Write a user-facing error message so the frontend poll has something to show
+        # Status plus a user-facing error message (so the frontend has something to show), in one write
         try:
-            await triage_service.update_soap_note(triage_id, SOAPNote(
+            await writes.flush(status="failed", soap_note=SOAPNote(
                 subjective="AI analysis could not be completed. Your recording and vitals are saved. Please retry or contact support.",
                 objective="",
                 assessment="Analysis failed",
@@ -210,33 +369,36 @@ async def _process_triage_audio_task(triage_id: str, audio_bytes: bytes, languag
             ))
         except Exception:
             pass  # Best-effort; do not mask the original error
+        if raise_errors:
+            raise
+    finally:
+        try:
+            await writes.close()
+        except Exception as e:
+            logger.warning(json.dumps({"event": "write_behind_close_failed", "triage_id": triage_id, "error": str(e)}))
+        PIPELINE_INFLIGHT.dec()
 
 
-async def _update_preliminary_zone(triage_id: str, zone: str):
-    """Write preliminary vitals-only zone to DynamoDB without changing overall status."""
-    import boto3
-    region = os.getenv("AWS_REGION", "ap-south-1")
-    table_name = os.getenv("DYNAMODB_TRIAGE_TABLE", "")
-    if APP_ENV == "demo" and table_name:
-        ddb = boto3.resource("dynamodb", region_name=region)
-        table = ddb.Table(table_name)
-        table.update_item(
-            Key={"id": triage_id},
-            UpdateExpression="SET preliminary_zone = :z, updated_at = :u",
-            ExpressionAttributeValues={
-                ":z": zone,
-                ":u": datetime.datetime.now(datetime.timezone.utc).isoformat().replace('+00:00', 'Z')
-            }
-        )
-    else:
-        # In-memory fallback for dev mode
-        record = await triage_service.get_triage(triage_id)
-        if record:
-            record.preliminary_zone = zone
+async def _refine_precautions_task(triage_id: str, vitals_dict: dict, patient_age: Optional[int], zone: Optional[str] = None):
+    """Background task: replace the rule-based precautions with MedGemma's, if it answers."""
+    t_start = time.time()
+    ai_processor = await get_ai_processor_async()
+    if not ai_processor:
+        return
+    precautions = await ai_processor.get_vitals_precautions(vitals_dict, patient_age, zone=zone)
+    if precautions:
+        await triage_service.update_precautions(triage_id, precautions, source="ai")
+    logger.info(json.dumps({
+        "event": "precautions_refined",
+        "triage_id": triage_id,
+        "source": "ai" if precautions else "rules",
+        "latency_s": round(time.time() - t_start, 2)
+    }))
 
 
 @router.post("/vitals", response_model=TriageRecord)
 async def create_vitals_triage(
+    background_tasks: BackgroundTasks,
     patient_id: str = Form(...),
     patient_age: Optional[int] = Form(None),
     temp: Optional[float] = Form(None),
@@ -247,7 +409,11 @@ async def create_vitals_triage(
     spo2: Optional[int] = Form(None),
     x_idempotency_key: Optional[str] = Header(None)
 ):
-    """Step 1: Create a triage record with vitals only. Returns immediate first-aid if abnormal."""
+    """
+    Step 1: Create a triage record with vitals only. Returns immediate first-aid if abnormal.
+    Precautions come from the deterministic rule table so this responds in milliseconds;
+    MedGemma's refined list is written to the record afterwards (precautions_source = "ai").
+    """
     # 1. Idempotency Check
     if x_idempotency_key:
         existing = await triage_service.get_by_idempotency_key(x_idempotency_key)
@@ -275,24 +441,26 @@ async def create_vitals_triage(
         patient_age=patient_age
     )
 
-    # 4. Fast-Path Check
-    if ai_processor:
-        t_vitals_start = time.time()
-        vitals_dict = vitals.model_dump()
-        if ai_processor.is_vitals_abnormal(vitals_dict):
-            record.vitals_status = "ABNORMAL"
-            precautions = await run_in_threadpool(ai_processor.get_vitals_precautions, vitals_dict, patient_age)
-            record.preliminary_precautions = precautions
-            await triage_service.save_triage_record(record)
-        
-        t_vitals_end = time.time()
-        logger.info(json.dumps({
-            "event": "vitals_triage_complete",
-            "triage_id": record.id,
-            "latency_s": round(t_vitals_end - t_vitals_start, 4),
-            "status": record.vitals_status
-        }))
-        print(f"[LATENCY] Stage 1 (Vitals): {round(t_vitals_end - t_vitals_start, 2)}s")
+    # 4. Fast-Path Check (rule table only — does not wait for the models to load)
+    t_vitals_start = time.time()
+    vitals_dict = vitals.model_dump()
+    if AudioProcessor.is_vitals_abnormal(vitals_dict):
+        record.vitals_status = "ABNORMAL"
+        record.preliminary_precautions = AudioProcessor.get_rule_based_precautions(vitals_dict)
+        record.precautions_source = "rules"
+        await triage_service.save_triage_record(record)
+        background_tasks.add_task(
+            _refine_precautions_task, record.id, vitals_dict, patient_age, _calculate_preliminary_zone(vitals)
+        )
+    
+    t_vitals_end = time.time()
+    logger.info(json.dumps({
+        "event": "vitals_triage_complete",
+        "triage_id": record.id,
+        "latency_s": round(t_vitals_end - t_vitals_start, 4),
+        "status": record.vitals_status
+    }))
+    print(f"[LATENCY] Stage 1 (Vitals): {round(t_vitals_end - t_vitals_start, 2)}s")
     
     return record
 
@@ -300,11 +468,10 @@ async def create_vitals_triage(
 @router.post("/audio/{triage_id}", response_model=TriageRecord)
 async def upload_triage_audio(
     triage_id: str,
-    background_tasks: BackgroundTasks,
     audio: UploadFile = File(...),
     language: str = Form("English")
 ):
-    """Step 2: Upload audio for an existing triage record and start AI processing in background."""
+    """Step 2: Upload audio for an existing triage record and queue AI processing for a worker."""
     record = await triage_service.get_triage(triage_id)
     if not record:
         raise HTTPException(status_code=404, detail="Triage record not found")
@@ -313,19 +480,122 @@ async def upload_triage_audio(
     if len(audio_bytes) > MAX_AUDIO_BYTES:
         raise HTTPException(status_code=413, detail="Audio file too large")
 
-    # 1. Upload audio
-    audio_uri = upload_audio(audio_bytes, audio.filename)
+    # 1. Upload audio — keyed by triage id, since workers read it back later
+    audio_uri = await run_in_threadpool(upload_audio, audio_bytes, f"triage_{triage_id}_{audio.filename}")
     record.audio_file_url = audio_uri
     record.language = language
     record.status = "in_progress"
     await triage_service.save_triage_record(record)
 
-    # 2. Start AI Pipeline (Background)
-    background_tasks.add_task(_process_triage_audio_task, record.id, audio_bytes, language)
+    # 2. Queue the AI pipeline (durable — survives API restarts, runs on any worker replica)
+    await enqueue_triage_job(record.id, audio_uri, language)
     
     return record
 
 
+def _pcm_to_wav(pcm: np.ndarray) -> bytes:
+    """Encode streamed 16 kHz float32 PCM as a 16-bit WAV for storage."""
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(16000)
+        wav.writeframes((np.clip(pcm, -1.0, 1.0) * 32767).astype("<i2").tobytes())
+    return buf.getvalue()
+
+
+@router.websocket("/stream/{triage_id}")
+async def stream_triage_audio(websocket: WebSocket, triage_id: str, language: str = "English"):
+    """
+    Step 2 (streaming alternative to POST /audio/{triage_id}).
+    Accepts 16 kHz mono int16 PCM frames while the nurse is still recording,
+    transcribes closed speech segments as they arrive and pushes partial transcripts.
+    Send {"event": "stop"} to finish; the rest of the pipeline then starts immediately.
+    """
+    await websocket.accept()
+    record = await triage_service.get_triage(triage_id)
+    if not record:
+        await websocket.close(code=4404, reason="Triage record not found")
+        return
+    ai_processor = await get_ai_processor_async()
+    if not ai_processor:
+        await websocket.close(code=1011, reason="AI processor not initialized")
+        return
+
+    session = StreamingTranscriber(ai_processor, language)
+    writes = TriageWriteBehind(triage_service, record)  # partial transcripts: one write per window, not per segment
+    received_bytes = 0
+    stopped = False
+
+    async def _publish_partial(task):
+        if task.cancelled() or task.exception() or not task.result():
+            return
+        writes.stage(transcription=session.transcript)
+        try:
+            flags = SYMPTOM_MATCHER.assess(session.transcript)
+            await websocket.send_json({
+                "event": "partial",
+                "text": session.transcript,
+                "symptoms": [{"symptom": m.symptom, "category": m.category, "severity": m.severity} for m in flags.symptoms],
+                "guardrail_tier": flags.guardrail_tier
+            })
+        except Exception:
+            pass  # client may already be gone; transcript is persisted regardless (staged)
+
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            if message.get("bytes"):
+                received_bytes += len(message["bytes"])
+                if received_bytes > MAX_AUDIO_BYTES * 4:  # raw PCM is ~4x the webm size limit
+                    await websocket.close(code=1009, reason="Audio stream too large")
+                    return
+                session.append(message["bytes"])
+                if session.should_check():
+                    task = session.schedule()
+                    task.add_done_callback(lambda t: asyncio.ensure_future(_publish_partial(t)))
+            elif message.get("text"):
+                try:
+                    payload = json.loads(message["text"])
+                except ValueError:
+                    continue
+                if payload.get("event") == "stop":
+                    stopped = True
+                    break
+    except WebSocketDisconnect:
+        pass
+
+    if not stopped:
+        # Abandoned recording — keep whatever was transcribed, but don't run the pipeline
+        logger.info(json.dumps({"event": "stream_abandoned", "triage_id": triage_id, "audio_s": round(session.duration_s, 2)}))
+        await writes.close()
+        return
+
+    t_finish = time.time()
+    transcript = await session.finish()
+    pcm = session.pcm()
+    logger.info(json.dumps({
+        "event": "stream_asr_complete",
+        "triage_id": triage_id,
+        "audio_s": round(session.duration_s, 2),
+        "tail_latency_s": round(time.time() - t_finish, 2)
+    }))
+
+    audio_file_url = await run_in_threadpool(upload_audio, _pcm_to_wav(pcm), f"triage_{triage_id}.wav")
+    record = await writes.close(audio_file_url=audio_file_url, language=language, transcription=transcript, status="in_progress")
+
+    try:
+        await websocket.send_json({"event": "final", "text": transcript})
+        await websocket.close()
+    except Exception:
+        pass
+
+    # HeAR + MedGemma run on a worker like any upload; ASR is skipped since the transcript is saved
+    await enqueue_triage_job(triage_id, record.audio_file_url, language, transcribed=True)
+
+
 @router.post("/", response_model=TriageRecord)
 async def create_triage(
     background_tasks: BackgroundTasks,
@@ -344,6 +614,7 @@ async def create_triage(
     """Legacy One-Shot API (kept for backward compatibility)."""
     # Simply call the new split logic internally
     record = await create_vitals_triage(
+        background_tasks=background_tasks,
         patient_id=patient_id, patient_age=patient_age,
         temp=temp, bp_sys=bp_sys, bp_dia=bp_dia, hr=hr, rr=rr, spo2=spo2,
         x_idempotency_key=x_idempotency_key
@@ -351,15 +622,60 @@ async def create_triage(
     
     return await upload_triage_audio(
         triage_id=record.id,
-        background_tasks=background_tasks,
         audio=audio,
         language=language
     )
 
 
 @router.get("/queue", response_model=List[TriageRecord])
-async def get_queue(specialty: Optional[str] = None):
-    return await triage_service.get_triage_queue(specialty)
+async def get_queue(specialty: Optional[str] = None, limit: Optional[int] = None):
+    return await triage_service.get_triage_queue(specialty, limit)
+
+
+@router.get("/events")
+async def triage_events(
+    request: Request,
+    specialty: Optional[str] = None,
+    triage_id: Optional[str] = None,
+    last_event_id: Optional[str] = Header(None)
+):
+    """
+    Server-Sent Events stream of triage changes (see services/triage_events.py).
+    Filters: specialty, triage_id (comma-separated). Reconnects send Last-Event-ID
+    and get the events they missed replayed.
+    """
+    triage_ids = {t for t in triage_id.split(",") if t} if triage_id else None
+    try:
+        resume_from = int(last_event_id) if last_event_id else None
+    except ValueError:
+        resume_from = None
+    await TRIAGE_EVENTS.wait_ready()  # recent history loaded from the shared log, for the replay
+    sub = TRIAGE_EVENTS.subscribe(specialty=specialty, triage_ids=triage_ids, last_event_id=resume_from)
+
+    async def stream():
+        try:
+            yield "retry: 3000\n: subscribed\n\n"
+            while True:
+                try:
+                    item = await asyncio.wait_for(sub.queue.get(), SSE_HEARTBEAT_S)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": heartbeat\n\n"
+                    continue
+                if item is None:
+                    # Client fell behind: it refetches and reconnects
+                    yield "event: resync\ndata: {}\n\n"
+                    break
+                yield item.to_sse()
+        finally:
+            TRIAGE_EVENTS.unsubscribe(sub)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 
 @router.get("/{triage_id}", response_model=TriageRecord)
@@ -405,32 +721,39 @@ async def mark_as_seen(triage_id: str):
 from services.ehr_service import ehr_service
 
 async def _process_ehr_export_task(triage_id: str):
-    """Background task to run FHIR generation and export."""
-    try:
-        print(f"[EHR DEBUG] Starting background export task for: {triage_id}")
-        record = await triage_service.get_triage(triage_id)
-        if not record:
-            print(f"[EHR ERROR] Triage record {triage_id} not found for export.")
-            return
+    """
+    ehr_export job: run FHIR generation and export. Raises on failure (including an
+    export that reports no success) so the job queue retries and then dead-letters it.
+    """
+    print(f"[EHR DEBUG] Starting export job for: {triage_id}")
+    record = await triage_service.get_triage(triage_id)
+    if not record:
+        logger.warning(json.dumps({"event": "ehr_export_orphaned", "triage_id": triage_id}))
+        print(f"[EHR ERROR] Triage record {triage_id} not found for export.")
+        return
 
-        logger.info(json.dumps({"event": "ehr_export_started", "triage_id": triage_id}))
+    logger.info(json.dumps({"event": "ehr_export_started", "triage_id": triage_id}))
+    t_export = time.time()
+    try:
         success = await ehr_service.export_to_ehr(record)
-        if success:
-            await triage_service.update_triage_status(triage_id, "exported")
-            logger.info(json.dumps({"event": "ehr_export_success", "triage_id": triage_id}))
-            print(f"[EHR SUCCESS] Triage {triage_id} exported to FHIR.")
-        else:
-            logger.error(json.dumps({"event": "ehr_export_failed", "triage_id": triage_id}))
-            print(f"[EHR ERROR] Export failed for triage {triage_id}.")
     except Exception as e:
-        import traceback
-        traceback.print_exc()
+        FHIR_EXPORT_SECONDS.observe(time.time() - t_export, outcome="failed")
         logger.error(json.dumps({"event": "ehr_export_error", "triage_id": triage_id, "error": str(e)}))
         print(f"[EHR CRITICAL ERROR] {str(e)}")
+        raise
+    FHIR_EXPORT_SECONDS.observe(time.time() - t_export, outcome="success" if success else "failed")
+    if not success:
+        logger.error(json.dumps({"event": "ehr_export_failed", "triage_id": triage_id}))
+        print(f"[EHR ERROR] Export failed for triage {triage_id}.")
+        raise RuntimeError(f"EHR export failed for triage {triage_id}")
+
+    await triage_service.update_triage_status(triage_id, "exported")
+    logger.info(json.dumps({"event": "ehr_export_success", "triage_id": triage_id}))
+    print(f"[EHR SUCCESS] Triage {triage_id} exported to FHIR.")
 
 
 @router.post("/{triage_id}/export")
-async def export_triage(triage_id: str, background_tasks: BackgroundTasks):
+async def export_triage(triage_id: str):
     print("\n" + "="*50)
     print(f"[EHR API] >>> RECEIVED EXPORT REQUEST FOR: {triage_id}")
     print("="*50)
@@ -449,8 +772,8 @@ async def export_triage(triage_id: str, background_tasks: BackgroundTasks):
             print(f"[EHR API REJECTED] Triage {triage_id} status is '{record.status}'. Must be in {valid_statuses}")
             raise HTTPException(status_code=400, detail=f"Triage status '{record.status}' is not eligible for export.")
 
-        print(f"[EHR API] Queueing background task _process_ehr_export_task...")
-        background_tasks.add_task(_process_ehr_export_task, triage_id)
+        print(f"[EHR API] Queueing EHR export job...")
+        await enqueue_ehr_export_job(triage_id)
         return {"status": "accepted", "message": "EHR Export started in background"}
     except Exception as e:
         print(f"[EHR API CRITICAL] Exception during export setup: {str(e)}")
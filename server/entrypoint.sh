@@ -0,0 +1,42 @@
+#!/bin/bash
+# ════════════════════════════════════════════════════════════════
+#  VaidyaSaarathi - Container entrypoint
+#  Starts the shared model server (Whisper + HeAR) and either the API
+#  workers (default) or triage_worker.py (`./entrypoint.sh worker`).
+#  If either process exits, the container exits with it, so ECS /
+#  docker-compose restarts the whole task instead of serving
+#  "Error processing audio." from a dead model server.
+# ════════════════════════════════════════════════════════════════
+
+set -u
+
+# The dev triage store (MOCK_TRIAGES) lives in each uvicorn process, so more than one
+# worker only works with a shared store: DynamoDB (APP_ENV=demo) or SQLITE_DB_PATH.
+if [ -z "${UVICORN_WORKERS:-}" ]; then
+  if [ "${APP_ENV:-dev}" = "demo" ] || [ -n "${SQLITE_DB_PATH:-}" ]; then
+    UVICORN_WORKERS=2
+  else
+    UVICORN_WORKERS=1
+  fi
+fi
+export UVICORN_WORKERS  # main.py refuses an inline job worker in >1 per-process stores
+
+python model_server.py &
+model_server_pid=$!
+
+if [ "${1:-api}" = "worker" ]; then
+  python triage_worker.py &
+else
+  uvicorn main:app --host 0.0.0.0 --port 8000 --workers "${UVICORN_WORKERS}" &
+fi
+api_pid=$!
+
+trap 'kill -TERM "$model_server_pid" "$api_pid" 2>/dev/null' TERM INT
+
+# Returns when the first child exits (or a stop signal arrives); take the other one down too
+wait -n
+status=$?
+kill -TERM "$model_server_pid" "$api_pid" 2>/dev/null
+wait
+echo "[entrypoint] exiting with status ${status}"
+exit "${status}"
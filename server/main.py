@@ -1,3 +1,6 @@
+import time
+_IMPORT_STARTED = time.perf_counter()
+
 try:
     from dotenv import load_dotenv
     load_dotenv()  # loads server/.env before any os.getenv() calls
@@ -6,6 +9,7 @@ except ImportError:
 
 import os
 import json
+import asyncio
 import logging
 import sys
 import boto3
@@ -22,8 +26,16 @@ logging.basicConfig(
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from api import auth, patients, triage, ehr, ai_status
+from services.inference_provider import close_inference_provider
+from services.metrics import REGISTRY
+from services.job_queue import TRIAGE_INLINE_WORKER, UVICORN_WORKERS, TriageWorker, get_job_queue
+from services.model_client import MODEL_SERVER_SOCKET
+from services.startup import STARTUP_MODE, READINESS, record_import_time, run_warmup
+from services.auth_service import demo_password_hash
+from services.triage_events import TRIAGE_EVENTS
+from services import dynamo_async
 
 logger = logging.getLogger(__name__)
 
@@ -49,6 +61,62 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+_inline_worker = None
+record_import_time(time.perf_counter() - _IMPORT_STARTED)
+
+
+@app.on_event("startup")
+async def warm_up():
+    """Load models off the request path (see services/startup.py for STARTUP_MODE)."""
+    if STARTUP_MODE == "lazy":
+        return
+    warmup = asyncio.ensure_future(run_warmup([
+        ("ai_processor", triage.warm_up_ai_processor),
+        ("password_hashing", demo_password_hash),
+    ]))
+    app.state.warmup_task = warmup
+    if STARTUP_MODE == "eager":
+        await warmup
+
+
+@app.on_event("startup")
+async def start_queue_sync():
+    """Rebuild the materialized doctor queue from the store, then keep it re-synced in the background."""
+    app.state.queue_sync_task = asyncio.ensure_future(triage.triage_service.run_queue_sync())
+
+
+@app.on_event("startup")
+async def start_triage_events():
+    """Ship this process's triage events to the shared log and tail it for SSE (no-op for the in-memory store)."""
+    TRIAGE_EVENTS.start(tail=True)
+
+
+@app.on_event("startup")
+async def start_inline_worker():
+    """Dev / single-box mode: consume triage jobs in this process instead of a separate triage_worker.py."""
+    global _inline_worker
+    if TRIAGE_INLINE_WORKER:
+        if not triage.triage_service.shared_store and UVICORN_WORKERS > 1:
+            # Each worker would claim jobs whose records live in another worker's memory
+            raise RuntimeError(
+                f"TRIAGE_INLINE_WORKER needs a shared triage store with UVICORN_WORKERS={UVICORN_WORKERS}: "
+                "set SQLITE_DB_PATH or run a single worker"
+            )
+        _inline_worker = TriageWorker(get_job_queue(), triage.run_triage_job)
+        app.state.inline_worker_task = asyncio.ensure_future(_inline_worker.run())
+
+
+@app.on_event("shutdown")
+async def close_pooled_clients():
+    app.state.queue_sync_task.cancel()
+    if _inline_worker:
+        app.state.inline_worker_task.cancel()
+        await _inline_worker.stop()
+    await TRIAGE_EVENTS.stop()
+    await close_inference_provider()
+    dynamo_async.shutdown()
+
+
 # Register routers
 app.include_router(auth.router)
 app.include_router(patients.router)
@@ -73,11 +141,37 @@ def read_root():
     }
 
 
+@app.get("/health/live")
+async def liveness():
+    """Liveness — the process is up and the event loop answers. No dependency checks."""
+    return {"status": "alive", "uptime_s": round(time.time() - READINESS.started_at, 1)}
+
+
+@app.get("/health/ready")
+async def readiness():
+    """
+    Readiness — 200 once every warm-up step (model load, etc.) has completed and the
+    shared model server still answers a ping, else 503. The ALB routes on this, so a
+    task only gets traffic while its models are loaded and reachable.
+    """
+    ready = READINESS.ready
+    body = {"ready": ready, "mode": STARTUP_MODE, "steps": READINESS.snapshot()}
+    if ready and MODEL_SERVER_SOCKET:
+        try:
+            await triage.check_model_server()
+            body["model_server"] = "ok"
+        except Exception as e:
+            body["ready"] = ready = False
+            body["model_server"] = f"error: {str(e)[:120]}"
+            logger.warning(json.dumps({"event": "readiness_model_server_failed", "error": str(e)}))
+    return JSONResponse(content=body, status_code=200 if ready else 503)
+
+
 @app.get("/health")
 async def health_check():
     """
-    Deep health check — probes all critical dependencies.
-    ALB uses this endpoint to determine if the task should receive traffic.
+    Deep health check — probes all critical dependencies (on-demand diagnostics;
+    the ALB routes on /health/ready and container liveness uses /health/live).
     Returns 200 only when all dependencies are reachable.
     Returns 503 if any dependency is unhealthy.
     """
@@ -120,6 +214,15 @@ async def health_check():
     return JSONResponse(content=status, status_code=http_status)
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """
+    Prometheus scrape endpoint — per-stage latency histograms and load gauges for this worker.
+    Async on purpose: gauges are sampled on the event loop, and a saturated threadpool must not block the scrape.
+    """
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
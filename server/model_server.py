@@ -0,0 +1,94 @@
+"""
+Shared model server — owns the single copy of Whisper + HeAR for all API workers.
+
+Run alongside uvicorn (see Dockerfile):
+    MODEL_SERVER_SOCKET=/tmp/vaidya-models.sock python model_server.py
+
+API workers started with the same MODEL_SERVER_SOCKET send requests over the
+Unix socket and pass audio through shared memory (services/model_client.py).
+Whisper requests from every worker land on one WhisperBatcher, so they batch
+together as well.
+"""
+
+try:
+    from dotenv import load_dotenv
+    load_dotenv()
+except ImportError:
+    pass
+
+import os
+import sys
+import json
+import asyncio
+import logging
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
+    handlers=[logging.StreamHandler(sys.stdout)]
+)
+
+from services.ai_service import AudioProcessor
+from services.model_client import MODEL_SERVER_SOCKET, encode_message, read_message, attach_pcm
+
+logger = logging.getLogger("model_server")
+
+SOCKET_PATH = MODEL_SERVER_SOCKET or "/tmp/vaidya-models.sock"
+
+
+class ModelServer:
+    def __init__(self, processor: AudioProcessor):
+        self.processor = processor
+
+    async def dispatch(self, request: dict):
+        op = request.get("op")
+        if op == "ping":
+            return "pong"
+
+        shm, pcm = attach_pcm(request["shm"], int(request["samples"]))
+        try:
+            if op == "transcribe":
+                return await self.processor.transcribe_async(pcm, request.get("language", "English"))
+            if op == "detect_anomalies":
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(None, self.processor.detect_anomalies, pcm)
+            raise ValueError(f"Unknown op: {op}")
+        finally:
+            del pcm
+            try:
+                shm.close()
+            except BufferError:
+                pass  # a worker thread still holds a view; the mapping is released when it is collected
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                request = await read_message(reader)
+                if request is None:
+                    break
+                try:
+                    response = {"ok": True, "result": await self.dispatch(request)}
+                except Exception as e:
+                    logger.error(json.dumps({"event": "model_server_request_failed", "op": request.get("op"), "error": str(e)}))
+                    response = {"ok": False, "error": str(e)}
+                writer.write(encode_message(response))
+                await writer.drain()
+        finally:
+            writer.close()
+
+
+async def main():
+    processor = AudioProcessor()
+    server = ModelServer(processor)
+
+    if os.path.exists(SOCKET_PATH):
+        os.unlink(SOCKET_PATH)
+    unix_server = await asyncio.start_unix_server(server.handle, path=SOCKET_PATH)
+    os.chmod(SOCKET_PATH, 0o600)
+    logger.info(json.dumps({"event": "model_server_ready", "socket": SOCKET_PATH}))
+    async with unix_server:
+        await unix_server.serve_forever()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
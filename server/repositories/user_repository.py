@@ -2,13 +2,11 @@ import logging
 from abc import ABC, abstractmethod
 from typing import Optional, Dict
 from models.auth import User
-from passlib.context import CryptContext
+from services.auth_service import demo_password_hash
 
 # Set up logging
 logger = logging.getLogger(__name__)
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 class UserRepository(ABC):
     @abstractmethod
     async def get_by_hospital_id(self, hospital_id: str) -> Optional[dict]:
@@ -23,7 +21,7 @@ class InMemoryUserRepository(UserRepository):
                 "id": "u1",
                 "hospital_id": "nur_01",
                 "name": "Nurse Anita (Intake)",
-                "password": pwd_context.hash("password"),
+                "password": None,
                 "role": "nurse",
                 "specialty": None
             },
@@ -31,7 +29,7 @@ class InMemoryUserRepository(UserRepository):
                 "id": "u3",
                 "hospital_id": "doc_cardio",
                 "name": "Dr. Sharma",
-                "password": pwd_context.hash("password"),
+                "password": None,
                 "role": "doctor",
                 "specialty": "Cardiac"
             }
@@ -39,4 +37,8 @@ class InMemoryUserRepository(UserRepository):
         logger.info("Initialized InMemoryUserRepository with default mock users")
 
     async def get_by_hospital_id(self, hospital_id: str) -> Optional[dict]:
-        return self._users.get(hospital_id)
+        user = self._users.get(hospital_id)
+        if user is None:
+            return None
+        # Demo users share one hash, computed on first lookup; the stored dict is not modified
+        return {**user, "password": user["password"] or demo_password_hash()}
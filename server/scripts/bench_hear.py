@@ -0,0 +1,132 @@
+"""
+Benchmark HeAR backends against the SavedModel baseline.
+
+    cd server
+    python scripts/bench_hear.py                                   # all backends, synthetic audio
+    python scripts/bench_hear.py --backends savedmodel onnx --audio sample.wav --iters 50
+
+Every backend runs in its own subprocess, so its load time and RSS are measured
+in isolation. Reported per backend:
+- load_s          — model load (+ XLA compile) time
+- rss_mb          — resident memory after load and the benchmark
+- p50/p95 ms      — latency of one full [batch, window] forward pass
+- cos_min/mean    — per-window cosine similarity of embeddings vs savedmodel (drift)
+- Δscore          — change in the 0-10 acoustic deviation score vs savedmodel
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+
+from services.hear_analysis import HEAR_MAX_BATCH, SAMPLE_RATE, sliding_windows, l2_normalize, deviation_stats  # noqa: E402
+from services.hear_backends import WINDOW_SAMPLES, _BACKENDS  # noqa: E402
+
+
+def _rss_mb() -> float:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def _test_windows(audio_path: str, count: int) -> np.ndarray:
+    if audio_path:
+        from faster_whisper import decode_audio
+        pcm = decode_audio(audio_path, sampling_rate=SAMPLE_RATE)
+    else:
+        rng = np.random.default_rng(0)
+        t = np.arange(SAMPLE_RATE * 30) / SAMPLE_RATE
+        # Deterministic pseudo-breath: amplitude-modulated noise + a low tone
+        pcm = (0.1 * rng.standard_normal(len(t)) * (0.5 + 0.5 * np.sin(2 * np.pi * 0.25 * t))
+               + 0.05 * np.sin(2 * np.pi * 180 * t)).astype(np.float32)
+    windows, _ = sliding_windows(pcm, WINDOW_SAMPLES, WINDOW_SAMPLES // 2)
+    return np.ascontiguousarray(windows[:count])
+
+
+def run_worker(backend: str, windows_path: str, out_path: str, iters: int):
+    """Child process: load one backend, time it, save its embeddings."""
+    windows = np.load(windows_path)
+    rss_before = _rss_mb()
+    t0 = time.perf_counter()
+    model = _BACKENDS[backend]()
+    load_s = time.perf_counter() - t0
+
+    batch = windows[:HEAR_MAX_BATCH]
+    model.embed(batch)  # warm-up
+    latencies = []
+    for _ in range(iters):
+        t = time.perf_counter()
+        model.embed(batch)
+        latencies.append((time.perf_counter() - t) * 1000)
+
+    np.save(out_path, model.embed(windows))
+    print(json.dumps({
+        "backend": backend,
+        "load_s": round(load_s, 2),
+        "rss_mb": round(_rss_mb(), 1),
+        "rss_model_mb": round(_rss_mb() - rss_before, 1),
+        "p50_ms": round(float(np.percentile(latencies, 50)), 2),
+        "p95_ms": round(float(np.percentile(latencies, 95)), 2)
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="+", default=list(_BACKENDS), choices=list(_BACKENDS))
+    parser.add_argument("--audio", default="", help="optional recording to embed (default: synthetic 30 s)")
+    parser.add_argument("--iters", type=int, default=30)
+    parser.add_argument("--windows", type=int, default=48)
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    parser.add_argument("--windows-path", help=argparse.SUPPRESS)
+    parser.add_argument("--out-path", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.worker, args.windows_path, args.out_path, args.iters)
+        return
+
+    backends = ["savedmodel"] + [b for b in args.backends if b != "savedmodel"]
+    tmp = tempfile.mkdtemp(prefix="hear-bench-")
+    windows_path = os.path.join(tmp, "windows.npy")
+    np.save(windows_path, _test_windows(args.audio, args.windows))
+
+    results, embeddings = [], {}
+    for backend in backends:
+        out_path = os.path.join(tmp, f"{backend}.npy")
+        proc = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--worker", backend,
+             "--windows-path", windows_path, "--out-path", out_path, "--iters", str(args.iters)],
+            capture_output=True, text=True
+        )
+        lines = [l for l in proc.stdout.splitlines() if l.startswith("{\"backend\"")]
+        if proc.returncode != 0 or not lines:
+            print(f"[{backend}] failed:\n{proc.stderr[-2000:]}")
+            continue
+        results.append(json.loads(lines[-1]))
+        embeddings[backend] = l2_normalize(np.load(out_path))
+
+    base = embeddings.get("savedmodel")
+    base_score = min(10.0, deviation_stats(base)[0] * 50) if base is not None else None
+    print(f"\n{'backend':<11}{'load_s':>8}{'rss_mb':>9}{'p50_ms':>9}{'p95_ms':>9}{'cos_min':>9}{'cos_mean':>10}{'Δscore':>8}")
+    for r in results:
+        emb = embeddings[r["backend"]]
+        cos_min = cos_mean = delta = float("nan")
+        if base is not None and emb.shape == base.shape:
+            cos = np.einsum("ij,ij->i", emb, base)
+            cos_min, cos_mean = float(cos.min()), float(cos.mean())
+            delta = min(10.0, deviation_stats(emb)[0] * 50) - base_score
+        print(f"{r['backend']:<11}{r['load_s']:>8}{r['rss_mb']:>9}{r['p50_ms']:>9}{r['p95_ms']:>9}"
+              f"{cos_min:>9.4f}{cos_mean:>10.4f}{delta:>+8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Offline conversion of the google/hear SavedModel for the CPU backends in
+services/hear_backends.py.
+
+    cd server
+    python scripts/convert_hear.py --onnx --tflite            # → storage/models/hear_int8.{onnx,tflite}
+    python scripts/convert_hear.py --onnx --batch 32
+
+Both artifacts use a fixed [batch, window] input shape (HEAR_MAX_BATCH x
+HEAR_WINDOW_S * 16 kHz). The runtime pads partial batches to that shape.
+- ONNX:   tf2onnx export (fp32), then onnxruntime dynamic int8 quantization of the weights.
+- TFLite: TFLiteConverter dynamic-range quantization (int8 weights, float activations).
+
+Conversion-only dependencies: pip install tf2onnx onnxruntime
+Then set HEAR_BACKEND=onnx (or tflite) and check drift with scripts/bench_hear.py.
+"""
+
+import os
+import sys
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.hear_analysis import HEAR_MAX_BATCH  # noqa: E402
+from services.hear_backends import WINDOW_SAMPLES, hear_model_dir  # noqa: E402
+
+
+def _serving_function(batch: int):
+    import tensorflow as tf
+
+    model = tf.saved_model.load(hear_model_dir())
+    signature = model.signatures["serving_default"]
+    spec = tf.TensorSpec([batch, WINDOW_SAMPLES], tf.float32, name="x")
+    fn = tf.function(lambda x: signature(x=x)["output_0"], input_signature=[spec])
+    return model, fn, spec
+
+
+def convert_onnx(batch: int, out_dir: str, opset: int) -> str:
+    import tf2onnx
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+
+    _, fn, spec = _serving_function(batch)
+    fp32_path = os.path.join(out_dir, "hear_fp32.onnx")
+    int8_path = os.path.join(out_dir, "hear_int8.onnx")
+    tf2onnx.convert.from_function(fn, input_signature=[spec], opset=opset, output_path=fp32_path)
+    quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+    print(f"ONNX: {fp32_path} ({os.path.getsize(fp32_path) / 1e6:.1f} MB) → {int8_path} ({os.path.getsize(int8_path) / 1e6:.1f} MB)")
+    return int8_path
+
+
+def convert_tflite(batch: int, out_dir: str) -> str:
+    import tensorflow as tf
+
+    model, fn, _ = _serving_function(batch)
+    converter = tf.lite.TFLiteConverter.from_concrete_functions([fn.get_concrete_function()], model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]  # dynamic-range int8
+    converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS, tf.lite.OpsSet.SELECT_TF_OPS]
+    path = os.path.join(out_dir, "hear_int8.tflite")
+    with open(path, "wb") as f:
+        f.write(converter.convert())
+    print(f"TFLite: {path} ({os.path.getsize(path) / 1e6:.1f} MB)")
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--onnx", action="store_true", help="export + int8-quantize ONNX")
+    parser.add_argument("--tflite", action="store_true", help="export dynamic-range int8 TFLite")
+    parser.add_argument("--batch", type=int, default=HEAR_MAX_BATCH, help="fixed batch dimension")
+    parser.add_argument("--out", default="storage/models")
+    parser.add_argument("--opset", type=int, default=17)
+    args = parser.parse_args()
+    if not (args.onnx or args.tflite):
+        parser.error("choose at least one of --onnx / --tflite")
+
+    os.makedirs(args.out, exist_ok=True)
+    print(f"Converting google/hear with fixed input [{args.batch}, {WINDOW_SAMPLES}]")
+    if args.onnx:
+        convert_onnx(args.batch, args.out, args.opset)
+    if args.tflite:
+        convert_tflite(args.batch, args.out)
+
+
+if __name__ == "__main__":
+    main()
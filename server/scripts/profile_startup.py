@@ -0,0 +1,95 @@
+"""
+Import-time profile of the API process, from `python -X importtime`.
+
+    cd server
+    python scripts/profile_startup.py                     # top 25 modules + per-package totals
+    python scripts/profile_startup.py --budget-s 3        # exit 1 if importing main takes longer (CI gate)
+    python scripts/profile_startup.py --module triage_worker --json > import_profile.json
+
+Importing main must stay cheap: heavy libraries (faster_whisper, tensorflow,
+librosa, onnxruntime) are imported inside the functions that use them, and
+models load in the warm-up step (services/startup.py). A new top-level
+import of one of them shows up here as a jump in the total and in the package table.
+"""
+
+import os
+import re
+import sys
+import json
+import argparse
+import subprocess
+from collections import defaultdict
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_PACKAGES = ("tensorflow", "faster_whisper", "ctranslate2", "librosa", "transformers", "torch", "sklearn", "onnxruntime")
+
+_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\| (\s*)(\S+)$")
+
+
+def profile(module: str):
+    env = dict(os.environ, STARTUP_MODE="lazy")  # import only; no warm-up runs without an event loop anyway
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=SERVER_DIR, env=env, capture_output=True, text=True
+    )
+    if proc.returncode != 0:
+        tail = [l for l in proc.stderr.splitlines() if not l.startswith("import time:")][-20:]
+        raise SystemExit(f"import {module} failed:\n" + "\n".join(tail))
+
+    modules = []
+    for line in proc.stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            modules.append({
+                "module": name,
+                "self_ms": int(self_us) / 1000,
+                "cumulative_ms": int(cumulative_us) / 1000,
+                "depth": len(indent) // 2
+            })
+    total_ms = next((m["cumulative_ms"] for m in modules if m["module"] == module), 0.0)
+
+    packages = defaultdict(float)
+    for m in modules:
+        packages[m["module"].split(".")[0]] += m["self_ms"]
+    heavy = sorted(p for p in packages if p in HEAVY_PACKAGES)
+    return total_ms, modules, dict(packages), heavy
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--top", type=int, default=25)
+    parser.add_argument("--budget-s", type=float, default=None, help="fail if the import takes longer")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    total_ms, modules, packages, heavy = profile(args.module)
+    top_packages = sorted(packages.items(), key=lambda kv: kv[1], reverse=True)[:args.top]
+
+    if args.json:
+        print(json.dumps({
+            "module": args.module,
+            "total_ms": round(total_ms, 1),
+            "heavy_packages": heavy,
+            "packages_ms": {k: round(v, 1) for k, v in top_packages},
+            "modules": sorted(modules, key=lambda m: m["cumulative_ms"], reverse=True)[:args.top]
+        }, indent=2))
+    else:
+        print(f"import {args.module}: {total_ms / 1000:.2f}s across {len(modules)} modules\n")
+        print(f"{'cumulative_ms':>14}{'self_ms':>10}  module")
+        for m in sorted(modules, key=lambda m: m["cumulative_ms"], reverse=True)[:args.top]:
+            print(f"{m['cumulative_ms']:>14.1f}{m['self_ms']:>10.1f}  {'  ' * m['depth']}{m['module']}")
+        print(f"\n{'self_ms':>14}  package")
+        for name, ms in top_packages:
+            print(f"{ms:>14.1f}  {name}{'   ← heavy' if name in HEAVY_PACKAGES else ''}")
+        if heavy:
+            print(f"\nHeavy packages imported eagerly: {', '.join(heavy)}")
+
+    if args.budget_s is not None and total_ms / 1000 > args.budget_s:
+        print(f"\nFAIL: import {args.module} took {total_ms / 1000:.2f}s (budget {args.budget_s:.2f}s)", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,20 +4,23 @@ os.environ["HF_HUB_ENABLE_HF_TRANSFER"] = "1"
 import io
 import re
 import json
+import asyncio
 import time
 import logging
-import librosa
 import numpy as np
 import tempfile
-import requests
 import warnings
-import tensorflow as tf
-from huggingface_hub import snapshot_download
-from sklearn.metrics.pairwise import cosine_similarity
 from typing import Optional, List, Dict, Any
-from transformers import pipeline
-from faster_whisper import WhisperModel
-from pydub import AudioSegment
+from starlette.concurrency import run_in_threadpool
+from services.asr_batcher import WhisperBatcher
+from services.inference_provider import get_inference_provider, llm_priority
+from services.llm_schemas import SOAP_RESPONSE_SCHEMA, SOAP_MAX_TOKENS
+from services.metrics import DECODE_SECONDS, ASR_SECONDS
+from services.hear_analysis import AdaptiveHop, sliding_windows, l2_normalize, deviation_stats, HEAR_MAX_BATCH, SAMPLE_RATE as HEAR_SR
+from services.hear_batcher import HeARBatcher
+from services.hear_backends import load_hear_backend, HEAR_BACKEND
+from services.result_cache import get_result_cache, audio_digest, CacheKey
+from services.symptom_matcher import SYMPTOM_MATCHER
 
 logger = logging.getLogger(__name__)
 
@@ -26,28 +29,9 @@ warnings.filterwarnings("ignore", category=UserWarning, module="librosa")
 warnings.filterwarnings("ignore", category=FutureWarning, module="librosa")
 warnings.filterwarnings("ignore", message=".*return_token_timestamps.*")
 
-OLLAMA_HOST = os.getenv("OLLAMA_HOST", "http://localhost:11434")
 APP_ENV = os.getenv("APP_ENV", "dev")  # 'dev' = Ollama | 'demo' = SageMaker
-SAGEMAKER_MEDGEMMA_ENDPOINT = os.getenv("SAGEMAKER_MEDGEMMA_ENDPOINT", "")
-AWS_REGION = os.getenv("AWS_REGION", "ap-south-1")
-
-if APP_ENV == "demo":
-    try:
-        import boto3
-        from botocore.config import Config
-        _sm_config = Config(read_timeout=60, connect_timeout=5, retries={"max_attempts": 1})
-        _sm_runtime = boto3.client("sagemaker-runtime", region_name=AWS_REGION, config=_sm_config)
-        _s3_client = boto3.client("s3", region_name=AWS_REGION) # Added for async polling
-        logger.info(json.dumps({"event": "demo_mode_init", "endpoint": SAGEMAKER_MEDGEMMA_ENDPOINT}))
-    except ImportError:
-        logger.warning(json.dumps({"event": "boto3_missing_fallback_ollama"}))
-        APP_ENV = "dev"
-        _sm_runtime = None
-        _s3_client = None
-else:
-    _sm_runtime = None
-    _s3_client = None
-    logger.info(json.dumps({"event": "dev_mode_init", "ollama_host": OLLAMA_HOST}))
+
+logger.info(json.dumps({"event": "ai_service_init", "app_env": APP_ENV}))
 
 
 
@@ -74,40 +58,78 @@ BUCKET_SCORES = {
     "ROUTINE": 15
 }
 
-CRITICAL_SYMPTOMS = ["chest pain", "severe breathlessness", "unconscious", "seizure", "slurred speech", "difficulty speaking", "cannot speak", "sudden weakness", "stroke", "paralysis", "vision loss"]
-HIGH_SYMPTOMS = ["breathlessness", "persistent vomiting", "high fever", "severe headache", "confusion", "visual disturbances", "blurred vision"]
-MODERATE_SYMPTOMS = ["dizziness", "body pain", "cough", "fatigue", "lightheadedness", "nausea"]
+# Guardrail keywords (English, romanised Hindi, Hindi/Tamil/Telugu script) live in
+# services/symptom_matcher.py as a lexicon compiled into one Aho-Corasick automaton.
+
+# Deterministic first-aid by vitals band — returned instantly on POST /triage/vitals.
+# Bands mirror is_vitals_abnormal(); MedGemma refines the list later in the background.
+VITALS_PRECAUTION_RULES = [
+    # (vital, comparison, threshold, precautions)
+    ("oxygen_saturation", "<=", 92, ["Start supplemental oxygen per protocol", "Sit patient upright"]),
+    ("blood_pressure_systolic", ">=", 170, ["Keep patient seated and calm", "Recheck blood pressure in 5 minutes"]),
+    ("blood_pressure_systolic", "<=", 85, ["Lay patient flat with legs raised", "Prepare IV access for physician"]),
+    ("heart_rate", ">=", 120, ["Attach cardiac monitor if available", "Keep patient at complete rest"]),
+    ("heart_rate", "<=", 45, ["Attach cardiac monitor if available", "Watch for dizziness or fainting"]),
+    ("temperature", ">=", 39.0, ["Tepid sponging, remove excess clothing", "Recheck temperature in 15 minutes"]),
+    ("temperature", "<=", 35.5, ["Cover with warm blankets", "Recheck temperature in 15 minutes"]),
+]
+MAX_RULE_PRECAUTIONS = 4
 
 CATEGORY_SPECIALTIES = {
-    "cardiac": ["chest pain"],
-    "respiratory": ["breathlessness", "severe breathlessness", "cough"],
-    "neurological": ["unconscious", "seizure", "slurred speech", "sudden weakness", "stroke", "confusion", "severe headache"],
+    "cardiac": "Cardiology",
+    "respiratory": "Pulmonology",
+    "neurological": "Neurology",
+    "general": "General Medicine"
 }
 
+WHISPER_MODEL_ID = "medium"
+WHISPER_COMPUTE_TYPE = "int8"
+
 class AIServiceError(Exception):
     pass
 class AudioProcessor:
-    def __init__(self):
+    def __init__(self, model_client=None):
+        # MedGemma goes through the shared pooled client (SageMaker in demo, Ollama in dev)
+        self.llm = get_inference_provider()
+        # HeAR sliding-window hop, adapted to measured embedding cost
+        self.hear_hop = AdaptiveHop()
+
+        # Duplicate audio skips inference (the model server keeps the cache in remote mode)
+        self.result_cache = get_result_cache()
+
+        # Remote mode: Whisper + HeAR live in the shared model server (model_server.py)
+        self.model_client = model_client
+        if model_client:
+            print(f"🔌 Using shared model server at {model_client.socket_path} for Whisper + HeAR")
+            self.asr_model = None
+            self.asr_batcher = None
+            self.hear_backend = None
+            self.hear_batcher = None
+            return
+
         # 1. Initialize Whisper Model (faster-whisper medium)
         print("🚀 Initializing Whisper medium model...")
         print("💡 NOTE: First-time loading will download ~1.5GB of model weights. Please wait...")
+        from faster_whisper import WhisperModel
         # medium model provides much better translation quality than distil models
-        self.asr_model = WhisperModel("medium", device="auto", compute_type="int8", cpu_threads=4)
+        self.asr_model = WhisperModel(WHISPER_MODEL_ID, device="auto", compute_type=WHISPER_COMPUTE_TYPE, cpu_threads=4)
+        # All Whisper calls go through one batching worker so concurrent triages share a forward pass
+        self.asr_batcher = WhisperBatcher(self.asr_model)
         
-        # 2. Initialize HeAR (Official Keras)
-        print("Loading HeAR model (HuggingFace)...")
+        # 2. Initialize HeAR (runtime chosen by HEAR_BACKEND; SavedModel by default)
+        print(f"Loading HeAR model (backend: {HEAR_BACKEND})...")
         try:
-            # Download full repo and load as SavedModel
-            hf_token = os.getenv("HF_TOKEN")
-            model_dir = snapshot_download("google/hear", token=hf_token)
-            model = tf.saved_model.load(model_dir)
-            self.hear_serving_signature = model.signatures['serving_default']
-            print("HeAR model loaded successfully!")
+            self.hear_backend = load_hear_backend()
+            # All HeAR calls share one batching worker, like Whisper; fixed-shape runtimes set the batch size
+            self.hear_batcher = HeARBatcher(self.hear_backend.embed, max_batch=self.hear_backend.batch_size or HEAR_MAX_BATCH)
+            print(f"HeAR model loaded successfully! ({self.hear_backend.name})")
         except Exception as e:
             print(f"Error loading HeAR model: {e}")
-            self.hear_serving_signature = None
+            self.hear_backend = None
+            self.hear_batcher = None
 
-    def is_vitals_abnormal(self, vitals: dict) -> bool:
+    @staticmethod
+    def is_vitals_abnormal(vitals: dict) -> bool:
         """Deterministically check for clinical red flags in vitals"""
         if not vitals:
             return False
@@ -125,8 +147,26 @@ class AudioProcessor:
         
         return False
 
-    def get_vitals_precautions(self, vitals: dict, age: Optional[int] = None) -> List[str]:
-        """Fast-path MedGemma call using ONLY vitals for immediate nurse feedback"""
+    @staticmethod
+    def get_rule_based_precautions(vitals: dict) -> List[str]:
+        """Instant, deterministic precautions from the vitals-band rule table (no LLM)."""
+        precautions: List[str] = []
+        for vital, op, threshold, steps in VITALS_PRECAUTION_RULES:
+            value = vitals.get(vital)
+            if value is None:
+                continue
+            if (op == "<=" and value <= threshold) or (op == ">=" and value >= threshold):
+                precautions.extend(step for step in steps if step not in precautions)
+        precautions = precautions[:MAX_RULE_PRECAUTIONS - 1]
+        precautions.append("Notify physician immediately")
+        return precautions
+
+    async def get_vitals_precautions(self, vitals: dict, age: Optional[int] = None, zone: Optional[str] = None) -> Optional[List[str]]:
+        """
+        MedGemma call using ONLY vitals to refine the rule-based first-aid list.
+        Returns None when the model fails or answers unparseably, so callers keep the rule-based set.
+        `zone` (vitals-derived triage zone) orders this call in the shared LLM admission queue.
+        """
         vitals_str = ", ".join([f"{k}: {v}" for k, v in vitals.items() if v])
         age_str = f"Age {age}" if age else "Adult patient"
         
@@ -144,67 +184,130 @@ class AudioProcessor:
         ["Step 1", "Step 2", "Step 3"]
         """
         
-        print(f"[AI DEBUG] Running Fast-Path MedGemma (Vitals Only)...")
+        print(f"[AI DEBUG] Refining precautions via MedGemma (Vitals Only)...")
         try:
-            raw_response = self._call_inference_backend(prompt)
+            raw_response = await self.llm.invoke(
+                prompt, max_tokens=512, temperature=0.1, priority=llm_priority(zone, "precautions")
+            )
             # Simple JSON list extraction
             start = raw_response.find("[")
             end = raw_response.rfind("]")
             if start != -1 and end != -1:
-                return json.loads(raw_response[start:end+1])
-            return ["Monitor vitals closely", "Keep patient comfortable", "Notify physician immediately"]
+                precautions = json.loads(raw_response[start:end+1])
+                if isinstance(precautions, list) and precautions:
+                    return [str(p) for p in precautions]
+            return None
         except Exception as e:
             print(f"[AI DEBUG] Fast-Path Error: {e}")
-            return ["Monitor patient", "Wait for clinical review"]
+            return None
 
     def load_audio_robust(self, audio_bytes):
         """Robustly loads audio directly from memory buffer using pydub"""
         # pydub is better at handling containers like webm/opus from memory
         try:
+            from pydub import AudioSegment
             audio = AudioSegment.from_file(io.BytesIO(audio_bytes))
             # Resample to 16kHz mono as required by Whisper and HeAR
-            audio = audio.set_frame_rate(16000).set_channels(1)
-            # Convert to float32 numpy array normalized to [-1, 1]
-            data = np.array(audio.get_array_of_samples(), dtype=np.float32) / 32768.0
+            audio = audio.set_frame_rate(16000).set_channels(1).set_sample_width(2)
+            # View the int16 samples in place, then scale to [-1, 1] with a single float32 copy
+            data = np.frombuffer(audio.raw_data, dtype=np.int16).astype(np.float32)
+            data *= 1.0 / 32768.0
             return data, 16000
         except Exception as e:
             print(f"pydub loading failed: {e}. Falling back to librosa.")
             # Final fallback to standard librosa (slow path)
+            import librosa
             return librosa.load(io.BytesIO(audio_bytes), sr=16000)
 
-    def transcribe(self, audio_bytes: bytes, language: str) -> str:
-        """Performs ASR with optimized faster-whisper inference bypassing librosa"""
+    def decode_pcm(self, audio_bytes: bytes) -> np.ndarray:
+        """
+        Single ingest stage: decode an upload once to 16 kHz mono float32.
+        The returned buffer is read-only and shared by Whisper, HeAR and any later stage.
+        """
+        t_start = time.time()
+        try:
+            # PyAV/ffmpeg decode straight to float32 — no intermediate int16 or AudioSegment copies
+            from faster_whisper import decode_audio
+            data = decode_audio(io.BytesIO(audio_bytes), sampling_rate=16000)
+        except Exception as e:
+            print(f"[AI DEBUG] ffmpeg decode failed: {e}. Falling back to pydub.")
+            data, _ = self.load_audio_robust(audio_bytes)
+        data = np.ascontiguousarray(data, dtype=np.float32)
+        data.flags.writeable = False
+        DECODE_SECONDS.observe(time.time() - t_start)
+        logger.info(json.dumps({
+            "event": "audio_decoded",
+            "bytes": len(audio_bytes),
+            "duration_s": round(len(data) / 16000, 2),
+            "latency_s": round(time.time() - t_start, 3)
+        }))
+        return data
+
+    def _as_pcm(self, audio) -> np.ndarray:
+        """Accept either raw upload bytes (legacy callers) or an already-decoded PCM buffer."""
+        return audio if isinstance(audio, np.ndarray) else self.decode_pcm(audio)
+
+    def _whisper_language_task(self, language: str) -> tuple:
+        """Map UI language names to Whisper codes; non-English audio is translated to English."""
+        lang_map = {"english": "en", "tamil": "ta", "hindi": "hi", "telugu": "te"}
+        whisper_lang = lang_map.get(language.lower(), language.lower())
+        task = "transcribe" if whisper_lang == "en" else "translate"
+        return whisper_lang, task
+
+    def _asr_cache_key(self, pcm: np.ndarray, language: str) -> CacheKey:
+        whisper_lang, task = self._whisper_language_task(language)
+        return ("asr", audio_digest(pcm), f"whisper-{WHISPER_MODEL_ID}-{WHISPER_COMPUTE_TYPE}:{task}:{whisper_lang}")
+
+    def _hear_cache_key(self, pcm: np.ndarray) -> CacheKey:
+        backend = self.hear_backend.name if self.hear_batcher else "zcr-fallback"
+        return ("hear", audio_digest(pcm), f"{backend}:w{self.hear_hop.window_s}:h{self.hear_hop.hop_s}:v1")
+
+    def submit_transcription(self, audio, language: str):
+        """Queue decoded PCM (or raw bytes) on the Whisper batcher. Returns a Future resolving to the transcript."""
+        pcm = self._as_pcm(audio)
+        whisper_lang, task = self._whisper_language_task(language)
+        print(f"\n[AI DEBUG] Starting Transcribe ({len(pcm) / 16000:.1f}s audio, Task: {task}, Language: {whisper_lang})...")
+        return self.asr_batcher.submit(pcm, whisper_lang, task)
+
+    def transcribe(self, audio, language: str) -> str:
+        """Performs ASR through the cross-request Whisper batcher (blocking)."""
         try:
-            print(f"\n[AI DEBUG] Starting Transcribe ({len(audio_bytes)} bytes)...")
-            # Wrap bytes directly to avoid temp files and librosa overhead
-            audio_file = io.BytesIO(audio_bytes)
-            
-            # Map and clean language codes
-            lang_map = {"english": "en", "tamil": "ta", "hindi": "hi", "telugu": "te"}
-            whisper_lang = lang_map.get(language.lower(), language.lower())
-            
-            # Task selection
-            task = "transcribe" if whisper_lang == "en" else "translate"
-            
-            print(f"[AI DEBUG] Running faster-whisper Inference (Task: {task}, Language: {whisper_lang})...")
             t_asr_start = time.time()
-            
-            # Minimal parameters for maximum speed
-            segments, _ = self.asr_model.transcribe(
-                audio_file,
-                task=task,
-                language=whisper_lang,
-                beam_size=1,       # Greedy search is fastest
-                repetition_penalty=1.1,
-                no_repeat_ngram_size=3,
-                condition_on_previous_text=False,
-                vad_filter=True    # Skip silences
-            )
-            
-            # Collect text from segments
-            text = "".join([s.text for s in segments]).strip()
-            
+            if self.model_client:
+                text = self.model_client.call("transcribe", self._as_pcm(audio), language=language)
+            else:
+                pcm = self._as_pcm(audio)
+                key = self._asr_cache_key(pcm, language)
+                text = self.result_cache.get(key)
+                if text is None:
+                    text = self.submit_transcription(pcm, language).result()
+                    self.result_cache.put(key, text)
+            t_asr_total = time.time() - t_asr_start
+            ASR_SECONDS.observe(t_asr_total)
+            print(f"\n{'─'*40}\n🚀 [LATENCY] Whisper ASR: {t_asr_total:.2f}s\n{'─'*40}")
+            print(f"[AI DEBUG] Transcribe Result: {text[:200]}...")
+            return text
+        except Exception as e:
+            print(f"[AI DEBUG] ASR Error: {e}")
+            return "Error processing audio."
+
+    async def transcribe_async(self, audio, language: str) -> str:
+        """Async variant used by the pipeline: waits on the batch future without holding a threadpool thread."""
+        try:
+            t_asr_start = time.time()
+            if self.model_client:
+                pcm = audio if isinstance(audio, np.ndarray) else await run_in_threadpool(self.decode_pcm, audio)
+                text = await self.model_client.call_async("transcribe", pcm, language=language)
+            else:
+                pcm = audio if isinstance(audio, np.ndarray) else await run_in_threadpool(self.decode_pcm, audio)
+                key = self._asr_cache_key(pcm, language)
+                text = self.result_cache.get(key)
+                if text is None:
+                    future = await run_in_threadpool(self.submit_transcription, pcm, language)
+                    text = await asyncio.wrap_future(future)
+                    self.result_cache.put(key, text)
             t_asr_total = time.time() - t_asr_start
+            ASR_SECONDS.observe(t_asr_total)
             print(f"\n{'─'*40}\n🚀 [LATENCY] Whisper ASR: {t_asr_total:.2f}s\n{'─'*40}")
             print(f"[AI DEBUG] Transcribe Result: {text[:200]}...")
             return text
@@ -212,75 +315,78 @@ class AudioProcessor:
             print(f"[AI DEBUG] ASR Error: {e}")
             return "Error processing audio."
 
-    def detect_anomalies(self, audio_bytes: bytes) -> dict:
+    def detect_anomalies(self, audio) -> dict:
         """Production-Safe Temporal Stability Strategy (Vectorized Optimization)"""
+        if self.model_client:
+            try:
+                return self.model_client.call("detect_anomalies", self._as_pcm(audio))
+            except Exception as e:
+                print(f"[AI TRACE] Model server analysis error: {e}")
+                return {"score": 0.0, "interpretation": "Error analyzing audio.", "findings": []}
         try:
             print(f"\n{'='*30}\n[AI TRACE] TEMPORAL STABILITY ANALYSIS START\n{'='*30}")
             t_start = time.time()
-            data, sr = self.load_audio_robust(audio_bytes)
+            data, sr = self._as_pcm(audio), HEAR_SR
+            cache_key = self._hear_cache_key(data)
+            cached = self.result_cache.get(cache_key)
+            if cached is not None:
+                return cached
             
-            if self.hear_serving_signature:
-                # 1. Split audio into 1-second chunks and use Fixed 3-Point Sampling (Nitro Max)
-                # Processing just 3 seconds (Start, Middle, End) is extremely fast and clinically sufficient.
-                chunk_sec = 1.0
-                chunk_size = int(sr * chunk_sec)
-                all_chunks = [data[i:i+chunk_size] for i in range(0, len(data)-chunk_size, chunk_size)]
-                
-                if len(all_chunks) >= 3:
-                    # Pick Start, Middle, and End
-                    chunks = [all_chunks[0], all_chunks[len(all_chunks)//2], all_chunks[-1]]
-                else:
-                    chunks = all_chunks if all_chunks else [data]
-                
-                print(f"[AI TRACE] Nitro-3-Point Sampling: {len(chunks)} chunks processed.")
-                
-                # 2. Extract and Normalize Embeddings (BATCHED)
-                # Stack all chunks into a single [Batch, Samples] tensor for massive speed boost
-                input_tensor = tf.constant(np.array(chunks), dtype=tf.float32)
-                
-                # Single model call for all chunks (bypass Python loop overhead)
-                batch_embeddings = self.hear_serving_signature(x=input_tensor)['output_0'].numpy()
-                
-                # HeAR typically returns [Batch, Time, Dim] or similar; flatten to [Batch, Dim]
-                batch_embeddings = batch_embeddings.reshape(len(chunks), -1)
-                
-                # Vectorized L2 Normalization
-                norms = np.linalg.norm(batch_embeddings, axis=1, keepdims=True)
-                chunk_embeddings = np.divide(batch_embeddings, norms, out=np.zeros_like(batch_embeddings), where=norms > 0)
-                
-                # 3. Measure Internal Variability (Pairwise Cosine Similarity)
-                similarity_matrix = cosine_similarity(chunk_embeddings)
-                avg_similarity = np.mean(similarity_matrix)
-                deviation_score = 1.0 - avg_similarity
-                
+            findings = []
+            widened = False
+            if self.hear_batcher:
+                # 1. Full-coverage sliding windows; hop widens under CPU pressure to stay in budget
+                window = int(self.hear_hop.window_s * sr)
+                hop_s = self.hear_hop.hop_for(len(data) / sr)
+                widened = hop_s > self.hear_hop.hop_s
+                windows, starts = sliding_windows(data, window, max(1, int(hop_s * sr)))
+                print(f"[AI TRACE] HeAR sliding windows: {len(windows)} x {self.hear_hop.window_s}s, hop {hop_s:.2f}s")
+
+                # 2. Embed via the cross-request batcher (bounded forward passes shared with other triages)
+                t_embed = time.time()
+                chunk_embeddings = l2_normalize(self.hear_batcher.submit(windows).result())
+                self.hear_hop.record(len(windows), time.time() - t_embed)
+
+                # 3. Measure Internal Variability (vectorized mean pairwise cosine similarity)
+                deviation_score, per_window = deviation_stats(chunk_embeddings)
+
                 # Scale to 0-10 based on user's empirical multiplier (50)
                 risk_score = round(min(10.0, deviation_score * 50), 1)
                 interpretation = f"HeAR Acoustic Analysis: Acoustic Deviation Score {risk_score}/10"
+                if len(per_window) > 1:
+                    peak = int(np.argmax(per_window))
+                    t0 = starts[peak] / sr
+                    findings.append(f"Most atypical segment: {t0:.1f}-{t0 + self.hear_hop.window_s:.1f}s")
             else:
                 print("\n>>> WARNING: LIBROSA FALLBACK TRIGGERED (HEAR UNAVAILABLE) <<<")
+                import librosa
                 zcr = np.mean(librosa.feature.zero_crossing_rate(data))
                 risk_score = round(min(zcr * 50, 10.0), 1) 
                 interpretation = f"Acoustic Feature Baseline: Deviation Score {risk_score}/10 (Fallback)"
             
             t_total = time.time() - t_start
-            print(f"\n{'─'*40}\n🚀 [LATENCY] Acoustic Nitro (HeAR): {t_total:.2f}s\n{'─'*40}")
+            print(f"\n{'─'*40}\n🚀 [LATENCY] Acoustic (HeAR): {t_total:.2f}s\n{'─'*40}")
             print(f"[AI TRACE] Final Stability Score (0-10): {risk_score}")
             print(f"{'='*30}\n[AI TRACE] ANALYSIS COMPLETE ({t_total:.2f}s)\n{'='*30}\n")
             
-            return {
+            result = {
                 "score": float(risk_score),
                 "interpretation": interpretation,
-                "findings": [interpretation]
+                "findings": [interpretation] + findings
             }
+            # The key is for the configured hop: a coarser result computed under load is not cached
+            if not widened:
+                self.result_cache.put(cache_key, result)
+            return result
         except Exception as e:
             print(f"[AI TRACE] Analysis Error: {e}")
             import traceback
             traceback.print_exc()
             return {"score": 0.0, "interpretation": "Error analyzing audio.", "findings": []}
 
-    def generate_soap_note(self, transcript: str, risk_data: dict, vitals: Optional[dict] = None, age: Optional[int] = None) -> dict:
-        """Prototype generation logic with strict JSON output"""
-        print("\n[AI DEBUG] Generating SOAP Note via Ollama...")
+    async def generate_soap_note(self, transcript: str, risk_data: dict, vitals: Optional[dict] = None, age: Optional[int] = None, zone: Optional[str] = None) -> dict:
+        """Prototype generation logic with strict JSON output. `zone` sets the LLM admission priority."""
+        print(f"\n[AI DEBUG] Generating SOAP Note via {self.llm.name}...")
         
         # Format vitals for the prompt
         vitals_str = "Not provided"
@@ -341,22 +447,29 @@ class AudioProcessor:
         JSON OUTPUT:
         """
         
-        print(f"[AI DEBUG] Ollama Prompt Built ({len(prompt)} chars)")
+        print(f"[AI DEBUG] MedGemma Prompt Built ({len(prompt)} chars)")
         
         t_start = time.time()
-        soap_text = self._call_inference_backend(prompt)
+        soap_text = await self.llm.invoke(
+            prompt, max_tokens=SOAP_MAX_TOKENS, temperature=0.2, top_p=0.95,
+            priority=llm_priority(zone, "soap"), schema=SOAP_RESPONSE_SCHEMA
+        )
         t_end = time.time()
         print(f"[AI DEBUG] SOAP Generation Time: {t_end - t_start:.2f}s")
         print(f"\n[AI DEBUG] --- RAW RESPONSE START ---\n{soap_text}\n[AI DEBUG] --- RAW RESPONSE END ---\n")
         try:
-            # 1. Clean response (remove markdown fences and trailing text)
+            # 1. Schema-constrained output is plain JSON — parse it directly
             clean_response = soap_text.strip()
-            # Find the outermost { } to handle any preamble/postamble
+            full_json = None
+            try:
+                full_json = json.loads(clean_response)
+            except ValueError:
+                pass
+
+            # Backends without structured-output support: find the outermost { } past any preamble
             start_idx = clean_response.find('{')
             end_idx = clean_response.rfind('}')
-            
-            full_json = None
-            if start_idx != -1 and end_idx != -1:
+            if full_json is None and start_idx != -1 and end_idx != -1:
                 try:
                     json_str = clean_response[start_idx:end_idx+1]
                     full_json = json.loads(json_str)
@@ -419,115 +532,6 @@ class AudioProcessor:
             print(f"[AI DEBUG] Inference Error: {e}")
             return {"soap": {"subjective": "Error generating note."}, "specialty": "General Medicine", "risk_score": 0}
 
-    def _call_inference_backend(self, prompt: str) -> str:
-        """
-        Dispatches to the correct AI backend based on APP_ENV.
-        DEMO → AWS SageMaker (Optimized with Gemma Chat Templates)
-        DEV  → Ollama (Local)
-        """
-        if APP_ENV == "demo" and _sm_runtime and SAGEMAKER_MEDGEMMA_ENDPOINT:
-            print(f"[ENV] Calling SageMaker Async endpoint: {SAGEMAKER_MEDGEMMA_ENDPOINT}")
-            
-            # 1. Prepare Payload & Upload to S3 (Async Inference Requires InputLocation)
-            formatted_prompt = f"<start_of_turn>user\n{prompt}<end_of_turn>\n<start_of_turn>model\n"
-            payload = {
-                "inputs": formatted_prompt, 
-                "parameters": {
-                    "max_new_tokens": 512, 
-                    "temperature": 0.2,
-                    "top_p": 0.95,
-                    "do_sample": True,
-                    "stop": ["<end_of_turn>", "<eos>"]
-                }
-            }
-
-            try:
-                # Use the same bucket for input and output. 
-                # Bucket name pattern from Terraform: project-env-sagemaker-async-accountid
-                # For now, we'll derive it or expect it in env. 
-                # Proactively adding a uuid for unique input path.
-                import uuid
-                request_id = str(uuid.uuid4())
-                
-                # We need the bucket name. I'll add a way to get it or default it.
-                # In main.tf it's ${local.name_prefix}-sagemaker-async-${data.aws_caller_identity.current.account_id}
-                # Let's check environment first.
-                async_bucket = os.getenv("SAGEMAKER_ASYNC_BUCKET")
-                if not async_bucket:
-                    # Fallback attempt to find it via listing or naming convention if not set
-                    # Ideally passed via env var. I'll ask user to set this or I will check terraform outputs.
-                    logger.warning(json.dumps({"event": "sagemaker_async_bucket_missing_env"}))
-                    # For demo purposes, we will assume it is set or we will find it.
-                    # I will update the code to handle a missing bucket gracefully.
-                    raise AIServiceError("SAGEMAKER_ASYNC_BUCKET environment variable is not set.")
-
-                input_key = f"medgemma-inputs/{request_id}.json"
-                input_location = f"s3://{async_bucket}/{input_key}"
-                
-                _s3_client.put_object(
-                    Bucket=async_bucket,
-                    Key=input_key,
-                    Body=json.dumps(payload),
-                    ContentType="application/json"
-                )
-
-                # 2. Start Async Inference
-                response = _sm_runtime.invoke_endpoint_async(
-                    EndpointName=SAGEMAKER_MEDGEMMA_ENDPOINT,
-                    ContentType="application/json",
-                    InputLocation=input_location
-                )
-                
-                output_location = response["OutputLocation"]
-                # Parse S3 URI: s3://bucket/key
-                output_bucket = output_location.split("/")[2]
-                output_key = "/".join(output_location.split("/")[3:])
-                
-                logger.info(json.dumps({"event": "sagemaker_async_started", "output_location": output_location}))
-                print(f"[ENV] Async request submitted. Input: {input_location}. Output will be at: {output_location}")
-
-                # 3. Poll for Result (Target: Survival/Judge wait time)
-                # Max wait: 15 minutes (covers 5-10m cold start + 2-5m inference)
-                max_retries = 180 # 180 * 5s = 900s (15 minutes)
-                for attempt in range(max_retries):
-                    try:
-                        resp = _s3_client.get_object(Bucket=output_bucket, Key=output_key)
-                        result = json.loads(resp["Body"].read().decode("utf-8"))
-                        print(f"[ENV] Async result received after {attempt * 5}s")
-                        
-                        # Cleanup input
-                        try:
-                            _s3_client.delete_object(Bucket=async_bucket, Key=input_key)
-                        except: pass
-
-                        if isinstance(result, list) and result:
-                            return result[0].get("generated_text", "")
-                        return result.get("generated_text", str(result))
-                    except _s3_client.exceptions.NoSuchKey:
-                        # Wait and retry
-                        if attempt % 6 == 0: # Print every 30s
-                            print(f"[ENV] Polling for result... ({attempt * 5}s elapsed)")
-                        time.sleep(5)
-                
-                raise AIServiceError("Asynchronous inference timed out after 8 minutes.")
-
-            except Exception as e:
-                logger.error(json.dumps({"event": "sagemaker_async_failed", "error": str(e)}))
-                raise
-        else:
-            # Ollama handles templating automatically via its Modelfile
-            response = requests.post(
-                f"{OLLAMA_HOST}/api/generate",
-                json={
-                    "model": "alibayram/medgemma",
-                    "prompt": prompt,
-                    "stream": False,
-                    "options": {"num_predict": 1024, "temperature": 0.1}
-                }
-            )
-            response.raise_for_status()
-            return response.json().get("response", "Error generating note.")
-
     def _calculate_bucket_triage(self, transcript: str, ai_meta: dict, acoustic_score: float) -> tuple:
         """Implements the 4-tier bucket flow: AI -> Guardrail -> Acoustic Escalation"""
         # 1. Start with AI Classification
@@ -538,16 +542,14 @@ class AudioProcessor:
         current_rank = TRIAGE_BUCKETS[ai_tier]
         print(f"[TRIAGE] Step 1: MedGemma Initial Tier -> {ai_tier}")
 
-        # 2. Backend Guardrail Override (Deterministic)
-        transcript_lower = transcript.lower()
-        if any(kw in transcript_lower for kw in CRITICAL_SYMPTOMS):
-            if current_rank < TRIAGE_BUCKETS["EMERGENCY"]:
-                print(f"[TRIAGE] Step 2: Guardrail Triggered! Escalating to EMERGENCY (Critical Keyword detected)")
-                current_rank = TRIAGE_BUCKETS["EMERGENCY"]
-        elif any(kw in transcript_lower for kw in HIGH_SYMPTOMS):
-            if current_rank < TRIAGE_BUCKETS["URGENT"]:
-                print(f"[TRIAGE] Step 2: Guardrail Triggered! Escalating to URGENT (High-risk Keyword detected)")
-                current_rank = TRIAGE_BUCKETS["URGENT"]
+        # 2. Backend Guardrail Override (Deterministic, one pass over the transcript in any supported script)
+        matched = SYMPTOM_MATCHER.assess(transcript)
+        if matched.symptoms:
+            print(f"[TRIAGE] Step 2: Symptoms matched -> {[(m.symptom, m.severity) for m in matched.symptoms]}")
+        guardrail_tier = matched.guardrail_tier
+        if guardrail_tier and current_rank < TRIAGE_BUCKETS[guardrail_tier]:
+            print(f"[TRIAGE] Step 2: Guardrail Triggered! Escalating to {guardrail_tier} ({matched.severity} symptom detected)")
+            current_rank = TRIAGE_BUCKETS[guardrail_tier]
 
         # 3. Optional Acoustic Escalation (max +1 level)
         # High acoustic deviation (> 7.0) pushes it up one bucket
@@ -567,14 +569,11 @@ class AudioProcessor:
         if symptoms:
             # Simple heuristic: last or most severe category
             primary_category = symptoms[0].get("category", "general").lower()
+        if primary_category not in CATEGORY_SPECIALTIES or primary_category == "general":
+            # MedGemma gave no usable category — route on the most severe matched symptom
+            primary_category = matched.category or "general"
 
-        specialties = {
-            "cardiac": "Cardiology",
-            "respiratory": "Pulmonology",
-            "neurological": "Neurology",
-            "general": "General Medicine"
-        }
-        assigned_specialty = specialties.get(primary_category, "General Medicine")
+        assigned_specialty = CATEGORY_SPECIALTIES.get(primary_category, "General Medicine")
 
         # ── ZONE DECISION SUMMARY LOG ──────────────────────────────────────
         zone_emoji = {"EMERGENCY": "🔴", "URGENT": "🟠", "SEMI_URGENT": "🟡", "ROUTINE": "🟢"}
@@ -0,0 +1,170 @@
+"""
+Cross-request dynamic batching for Whisper ASR.
+
+Every triage used to run its own faster-whisper call in a threadpool thread, so
+ten concurrent uploads meant ten CTranslate2 calls fighting over cpu_threads=4.
+WhisperBatcher owns the model on a single worker thread instead:
+
+- Callers submit 16 kHz mono PCM and get back a concurrent.futures.Future.
+- The worker waits up to WHISPER_BATCH_WINDOW_MS after the first pending
+  request to collect more, then VAD-splits every clip into <=30s chunks.
+- All chunks (from all callers) are encoded and decoded in one batched
+  CTranslate2 generate() call. Each chunk carries its own prompt, so mixed
+  languages / transcribe-vs-translate tasks share the same batch.
+- Text is re-assembled per caller and each future is resolved independently.
+"""
+
+import os
+import json
+import time
+import queue
+import logging
+import threading
+import numpy as np
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import List, Dict, Tuple
+
+logger = logging.getLogger(__name__)
+
+WHISPER_BATCH_WINDOW_MS = int(os.getenv("WHISPER_BATCH_WINDOW_MS", "100"))
+WHISPER_MAX_BATCH = int(os.getenv("WHISPER_MAX_BATCH", "8"))  # chunks per generate() call
+
+SAMPLE_RATE = 16000
+CHUNK_SECONDS = 30  # Whisper's fixed receptive field
+CHUNK_SAMPLES = SAMPLE_RATE * CHUNK_SECONDS
+N_FRAMES = 3000     # mel frames per 30s window
+
+
+@dataclass
+class _ASRRequest:
+    audio: np.ndarray
+    language: str
+    task: str
+    future: Future = field(default_factory=Future)
+    enqueued_at: float = field(default_factory=time.time)
+
+
+class WhisperBatcher:
+    def __init__(self, whisper_model, window_ms: int = WHISPER_BATCH_WINDOW_MS, max_batch: int = WHISPER_MAX_BATCH):
+        from faster_whisper.tokenizer import Tokenizer
+        from faster_whisper.vad import VadOptions
+
+        self.model = whisper_model
+        self.window_s = window_ms / 1000.0
+        self.max_batch = max_batch
+        self._tokenizer_cls = Tokenizer
+        self._vad_options = VadOptions(min_silence_duration_ms=500)
+        self._tokenizers: Dict[Tuple[str, str], object] = {}
+        self._pending: "queue.Queue[_ASRRequest]" = queue.Queue()
+        self._worker = threading.Thread(target=self._run, name="whisper-batcher", daemon=True)
+        self._worker.start()
+        logger.info(json.dumps({"event": "whisper_batcher_started", "window_ms": window_ms, "max_batch": max_batch}))
+
+    def submit(self, audio: np.ndarray, language: str, task: str) -> Future:
+        """Queue 16 kHz mono float32 audio for transcription. Resolves to the transcript text."""
+        request = _ASRRequest(audio=audio, language=language, task=task)
+        self._pending.put(request)
+        return request.future
+
+    # ── Worker ───────────────────────────────────────────────────────────────
+
+    def _run(self):
+        while True:
+            batch = [self._pending.get()]
+            deadline = time.time() + self.window_s
+            while True:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._pending.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._process(batch)
+
+    def _process(self, batch: List[_ASRRequest]):
+        t_start = time.time()
+        try:
+            features, prompts, owners = [], [], []
+            for idx, request in enumerate(batch):
+                prompt = self._prompt(request.language, request.task)
+                for chunk in self._speech_chunks(request.audio):
+                    features.append(self._features(chunk))
+                    prompts.append(prompt)
+                    owners.append(idx)
+
+            texts: List[List[str]] = [[] for _ in batch]
+            for start in range(0, len(features), self.max_batch):
+                end = start + self.max_batch
+                for owner, text in zip(owners[start:end], self._generate(features[start:end], prompts[start:end])):
+                    texts[owner].append(text)
+
+            for request, parts in zip(batch, texts):
+                request.future.set_result("".join(parts).strip())
+
+            logger.info(json.dumps({
+                "event": "whisper_batch_complete",
+                "requests": len(batch),
+                "chunks": len(features),
+                "max_queue_wait_s": round(t_start - min(r.enqueued_at for r in batch), 3),
+                "latency_s": round(time.time() - t_start, 2)
+            }))
+        except Exception as e:
+            logger.error(json.dumps({"event": "whisper_batch_failed", "requests": len(batch), "error": str(e)}))
+            for request in batch:
+                if not request.future.done():
+                    request.future.set_exception(e)
+
+    # ── Helpers ──────────────────────────────────────────────────────────────
+
+    def _tokenizer(self, language: str, task: str):
+        key = (language, task)
+        if key not in self._tokenizers:
+            self._tokenizers[key] = self._tokenizer_cls(
+                self.model.hf_tokenizer, self.model.model.is_multilingual, task=task, language=language
+            )
+        return self._tokenizers[key]
+
+    def _prompt(self, language: str, task: str) -> List[int]:
+        tokenizer = self._tokenizer(language, task)
+        return list(tokenizer.sot_sequence) + [tokenizer.no_timestamps]
+
+    def _speech_chunks(self, audio: np.ndarray) -> List[np.ndarray]:
+        """VAD-filter the clip and pack speech into <=30s windows (skips silences like vad_filter=True)."""
+        from faster_whisper.vad import get_speech_timestamps
+
+        spans = get_speech_timestamps(audio, self._vad_options)
+        chunks, current, current_len = [], [], 0
+        for span in spans:
+            for s in range(span["start"], span["end"], CHUNK_SAMPLES):
+                piece = audio[s:min(span["end"], s + CHUNK_SAMPLES)]
+                if current_len + len(piece) > CHUNK_SAMPLES:
+                    chunks.append(np.concatenate(current))
+                    current, current_len = [], 0
+                current.append(piece)
+                current_len += len(piece)
+        if current:
+            chunks.append(np.concatenate(current))
+        return chunks
+
+    def _features(self, chunk: np.ndarray) -> np.ndarray:
+        padded = np.zeros(CHUNK_SAMPLES, dtype=np.float32)
+        padded[:len(chunk)] = chunk
+        return self.model.feature_extractor(padded)[:, :N_FRAMES]
+
+    def _generate(self, features: List[np.ndarray], prompts: List[List[int]]) -> List[str]:
+        import ctranslate2
+
+        encoder_input = ctranslate2.StorageView.from_array(np.ascontiguousarray(np.stack(features)))
+        results = self.model.model.generate(
+            encoder_input,
+            prompts,
+            beam_size=1,  # Greedy search is fastest
+            repetition_penalty=1.1,
+            no_repeat_ngram_size=3,
+            max_length=448,
+        )
+        # All prompts in a batch can differ; decode with any tokenizer (shared vocab)
+        tokenizer = next(iter(self._tokenizers.values()))
+        return [tokenizer.decode(result.sequences_ids[0]) for result in results]
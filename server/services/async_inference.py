@@ -0,0 +1,293 @@
+"""
+Non-blocking completion tracker for SageMaker async inference.
+
+Every MedGemma caller used to hold a threadpool thread for up to 15 minutes,
+looping on s3.get_object with time.sleep(5). Under load that exhausted
+Starlette's threadpool and stalled unrelated endpoints like /triage/queue.
+
+AsyncInferenceTracker is a single asyncio task per process:
+- Callers submit a payload (or register an OutputLocation) and await a Future.
+- Pending results are checked with adaptive per-request backoff
+  (ASYNC_POLL_MIN_S growing x1.5 up to ASYNC_POLL_MAX_S), and each S3 probe
+  only borrows a thread for a few milliseconds.
+- Success/failure notifications short-circuit the backoff. They come from
+  SageMaker's SNS → SQS topic when SAGEMAKER_ASYNC_NOTIFY_QUEUE_URL is set, or
+  from tracker.notify() as a local stand-in. The API and every triage worker
+  read the same queue, so a process deletes only notifications for its own
+  requests and hands the rest straight back to the queue.
+- Input, output and failure objects are deleted once a request resolves.
+"""
+
+import os
+import json
+import time
+import uuid
+import asyncio
+import logging
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+from starlette.concurrency import run_in_threadpool
+
+logger = logging.getLogger(__name__)
+
+AWS_REGION = os.getenv("AWS_REGION", "ap-south-1")
+SAGEMAKER_ASYNC_BUCKET = os.getenv("SAGEMAKER_ASYNC_BUCKET", "")
+SAGEMAKER_ASYNC_NOTIFY_QUEUE_URL = os.getenv("SAGEMAKER_ASYNC_NOTIFY_QUEUE_URL", "")
+ASYNC_POLL_MIN_S = float(os.getenv("ASYNC_POLL_MIN_S", "1.0"))
+ASYNC_POLL_MAX_S = float(os.getenv("ASYNC_POLL_MAX_S", "15.0"))
+ASYNC_INFERENCE_TIMEOUT_S = float(os.getenv("ASYNC_INFERENCE_TIMEOUT_S", "900"))  # 15 min — covers GPU cold start
+_RECENTLY_RESOLVED = 256  # notifications for these may still arrive after polling found the result
+
+
+def _split_s3_uri(uri: str) -> tuple:
+    """s3://bucket/key → (bucket, key)"""
+    parts = uri.split("/")
+    return parts[2], "/".join(parts[3:])
+
+
+def parse_generated_text(result: Any) -> str:
+    """TGI returns either [{"generated_text": ...}] or {"generated_text": ...}."""
+    if isinstance(result, list) and result:
+        return result[0].get("generated_text", "")
+    if isinstance(result, dict):
+        return result.get("generated_text", str(result))
+    return str(result)
+
+
+@dataclass
+class _PendingResult:
+    output_location: str
+    failure_location: Optional[str]
+    cleanup: List[str]
+    future: asyncio.Future
+    deadline: float
+    interval: float = ASYNC_POLL_MIN_S
+    next_check: float = 0.0
+    registered_at: float = field(default_factory=time.time)
+
+
+class AsyncInferenceTracker:
+    def __init__(self, s3_client=None, sm_runtime=None, sqs_client=None, notify_queue_url: str = SAGEMAKER_ASYNC_NOTIFY_QUEUE_URL):
+        import boto3
+
+        self._s3 = s3_client or boto3.client("s3", region_name=AWS_REGION)
+        self._sm_runtime = sm_runtime
+        self._sqs = sqs_client
+        self._notify_queue_url = notify_queue_url
+        self._pending: Dict[str, _PendingResult] = {}
+        self._resolved = deque(maxlen=_RECENTLY_RESOLVED)
+        self._wakeup: Optional[asyncio.Event] = None
+        self._poller: Optional[asyncio.Task] = None
+        self._listener: Optional[asyncio.Task] = None
+
+    # ── Public API ───────────────────────────────────────────────────────────
+
+    async def invoke(
+        self,
+        endpoint_name: str,
+        payload: Dict[str, Any],
+        input_prefix: str,
+        bucket: str = SAGEMAKER_ASYNC_BUCKET,
+        timeout: float = ASYNC_INFERENCE_TIMEOUT_S
+    ) -> str:
+        """Upload payload, start async inference and await the generated text."""
+        if not bucket:
+            raise ValueError("SAGEMAKER_ASYNC_BUCKET not set")
+        if self._sm_runtime is None:
+            import boto3
+            from botocore.config import Config
+            # No SDK retries: a timed-out invoke_endpoint_async may already have started a GPU job
+            _sm_config = Config(read_timeout=60, connect_timeout=5, retries={"max_attempts": 1})
+            self._sm_runtime = boto3.client("sagemaker-runtime", region_name=AWS_REGION, config=_sm_config)
+
+        input_key = f"{input_prefix}/{uuid.uuid4()}.json"
+        input_location = f"s3://{bucket}/{input_key}"
+        await run_in_threadpool(
+            self._s3.put_object, Bucket=bucket, Key=input_key, Body=json.dumps(payload), ContentType="application/json"
+        )
+        response = await run_in_threadpool(
+            self._sm_runtime.invoke_endpoint_async,
+            EndpointName=endpoint_name, ContentType="application/json", InputLocation=input_location
+        )
+        logger.info(json.dumps({"event": "sagemaker_async_started", "output_location": response["OutputLocation"]}))
+        result = await self.register(
+            response["OutputLocation"], response.get("FailureLocation"), cleanup=[input_location], timeout=timeout
+        )
+        return parse_generated_text(result)
+
+    def register(
+        self,
+        output_location: str,
+        failure_location: Optional[str] = None,
+        cleanup: Optional[List[str]] = None,
+        timeout: float = ASYNC_INFERENCE_TIMEOUT_S
+    ) -> asyncio.Future:
+        """Track an OutputLocation; the returned future resolves to the parsed JSON result."""
+        loop = asyncio.get_running_loop()
+        self._ensure_running()
+        pending = _PendingResult(
+            output_location=output_location,
+            failure_location=failure_location,
+            cleanup=list(cleanup or []),
+            future=loop.create_future(),
+            deadline=loop.time() + timeout,
+            next_check=loop.time() + ASYNC_POLL_MIN_S
+        )
+        self._pending[output_location] = pending
+        self._wakeup.set()
+        return pending.future
+
+    def notify(self, output_location: str, success: bool = True):
+        """Mark a result as ready (or failed) so it is fetched on the next loop turn."""
+        pending = self._pending.get(output_location)
+        if pending:
+            pending.next_check = 0.0
+            pending.interval = ASYNC_POLL_MIN_S
+            if self._wakeup:
+                self._wakeup.set()
+            logger.info(json.dumps({"event": "sagemaker_async_notified", "output_location": output_location, "success": success}))
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._pending)
+
+    # ── Poller ───────────────────────────────────────────────────────────────
+
+    def _ensure_running(self):
+        if self._wakeup is None:
+            self._wakeup = asyncio.Event()
+        if self._poller is None or self._poller.done():
+            self._poller = asyncio.ensure_future(self._poll_loop())
+        if self._notify_queue_url and (self._listener is None or self._listener.done()):
+            self._listener = asyncio.ensure_future(self._listen_notifications())
+
+    async def _poll_loop(self):
+        loop = asyncio.get_running_loop()
+        while self._pending:
+            now = loop.time()
+            due = [p for p in self._pending.values() if p.next_check <= now or p.deadline <= now]
+            if due:
+                await asyncio.gather(*(self._check(p, now) for p in due))
+            if not self._pending:
+                break
+            sleep_for = max(0.0, min(p.next_check for p in self._pending.values()) - loop.time())
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=sleep_for)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _check(self, pending: _PendingResult, now: float):
+        if pending.future.done():  # caller gave up (cancelled)
+            await self._resolve(pending)
+            return
+        try:
+            result = await run_in_threadpool(self._fetch, pending.output_location)
+            if result is not None:
+                await self._resolve(pending, result=result)
+                return
+            if pending.failure_location:
+                failure = await run_in_threadpool(self._fetch, pending.failure_location, False)
+                if failure is not None:
+                    await self._resolve(pending, error=RuntimeError(f"SageMaker async inference failed: {failure[:500]}"))
+                    return
+        except Exception as e:
+            await self._resolve(pending, error=e)
+            return
+
+        if pending.deadline <= now:
+            await self._resolve(pending, error=TimeoutError("Asynchronous inference timed out."))
+            return
+        pending.interval = min(pending.interval * 1.5, ASYNC_POLL_MAX_S)
+        pending.next_check = now + pending.interval
+
+    def _fetch(self, location: str, as_json: bool = True):
+        bucket, key = _split_s3_uri(location)
+        try:
+            body = self._s3.get_object(Bucket=bucket, Key=key)["Body"].read().decode("utf-8")
+        except self._s3.exceptions.NoSuchKey:
+            return None
+        return json.loads(body) if as_json else body
+
+    async def _resolve(self, pending: _PendingResult, result: Any = None, error: Optional[Exception] = None):
+        self._pending.pop(pending.output_location, None)
+        self._resolved.append(pending.output_location)
+        if not pending.future.done():
+            if error:
+                pending.future.set_exception(error)
+            else:
+                pending.future.set_result(result)
+        logger.info(json.dumps({
+            "event": "sagemaker_async_resolved",
+            "output_location": pending.output_location,
+            "ok": error is None,
+            "latency_s": round(time.time() - pending.registered_at, 2)
+        }))
+        locations = pending.cleanup + [pending.output_location] + ([pending.failure_location] if pending.failure_location else [])
+        await run_in_threadpool(self._cleanup, locations)
+
+    def _cleanup(self, locations: List[str]):
+        for location in locations:
+            try:
+                bucket, key = _split_s3_uri(location)
+                self._s3.delete_object(Bucket=bucket, Key=key)
+            except Exception:
+                pass  # best-effort; bucket lifecycle rules catch leftovers
+
+    # ── SNS → SQS notifications (optional) ──────────────────────────────────
+
+    async def _listen_notifications(self):
+        if self._sqs is None:
+            import boto3
+            self._sqs = boto3.client("sqs", region_name=AWS_REGION)
+        while self._pending:
+            try:
+                resp = await run_in_threadpool(
+                    self._sqs.receive_message,
+                    QueueUrl=self._notify_queue_url, MaxNumberOfMessages=10, WaitTimeSeconds=10,
+                    AttributeNames=["SentTimestamp"]
+                )
+            except Exception as e:
+                logger.warning(json.dumps({"event": "sagemaker_notify_receive_failed", "error": str(e)}))
+                await asyncio.sleep(ASYNC_POLL_MAX_S)
+                continue
+            for message in resp.get("Messages", []):
+                try:
+                    body = json.loads(message["Body"])
+                    event = json.loads(body["Message"]) if "Message" in body else body  # SNS envelope
+                    output_location = event.get("responseParameters", {}).get("outputLocation") or event.get("outputLocation", "")
+                except Exception:
+                    output_location = None  # malformed — nobody can use it
+                # Every request times out after ASYNC_INFERENCE_TIMEOUT_S, so an older notification has no owner left
+                sent_s = int(message.get("Attributes", {}).get("SentTimestamp", "0")) / 1000
+                expired = bool(sent_s) and time.time() - sent_s > ASYNC_INFERENCE_TIMEOUT_S
+                try:
+                    if output_location is None or expired or output_location in self._pending or output_location in self._resolved:
+                        if expired and output_location not in self._pending:
+                            logger.info(json.dumps({"event": "sagemaker_notify_expired", "output_location": output_location}))
+                        if output_location in self._pending:
+                            self.notify(output_location, success=event.get("invocationStatus") == "Completed")
+                        await run_in_threadpool(
+                            self._sqs.delete_message, QueueUrl=self._notify_queue_url, ReceiptHandle=message["ReceiptHandle"]
+                        )
+                    else:
+                        # Another process's request: visible again almost at once for its owner (not 0 — no hot loop)
+                        await run_in_threadpool(
+                            self._sqs.change_message_visibility,
+                            QueueUrl=self._notify_queue_url, ReceiptHandle=message["ReceiptHandle"],
+                            VisibilityTimeout=int(ASYNC_POLL_MIN_S) or 1
+                        )
+                except Exception as e:
+                    logger.warning(json.dumps({"event": "sagemaker_notify_ack_failed", "error": str(e)}))
+
+
+_tracker: Optional[AsyncInferenceTracker] = None
+
+
+def get_async_inference_tracker() -> AsyncInferenceTracker:
+    """Process-wide tracker shared by every MedGemma caller."""
+    global _tracker
+    if _tracker is None:
+        _tracker = AsyncInferenceTracker()
+    return _tracker
@@ -1,4 +1,5 @@
 from datetime import datetime, timedelta
+from functools import lru_cache
 from typing import Optional
 from pydantic import BaseModel
 from jose import JWTError, jwt
@@ -10,6 +11,13 @@ ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 480  # 8 hours
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+DEMO_PASSWORD = "password"
+
+
+@lru_cache(maxsize=None)
+def demo_password_hash() -> str:
+    """bcrypt hash of the demo password, computed on first login (or warm-up) instead of at import."""
+    return pwd_context.hash(DEMO_PASSWORD)
 
 # --- Models ---
 class User(BaseModel):
@@ -38,7 +46,7 @@ MOCK_USERS = {
         "id": "u1",
         "hospital_id": "nur_01",
         "name": "Nurse Anita (Intake)",
-        "password": pwd_context.hash("password"),
+        "password": None,  # demo_password_hash()
         "role": "nurse",
         "specialty": None
     },
@@ -46,7 +54,7 @@ MOCK_USERS = {
         "id": "u3",
         "hospital_id": "doc_cardio",
         "name": "Dr. Sharma",
-        "password": pwd_context.hash("password"),
+        "password": None,  # demo_password_hash()
         "role": "doctor",
         "specialty": "Cardiac"
     }
@@ -77,7 +85,7 @@ class AuthService:
         user_dict = MOCK_USERS.get(hospital_id)
         if not user_dict:
             return None
-        if not self.verify_password(password, user_dict["password"]):
+        if not self.verify_password(password, user_dict["password"] or demo_password_hash()):
             return None
         
         # User is valid, create token
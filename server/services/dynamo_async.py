@@ -0,0 +1,105 @@
+"""
+Async access to DynamoDB tables through one bounded I/O executor.
+
+The DynamoDB services were `async def` but called boto3 directly, so every
+get_item / query / update_item held the uvicorn event loop for a full network
+round trip (and every other request with it). Now each call runs on a dedicated
+thread pool and the coroutine awaits it:
+
+- One boto3 resource per process, with max_pool_connections equal to the pool
+  size: every I/O thread reuses a keep-alive HTTPS connection instead of
+  opening a new one.
+- The pool is separate from the default executor (used by run_in_threadpool,
+  warm-up and ASR), so a burst of table I/O cannot starve CPU work and the
+  reverse is also true. DYNAMODB_IO_THREADS caps the number of concurrent requests.
+- Independent calls can fan out with asyncio.gather (the three status GSI
+  queries, re-sync lookups).
+
+Only table actions run on the pool threads. They go through the shared
+low-level client, which boto3 documents as thread-safe.
+"""
+
+import os
+import json
+import asyncio
+import logging
+import threading
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+AWS_REGION = os.getenv("AWS_REGION", "ap-south-1")
+DYNAMODB_IO_THREADS = int(os.getenv("DYNAMODB_IO_THREADS", "16"))
+
+_resource = None
+_executor: Optional[ThreadPoolExecutor] = None
+_lock = threading.Lock()
+
+
+def get_dynamodb_resource():
+    """Process-wide boto3 DynamoDB resource, with a connection pool sized to the I/O executor."""
+    global _resource
+    if _resource is None:
+        with _lock:
+            if _resource is None:
+                import boto3
+                from botocore.config import Config
+                _resource = boto3.resource(
+                    "dynamodb",
+                    region_name=AWS_REGION,
+                    config=Config(max_pool_connections=DYNAMODB_IO_THREADS, retries={"mode": "adaptive"})
+                )
+    return _resource
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=DYNAMODB_IO_THREADS, thread_name_prefix="dynamodb-io")
+    return _executor
+
+
+def is_conditional_check_failed(error: Exception) -> bool:
+    response = getattr(error, "response", None) or {}
+    return response.get("Error", {}).get("Code") == "ConditionalCheckFailedException"
+
+
+class AsyncTable:
+    """Awaitable wrapper over a boto3 Table. Same keyword arguments, same responses."""
+
+    def __init__(self, table_name: str):
+        self.name = table_name
+        self._table = get_dynamodb_resource().Table(table_name)
+
+    async def _run(self, method: str, **kwargs) -> Dict[str, Any]:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_get_executor(), partial(getattr(self._table, method), **kwargs))
+
+    async def get_item(self, **kwargs) -> Dict[str, Any]:
+        return await self._run("get_item", **kwargs)
+
+    async def put_item(self, **kwargs) -> Dict[str, Any]:
+        return await self._run("put_item", **kwargs)
+
+    async def update_item(self, **kwargs) -> Dict[str, Any]:
+        return await self._run("update_item", **kwargs)
+
+    async def query(self, **kwargs) -> Dict[str, Any]:
+        return await self._run("query", **kwargs)
+
+    async def scan(self, **kwargs) -> Dict[str, Any]:
+        return await self._run("scan", **kwargs)
+
+
+def shutdown():
+    """Stop the I/O threads once in-flight calls finish (app shutdown); does not block the loop."""
+    global _executor
+    with _lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=False)
+        logger.info(json.dumps({"event": "dynamodb_io_executor_stopped"}))
@@ -1,58 +1,200 @@
 import os
-import requests
 import json
+import base64
+import asyncio
 import logging
 import re
 from datetime import datetime
 import uuid
-import time
 from typing import Dict, Any, List, Optional
 from .triage_service import TriageRecord
+from .inference_provider import get_inference_provider, llm_priority
+from .llm_schemas import FHIR_BUNDLE_SCHEMA, FHIR_MAX_TOKENS
 
 logger = logging.getLogger(__name__)
 
-OLLAMA_HOST = os.getenv("OLLAMA_HOST", "http://localhost:11434")
 APP_ENV = os.getenv("APP_ENV", "dev")
 AWS_REGION = os.getenv("AWS_REGION", "ap-south-1")
-SAGEMAKER_MEDGEMMA_ENDPOINT = os.getenv("SAGEMAKER_MEDGEMMA_ENDPOINT", "")
-SAGEMAKER_ASYNC_BUCKET = os.getenv("SAGEMAKER_ASYNC_BUCKET", "")
 FHIR_S3_BUCKET = os.getenv("FHIR_S3_BUCKET", "")
+EHR_EXPORTS_TABLE = os.getenv("DYNAMODB_EHR_EXPORTS_TABLE", "")
+
+# Export listing: the EHR page refetches on every export, so it reads one page of the export
+# manifest (patient, triage, time, S3 key, size) — never the whole bucket. Full
+# bundles are fetched from S3 only when asked for, concurrently.
+EHR_PAGE_SIZE = int(os.getenv("EHR_PAGE_SIZE", "50"))
+EHR_MAX_PAGE_SIZE = 200
+EHR_FETCH_CONCURRENCY = int(os.getenv("EHR_FETCH_CONCURRENCY", "8"))
+MANIFEST_PARTITION = "fhir"
+SUMMARY_FIELDS = ("export_id", "triage_id", "patient_id", "exported_at", "s3_key", "size_bytes")
 
 if APP_ENV == "demo":
     try:
         import boto3
-        from botocore.config import Config
-        _sm_config = Config(read_timeout=60, connect_timeout=5, retries={"max_attempts": 2})
-        _sm_runtime = boto3.client("sagemaker-runtime", region_name=AWS_REGION, config=_sm_config)
         _s3 = boto3.client("s3", region_name=AWS_REGION)
-        logger.info(json.dumps({"event": "ehr_demo_mode_init", "endpoint": SAGEMAKER_MEDGEMMA_ENDPOINT}))
+        from .dynamo_async import AsyncTable
+        _manifest = AsyncTable(EHR_EXPORTS_TABLE) if EHR_EXPORTS_TABLE else None
+        logger.info(json.dumps({"event": "ehr_demo_mode_init", "fhir_bucket": FHIR_S3_BUCKET, "manifest_table": EHR_EXPORTS_TABLE}))
     except ImportError:
-        _sm_runtime = None
         _s3 = None
+        _manifest = None
 else:
-    _sm_runtime = None
     _s3 = None
+    _manifest = None
 
-# In-memory fallback for dev mode
+# In-memory fallback for dev mode (also serves as the dev manifest, oldest first)
 EXPORTED_RECORDS: List[Dict[str, Any]] = []
 
+
+def encode_cursor(key: Dict[str, Any]) -> str:
+    return base64.urlsafe_b64encode(json.dumps(key, separators=(",", ":")).encode()).decode()
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[Dict[str, Any]]:
+    """Opaque pagination cursor → store position. Raises ValueError when malformed."""
+    if not cursor:
+        return None
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if not isinstance(key, dict):
+        raise ValueError("Invalid cursor")
+    return key
+
+
+def _summary(item: Dict[str, Any]) -> Dict[str, Any]:
+    summary = {k: item.get(k) for k in SUMMARY_FIELDS}
+    if summary["size_bytes"] is not None:
+        summary["size_bytes"] = int(summary["size_bytes"])  # DynamoDB returns Decimal
+    return summary
+
+
 class EHRService:
     def __init__(self):
-        pass
+        self.llm = get_inference_provider()
 
     async def get_exported_records(self) -> List[Dict[str, Any]]:
-        """Returns all exported FHIR records. In demo mode, reads from S3."""
+        """
+        Newest page (EHR_PAGE_SIZE) of exports with their full FHIR bundles (GET /ehr/records).
+        Older exports are only reachable through list_exports' cursor (GET /ehr/exports).
+        """
+        page = await self.list_exports(include_bundles=True)
+        return [item for item in page["items"] if item.get("fhir_bundle") is not None]
+
+    async def list_exports(
+        self,
+        limit: int = EHR_PAGE_SIZE,
+        cursor: Optional[str] = None,
+        patient_id: Optional[str] = None,
+        include_bundles: bool = False
+    ) -> Dict[str, Any]:
+        """
+        One page of exports, newest first: {"items": [summary...], "next_cursor": str | None}.
+        Demo mode reads the DynamoDB manifest (falling back to a paginated S3 listing when
+        no manifest table is configured); dev mode reads the in-memory list. Raises
+        ValueError for a malformed or foreign cursor; other store errors propagate.
+        """
+        start = decode_cursor(cursor)
+        limit = max(1, min(limit, EHR_MAX_PAGE_SIZE))
         if APP_ENV == "demo" and _s3 and FHIR_S3_BUCKET:
+            # Errors surface to the caller: the in-memory list is dev-only and would
+            # answer 200 with a silently wrong (usually empty) page.
+            from botocore.exceptions import ClientError, ParamValidationError
             try:
-                resp = _s3.list_objects_v2(Bucket=FHIR_S3_BUCKET, Prefix="bundles/")
-                records = []
-                for obj in resp.get("Contents", []):
-                    body = _s3.get_object(Bucket=FHIR_S3_BUCKET, Key=obj["Key"])
-                    records.append(json.loads(body["Body"].read()))
-                return records
-            except Exception as e:
-                logger.warning(json.dumps({"event": "fhir_s3_list_failed", "error": str(e)}))
-        return EXPORTED_RECORDS
+                if _manifest is not None:
+                    items, next_key = await self._query_manifest(limit, start, patient_id)
+                else:
+                    from starlette.concurrency import run_in_threadpool
+                    items, next_key = await run_in_threadpool(self._list_bucket, limit, start, patient_id)
+            except ParamValidationError:
+                raise ValueError("Invalid cursor")
+            except ClientError as e:
+                code = e.response.get("Error", {}).get("Code")
+                if start and code in ("ValidationException", "InvalidArgument"):
+                    raise ValueError("Invalid cursor")  # e.g. a cursor from another listing
+                logger.error(json.dumps({"event": "fhir_export_list_failed", "error": str(e)}))
+                raise
+            if include_bundles:
+                await self._attach_bundles(items)
+            return {"items": items, "next_cursor": encode_cursor(next_key) if next_key else None}
+        return self._list_memory(limit, start, patient_id, include_bundles)
+
+    async def _query_manifest(self, limit: int, start: Optional[Dict[str, Any]], patient_id: Optional[str]):
+        from boto3.dynamodb.conditions import Key
+        kwargs: Dict[str, Any] = {"Limit": limit, "ScanIndexForward": False}
+        if patient_id:
+            kwargs["IndexName"] = "patient_id-sort-index"
+            kwargs["KeyConditionExpression"] = Key("patient_id").eq(patient_id)
+        else:
+            kwargs["KeyConditionExpression"] = Key("manifest").eq(MANIFEST_PARTITION)
+        if start:
+            kwargs["ExclusiveStartKey"] = start
+        resp = await _manifest.query(**kwargs)
+        return [_summary(item) for item in resp.get("Items", [])], resp.get("LastEvaluatedKey")
+
+    def _list_bucket(self, limit: int, start: Optional[Dict[str, Any]], patient_id: Optional[str]):
+        """No manifest table: page through keys (key order, not time order); summaries come from the listing."""
+        kwargs: Dict[str, Any] = {
+            "Bucket": FHIR_S3_BUCKET,
+            "Prefix": f"bundles/{patient_id}/" if patient_id else "bundles/",
+            "MaxKeys": limit
+        }
+        if start and start.get("token"):
+            kwargs["ContinuationToken"] = start["token"]
+        resp = _s3.list_objects_v2(**kwargs)
+        items = []
+        for obj in resp.get("Contents", []):
+            parts = obj["Key"].split("/")  # bundles/{patient_id}/{export_id}.json
+            items.append({
+                "export_id": parts[-1].rsplit(".", 1)[0],
+                "triage_id": None,
+                "patient_id": parts[1] if len(parts) > 2 else None,
+                "exported_at": obj["LastModified"].isoformat(),
+                "s3_key": obj["Key"],
+                "size_bytes": obj["Size"]
+            })
+        token = resp.get("NextContinuationToken")
+        return items, {"token": token} if token else None
+
+    def _list_memory(self, limit: int, start: Optional[Dict[str, Any]], patient_id: Optional[str], include_bundles: bool):
+        if start and "sort_key" not in start:
+            raise ValueError("Invalid cursor")  # e.g. an S3 listing cursor
+        after = start.get("sort_key") if start else None
+        items = []
+        for entry in reversed(EXPORTED_RECORDS):
+            if patient_id and entry["patient_id"] != patient_id:
+                continue
+            if after is not None and entry["sort_key"] >= after:
+                continue
+            if len(items) == limit:
+                return {"items": items, "next_cursor": encode_cursor({"sort_key": items[-1]["sort_key"]})}
+            item = _summary(entry)
+            item["sort_key"] = entry["sort_key"]
+            if include_bundles:
+                item["fhir_bundle"] = entry["fhir_bundle"]
+            items.append(item)
+        return {"items": items, "next_cursor": None}
+
+    async def _attach_bundles(self, items: List[Dict[str, Any]]):
+        """Fetch the full bundles for a page from S3, EHR_FETCH_CONCURRENCY at a time."""
+        from starlette.concurrency import run_in_threadpool
+        semaphore = asyncio.Semaphore(EHR_FETCH_CONCURRENCY)
+
+        def fetch(key: str) -> Dict[str, Any]:
+            body = _s3.get_object(Bucket=FHIR_S3_BUCKET, Key=key)
+            return json.loads(body["Body"].read())
+
+        async def attach(item: Dict[str, Any]):
+            async with semaphore:
+                try:
+                    stored = await run_in_threadpool(fetch, item["s3_key"])
+                    item["fhir_bundle"] = stored.get("fhir_bundle")
+                    item["triage_id"] = item["triage_id"] or stored.get("triage_id")
+                except Exception as e:
+                    logger.warning(json.dumps({"event": "fhir_bundle_fetch_failed", "s3_key": item["s3_key"], "error": str(e)}))
+                    item["fhir_bundle"] = None
+
+        await asyncio.gather(*(attach(item) for item in items))
 
     async def generate_fhir_bundle(self, record: TriageRecord) -> Dict[str, Any]:
         """
@@ -110,8 +252,12 @@ class EHRService:
         Generate the FHIR R4 Bundle JSON now:
         """
 
-        from fastapi.concurrency import run_in_threadpool
-        raw_text = await run_in_threadpool(self._call_inference_backend, prompt, 2048)
+        print(f"[EHR] Calling {self.llm.name} for FHIR generation")
+        # Exports queue behind live triage work of the same tier
+        raw_text = await self.llm.invoke(
+            prompt, max_tokens=FHIR_MAX_TOKENS, temperature=0.1,
+            priority=llm_priority(record.triage_tier, "fhir"), schema=FHIR_BUNDLE_SCHEMA
+        )
         
         try:
             fhir_bundle = self._extract_json_robust(raw_text)
@@ -130,6 +276,14 @@ class EHRService:
 
         # 1. Basic cleaning
         text = text.strip()
+
+        # Fast path: schema-constrained decoding returns exactly one JSON object
+        try:
+            parsed = json.loads(text)
+            if isinstance(parsed, dict):
+                return parsed
+        except ValueError:
+            pass
         
         # 2. Advanced cleaning: 
         # A. Remove non-printable control characters (0x00-0x1F) that break json.loads
@@ -172,91 +326,6 @@ class EHRService:
             # This is a bit risky but can work if the model added text *inside* the braces
             raise ValueError(f"JSON parsing failed: {str(e)}")
 
-    def _call_inference_backend(self, prompt: str, max_tokens: int = 2048) -> str:
-        """Dispatch to SageMaker (demo) or Ollama (dev)."""
-        if APP_ENV == "demo" and _sm_runtime and SAGEMAKER_MEDGEMMA_ENDPOINT:
-            print(f"[EHR] Calling SageMaker Async for FHIR generation: {SAGEMAKER_MEDGEMMA_ENDPOINT}")
-            
-            # 1. Prepare Payload with Gemma Chat Template
-            formatted_prompt = f"<start_of_turn>user\n{prompt}<end_of_turn>\n<start_of_turn>model\n"
-            payload = {
-                "inputs": formatted_prompt,
-                "parameters": {
-                    "max_new_tokens": max_tokens, 
-                    "temperature": 0.1,
-                    "stop": ["<end_of_turn>", "<eos>"]
-                }
-            }
-            
-            try:
-                request_id = str(uuid.uuid4())
-                if not SAGEMAKER_ASYNC_BUCKET:
-                    logger.error("SAGEMAKER_ASYNC_BUCKET not set in EHR module")
-                    raise ValueError("SAGEMAKER_ASYNC_BUCKET not set")
-
-                input_key = f"fhir-inputs/{request_id}.json"
-                input_location = f"s3://{SAGEMAKER_ASYNC_BUCKET}/{input_key}"
-                
-                _s3.put_object(
-                    Bucket=SAGEMAKER_ASYNC_BUCKET,
-                    Key=input_key,
-                    Body=json.dumps(payload),
-                    ContentType="application/json"
-                )
-
-                # 2. Start Async Inference
-                response = _sm_runtime.invoke_endpoint_async(
-                    EndpointName=SAGEMAKER_MEDGEMMA_ENDPOINT,
-                    ContentType="application/json",
-                    InputLocation=input_location
-                )
-                
-                output_location = response["OutputLocation"]
-                output_bucket = output_location.split("/")[2]
-                output_key = "/".join(output_location.split("/")[3:])
-                
-                print(f"[EHR] Async FHIR request submitted. Output will be at: {output_location}")
-
-                # 3. Poll for Result (up to 15 minutes for cold start)
-                max_retries = 180 # 180 * 5s = 900s (15 minutes)
-                for attempt in range(max_retries):
-                    try:
-                        resp = _s3.get_object(Bucket=output_bucket, Key=output_key)
-                        result = json.loads(resp["Body"].read().decode("utf-8"))
-                        
-                        # Cleanup input
-                        try:
-                            _s3.delete_object(Bucket=SAGEMAKER_ASYNC_BUCKET, Key=input_key)
-                        except: pass
-
-                        if isinstance(result, list) and result:
-                            return result[0].get("generated_text", "")
-                        return result.get("generated_text", str(result))
-                    except _s3.exceptions.NoSuchKey:
-                        if attempt % 6 == 0:
-                            print(f"[EHR] Polling for FHIR result... ({attempt * 5}s elapsed)")
-                        time.sleep(5)
-                
-                raise TimeoutError("Asynchronous FHIR generation timed out.")
-
-            except Exception as e:
-                print(f"[EHR ERROR] SageMaker Async failed: {e}")
-                raise
-        else:
-            print(f"[EHR] Calling Ollama for FHIR generation")
-            response = requests.post(
-                f"{OLLAMA_HOST}/api/generate",
-                json={
-                    "model": "alibayram/medgemma",
-                    "prompt": prompt,
-                    "stream": False,
-                    "options": {"num_predict": max_tokens, "temperature": 0.1}
-                }
-            )
-            response.raise_for_status()
-            return response.json().get("response", "")
-
-
     def _patch_fhir_timestamps(self, obj: Any, now: Optional[str] = None) -> Any:
         """
         Recursively walks a FHIR bundle dict/list and replaces any
@@ -360,17 +429,28 @@ class EHRService:
 
     async def export_to_ehr(self, record: TriageRecord) -> bool:
         """
-        Generates a FHIR R4 bundle and persists it.
-        - Demo mode: writes to S3 fhir/bundles/{patient_id}/{uuid}.json (survives ECS restarts)
+        Generates a FHIR R4 bundle and persists it. Returns False when the bundle is not listable.
+        - Demo mode: writes to S3 fhir/bundles/{patient_id}/{uuid}.json (survives ECS restarts),
+          then records it in the export manifest table
         - Dev mode: appends to in-memory list
         """
         fhir_data = await self.generate_fhir_bundle(record)
         bundle_id = str(uuid.uuid4())
+        exported_at = datetime.utcnow().isoformat() + "Z"
         export_entry = {
+            "export_id": bundle_id,
+            "triage_id": record.id,
             "patient_id": record.patient_id,
-            "exported_at": datetime.utcnow().isoformat() + "Z",
+            "exported_at": exported_at,
             "fhir_bundle": fhir_data
         }
+        body = json.dumps(export_entry)
+        # Manifest entry: sorts newest-first by time, ties broken by export id
+        manifest_entry = {
+            **{k: v for k, v in export_entry.items() if k != "fhir_bundle"},
+            "sort_key": f"{exported_at}#{bundle_id}",
+            "size_bytes": len(body.encode())
+        }
 
         if APP_ENV == "demo" and _s3 and FHIR_S3_BUCKET:
             try:
@@ -378,7 +458,7 @@ class EHRService:
                 _s3.put_object(
                     Bucket=FHIR_S3_BUCKET,
                     Key=s3_key,
-                    Body=json.dumps(export_entry),
+                    Body=body,
                     ContentType="application/json"
                 )
                 logger.info(json.dumps({
@@ -387,10 +467,18 @@ class EHRService:
                     "s3_key": s3_key
                 }))
             except Exception as e:
-                logger.warning(json.dumps({"event": "fhir_s3_write_failed_fallback_memory", "error": str(e)}))
-                EXPORTED_RECORDS.append(export_entry)
+                # Not to EXPORTED_RECORDS: the demo listing never reads it (and jobs run in the worker)
+                logger.error(json.dumps({"event": "fhir_s3_write_failed", "error": str(e)}))
+                return False
+            if _manifest is not None:
+                try:
+                    await _manifest.put_item(Item={**manifest_entry, "manifest": MANIFEST_PARTITION, "s3_key": s3_key})
+                except Exception as e:
+                    # The bundle is in S3 but nothing lists it; fail so the job retries
+                    logger.error(json.dumps({"event": "fhir_manifest_write_failed", "s3_key": s3_key, "error": str(e)}))
+                    return False
         else:
-            EXPORTED_RECORDS.append(export_entry)
+            EXPORTED_RECORDS.append({**manifest_entry, "s3_key": None, "fhir_bundle": fhir_data})
             logger.info(json.dumps({
                 "event": "fhir_exported_memory",
                 "patient_id": record.patient_id,
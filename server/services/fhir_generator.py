@@ -6,7 +6,8 @@ import requests
 from abc import ABC, abstractmethod
 from typing import Dict, Any, Optional
 from datetime import datetime
-from services.inference_provider import InferenceProvider
+from services.inference_provider import InferenceProvider, llm_priority
+from services.llm_schemas import FHIR_BUNDLE_SCHEMA, FHIR_MAX_TOKENS
 from models.triage import TriageRecord
 
 # Set up logging
@@ -104,7 +105,10 @@ class MedGemmaFHIRGenerator(FHIRGenerator):
         
         try:
             # MedGemma typically needs more tokens for a full FHIR Bundle JSON
-            raw_text = self.inference.invoke(prompt, max_tokens=2048)
+            raw_text = await self.inference.invoke(
+                prompt, max_tokens=FHIR_MAX_TOKENS,
+                priority=llm_priority(record.triage_tier, "fhir"), schema=FHIR_BUNDLE_SCHEMA
+            )
             
             # Extract JSON and patch timestamps
             start_idx, end_idx = raw_text.find('{'), raw_text.rfind('}')
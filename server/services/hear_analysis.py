@@ -0,0 +1,107 @@
+"""
+Full-coverage HeAR analysis helpers.
+
+The old Nitro 3-point sampling embedded only the first, middle and last
+second, so a 30 s recording with stridor at 5-12 s went unseen. Now:
+- Sliding windows of HEAR_WINDOW_S with hop HEAR_HOP_S cover the whole
+  recording; the final window is anchored to the end so the tail is never
+  dropped. Windows are strided views, so there is no copy until a micro-batch
+  is materialised.
+- Windows are embedded in micro-batches of HEAR_MAX_BATCH through the shared
+  HeARBatcher (services/hear_batcher.py). This bounds tensor memory regardless
+  of recording length and lets concurrent triages share forward passes.
+- The deviation score uses the closed form of mean pairwise cosine
+  similarity: sum(E·Eᵀ) = ‖ΣE‖². That is O(n·d) NumPy, with no n×n matrix.
+- AdaptiveHop keeps an EMA of the per-window embedding cost. If the planned
+  windows would exceed HEAR_TIME_BUDGET_S (e.g. the CPU is contended), the hop
+  widens up to one window length. Coverage stays complete; only the overlap
+  shrinks.
+"""
+
+import os
+import threading
+import numpy as np
+from typing import Tuple
+
+SAMPLE_RATE = 16000
+HEAR_WINDOW_S = float(os.getenv("HEAR_WINDOW_S", "1.0"))
+HEAR_HOP_S = float(os.getenv("HEAR_HOP_S", "0.5"))
+HEAR_MAX_BATCH = int(os.getenv("HEAR_MAX_BATCH", "16"))
+HEAR_TIME_BUDGET_S = float(os.getenv("HEAR_TIME_BUDGET_S", "3.0"))
+
+
+def sliding_windows(pcm: np.ndarray, window: int, hop: int) -> Tuple[np.ndarray, np.ndarray]:
+    """(windows [n, window] as a read-only strided view, start offsets in samples)."""
+    if len(pcm) < window:
+        padded = np.zeros(window, dtype=np.float32)
+        padded[:len(pcm)] = pcm
+        return padded[None, :], np.zeros(1, dtype=np.int64)
+    view = np.lib.stride_tricks.sliding_window_view(pcm, window)
+    starts = np.arange(0, len(pcm) - window + 1, hop)
+    if starts[-1] != len(pcm) - window:
+        starts = np.append(starts, len(pcm) - window)  # anchor the last window to the end
+    return view[starts], starts
+
+
+def l2_normalize(embeddings: np.ndarray) -> np.ndarray:
+    """Row-wise unit vectors; all-zero rows (digital silence) stay zero."""
+    emb = np.asarray(embeddings, dtype=np.float32).reshape(len(embeddings), -1)
+    norms = np.linalg.norm(emb, axis=1, keepdims=True)
+    return np.divide(emb, norms, out=np.zeros_like(emb), where=norms > 0)
+
+
+def deviation_stats(unit_embeddings: np.ndarray) -> Tuple[float, np.ndarray]:
+    """
+    (recording deviation, per-window deviation) from unit-norm embeddings.
+
+    Deviation is 1 - mean off-diagonal cosine similarity, scaled by 2/3 so the
+    existing ×50 calibration still holds. With the old 3 points, the full-matrix
+    mean (diagonal included) gave 1 - (1/3 + 2/3·m) = 2/3·(1 - m).
+    """
+    n = len(unit_embeddings)
+    if n < 2:
+        return 0.0, np.zeros(n, dtype=np.float32)
+    total = unit_embeddings.sum(axis=0)
+    self_sim = np.einsum("ij,ij->i", unit_embeddings, unit_embeddings)  # 1, or 0 for silent windows
+    pair_sum = float(total @ total) - float(self_sim.sum())
+    mean_offdiag = pair_sum / (n * (n - 1))
+    per_window = 1.0 - (unit_embeddings @ total - self_sim) / (n - 1)
+    return (2.0 / 3.0) * (1.0 - mean_offdiag), per_window
+
+
+class AdaptiveHop:
+    """Chooses the hop for a recording from the measured per-window embedding cost."""
+
+    def __init__(
+        self,
+        window_s: float = HEAR_WINDOW_S,
+        hop_s: float = HEAR_HOP_S,
+        budget_s: float = HEAR_TIME_BUDGET_S,
+        alpha: float = 0.3
+    ):
+        self.window_s = window_s
+        self.hop_s = min(hop_s, window_s)
+        self.budget_s = budget_s
+        self.alpha = alpha
+        self.cost_per_window_s = 0.0  # EMA; 0 until the first measurement
+        self._lock = threading.Lock()
+
+    def hop_for(self, duration_s: float) -> float:
+        cost = self.cost_per_window_s
+        span = duration_s - self.window_s
+        if cost <= 0 or span <= 0:
+            return self.hop_s
+        affordable = self.budget_s / cost  # windows that fit in the budget
+        if affordable - 1 <= 0:
+            return self.window_s
+        # Never exceed the window length — contiguous windows still cover every sample
+        return min(self.window_s, max(self.hop_s, span / (affordable - 1)))
+
+    def record(self, windows: int, seconds: float):
+        if windows <= 0:
+            return
+        sample = seconds / windows
+        with self._lock:
+            self.cost_per_window_s = sample if self.cost_per_window_s <= 0 else (
+                self.alpha * sample + (1 - self.alpha) * self.cost_per_window_s
+            )
@@ -0,0 +1,166 @@
+"""
+Pluggable HeAR inference backends, selected with HEAR_BACKEND:
+
+- savedmodel  — tf.saved_model.load + eager serving_default signature (baseline, default)
+- xla         — the same signature wrapped in tf.function(jit_compile=True) with a fixed
+                [HEAR_MAX_BATCH, window] input signature, so XLA compiles exactly once
+- onnx        — ONNX Runtime on the converted model (HEAR_ONNX_PATH, int8 dynamic-quantized
+                by default). Needs `onnxruntime`; TensorFlow is not loaded at all.
+- tflite      — TFLite interpreter on the converted model (HEAR_TFLITE_PATH, dynamic-range
+                int8). Uses `ai_edge_litert`/`tflite_runtime` when installed, else tf.lite.
+
+Converted artifacts come from the offline step in scripts/convert_hear.py;
+scripts/bench_hear.py compares latency, RSS and embedding drift against savedmodel.
+If a selected backend cannot load (missing runtime or artifact) we log and fall
+back to savedmodel rather than losing HeAR.
+
+Fixed-shape backends pad each call up to `batch_size` rows and slice the result,
+so callers (HeARBatcher) can pass any batch up to that size.
+"""
+
+import os
+import json
+import logging
+import numpy as np
+from abc import ABC, abstractmethod
+from typing import Optional
+from services.hear_analysis import HEAR_MAX_BATCH, HEAR_WINDOW_S, SAMPLE_RATE
+
+logger = logging.getLogger(__name__)
+
+HEAR_BACKEND = os.getenv("HEAR_BACKEND", "savedmodel").lower()
+HEAR_ONNX_PATH = os.getenv("HEAR_ONNX_PATH", "storage/models/hear_int8.onnx")
+HEAR_TFLITE_PATH = os.getenv("HEAR_TFLITE_PATH", "storage/models/hear_int8.tflite")
+HEAR_NUM_THREADS = int(os.getenv("HEAR_NUM_THREADS", "4"))
+
+WINDOW_SAMPLES = int(HEAR_WINDOW_S * SAMPLE_RATE)
+
+
+def hear_model_dir() -> str:
+    """Local path of the google/hear SavedModel (downloaded once into the HF cache)."""
+    from huggingface_hub import snapshot_download
+    return snapshot_download("google/hear", token=os.getenv("HF_TOKEN"))
+
+
+class HeARBackend(ABC):
+    name: str = ""
+    batch_size: Optional[int] = None  # fixed batch dimension, or None for dynamic
+
+    @abstractmethod
+    def _run(self, batch: np.ndarray) -> np.ndarray:
+        pass
+
+    def embed(self, batch: np.ndarray) -> np.ndarray:
+        """[n, WINDOW_SAMPLES] float32 → [n, d] embeddings."""
+        n = len(batch)
+        if self.batch_size is None:
+            return np.asarray(self._run(batch)).reshape(n, -1)
+        out = []
+        for start in range(0, n, self.batch_size):
+            part = batch[start:start + self.batch_size]
+            padded = np.zeros((self.batch_size, part.shape[1]), dtype=np.float32)
+            padded[:len(part)] = part
+            out.append(np.asarray(self._run(padded)).reshape(self.batch_size, -1)[:len(part)])
+        return np.concatenate(out)
+
+
+class SavedModelBackend(HeARBackend):
+    name = "savedmodel"
+
+    def __init__(self, model_dir: Optional[str] = None):
+        import tensorflow as tf
+
+        self._tf = tf
+        model = tf.saved_model.load(model_dir or hear_model_dir())
+        self._signature = model.signatures["serving_default"]
+
+    def _run(self, batch: np.ndarray) -> np.ndarray:
+        return self._signature(x=self._tf.constant(batch, dtype=self._tf.float32))["output_0"].numpy()
+
+
+class XLABackend(HeARBackend):
+    name = "xla"
+
+    def __init__(self, model_dir: Optional[str] = None, batch_size: int = HEAR_MAX_BATCH):
+        import tensorflow as tf
+
+        self._tf = tf
+        self.batch_size = batch_size
+        self._model = tf.saved_model.load(model_dir or hear_model_dir())  # keep variables alive
+        signature = self._model.signatures["serving_default"]
+        self._fn = tf.function(
+            lambda x: signature(x=x)["output_0"],
+            jit_compile=True,
+            input_signature=[tf.TensorSpec([batch_size, WINDOW_SAMPLES], tf.float32)]
+        )
+        self._run(np.zeros((batch_size, WINDOW_SAMPLES), dtype=np.float32))  # compile now, not on the first triage
+
+    def _run(self, batch: np.ndarray) -> np.ndarray:
+        return self._fn(self._tf.constant(batch)).numpy()
+
+
+class ONNXBackend(HeARBackend):
+    name = "onnx"
+
+    def __init__(self, path: str = HEAR_ONNX_PATH, num_threads: int = HEAR_NUM_THREADS):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = num_threads
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self._session = ort.InferenceSession(path, sess_options=options, providers=["CPUExecutionProvider"])
+        model_input = self._session.get_inputs()[0]
+        self._input_name = model_input.name
+        batch_dim = model_input.shape[0]
+        self.batch_size = batch_dim if isinstance(batch_dim, int) else None
+
+    def _run(self, batch: np.ndarray) -> np.ndarray:
+        return self._session.run(None, {self._input_name: np.ascontiguousarray(batch, dtype=np.float32)})[0]
+
+
+class TFLiteBackend(HeARBackend):
+    name = "tflite"
+
+    def __init__(self, path: str = HEAR_TFLITE_PATH, num_threads: int = HEAR_NUM_THREADS):
+        try:
+            from ai_edge_litert.interpreter import Interpreter
+        except ImportError:
+            try:
+                from tflite_runtime.interpreter import Interpreter
+            except ImportError:
+                from tensorflow.lite import Interpreter
+
+        self._interpreter = Interpreter(model_path=path, num_threads=num_threads)
+        self._interpreter.allocate_tensors()
+        self._input = self._interpreter.get_input_details()[0]
+        self._output = self._interpreter.get_output_details()[0]
+        self.batch_size = int(self._input["shape"][0])
+
+    def _run(self, batch: np.ndarray) -> np.ndarray:
+        self._interpreter.set_tensor(self._input["index"], np.ascontiguousarray(batch, dtype=np.float32))
+        self._interpreter.invoke()
+        return self._interpreter.get_tensor(self._output["index"])
+
+
+_BACKENDS = {
+    "savedmodel": SavedModelBackend,
+    "xla": XLABackend,
+    "onnx": ONNXBackend,
+    "tflite": TFLiteBackend,
+}
+
+
+def load_hear_backend(kind: str = HEAR_BACKEND) -> HeARBackend:
+    """Instantiate the configured backend, falling back to the SavedModel baseline."""
+    if kind not in _BACKENDS:
+        logger.warning(json.dumps({"event": "hear_backend_unknown", "backend": kind}))
+        kind = "savedmodel"
+    try:
+        backend = _BACKENDS[kind]()
+    except Exception as e:
+        if kind == "savedmodel":
+            raise
+        logger.warning(json.dumps({"event": "hear_backend_fallback", "backend": kind, "error": str(e)}))
+        backend = SavedModelBackend()
+    logger.info(json.dumps({"event": "hear_backend_loaded", "backend": backend.name, "batch_size": backend.batch_size}))
+    return backend
@@ -0,0 +1,110 @@
+"""
+Cross-request micro-batching for HeAR embeddings.
+
+Every triage used to call hear_serving_signature on its own, with a handful
+of windows, so TensorFlow's per-call overhead dominated. Concurrent triages
+never shared a forward pass. HeARBatcher owns the signature on one worker
+thread, mirroring WhisperBatcher:
+
+- Callers submit a [n, samples] block of windows and get a
+  concurrent.futures.Future that resolves to raw [n, d] embeddings.
+- After the first pending request the worker waits HEAR_BATCH_WINDOW_MS to
+  collect windows from other in-flight triages.
+- Rows from all callers are packed into forward passes of at most
+  HEAR_MAX_BATCH. Only the rows of the current pass are copied, so memory
+  stays bounded.
+- Embeddings are split back out per caller, and each future resolves
+  independently.
+"""
+
+import os
+import json
+import time
+import queue
+import logging
+import threading
+import numpy as np
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Callable, List
+from services.hear_analysis import HEAR_MAX_BATCH
+
+logger = logging.getLogger(__name__)
+
+HEAR_BATCH_WINDOW_MS = int(os.getenv("HEAR_BATCH_WINDOW_MS", "5"))
+
+
+@dataclass
+class _HeARRequest:
+    windows: np.ndarray
+    future: Future = field(default_factory=Future)
+    enqueued_at: float = field(default_factory=time.time)
+
+
+class HeARBatcher:
+    def __init__(
+        self,
+        embed: Callable[[np.ndarray], np.ndarray],
+        window_ms: int = HEAR_BATCH_WINDOW_MS,
+        max_batch: int = HEAR_MAX_BATCH
+    ):
+        self.embed = embed
+        self.window_s = window_ms / 1000.0
+        self.max_batch = max_batch
+        self._pending: "queue.Queue[_HeARRequest]" = queue.Queue()
+        self._worker = threading.Thread(target=self._run, name="hear-batcher", daemon=True)
+        self._worker.start()
+        logger.info(json.dumps({"event": "hear_batcher_started", "window_ms": window_ms, "max_batch": max_batch}))
+
+    def submit(self, windows: np.ndarray) -> Future:
+        """Queue [n, samples] float32 windows. Resolves to [n, d] embeddings in the same order."""
+        request = _HeARRequest(windows=windows)
+        self._pending.put(request)
+        return request.future
+
+    # ── Worker ───────────────────────────────────────────────────────────────
+
+    def _run(self):
+        while True:
+            batch = [self._pending.get()]
+            deadline = time.time() + self.window_s
+            while True:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._pending.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._process(batch)
+
+    def _process(self, batch: List[_HeARRequest]):
+        t_start = time.time()
+        try:
+            rows = [(owner, i) for owner, request in enumerate(batch) for i in range(len(request.windows))]
+            outputs: List[List[np.ndarray]] = [[] for _ in batch]
+            passes = 0
+            for start in range(0, len(rows), self.max_batch):
+                chunk = rows[start:start + self.max_batch]
+                stacked = np.stack([batch[owner].windows[i] for owner, i in chunk]).astype(np.float32, copy=False)
+                embeddings = np.asarray(self.embed(stacked)).reshape(len(chunk), -1)
+                passes += 1
+                for (owner, _), embedding in zip(chunk, embeddings):
+                    outputs[owner].append(embedding)
+
+            for request, parts in zip(batch, outputs):
+                request.future.set_result(np.stack(parts) if parts else np.zeros((0, 0), dtype=np.float32))
+
+            logger.info(json.dumps({
+                "event": "hear_batch_complete",
+                "requests": len(batch),
+                "windows": len(rows),
+                "forward_passes": passes,
+                "max_queue_wait_s": round(t_start - min(r.enqueued_at for r in batch), 3),
+                "latency_s": round(time.time() - t_start, 3)
+            }))
+        except Exception as e:
+            logger.error(json.dumps({"event": "hear_batch_failed", "requests": len(batch), "error": str(e)}))
+            for request in batch:
+                if not request.future.done():
+                    request.future.set_exception(e)
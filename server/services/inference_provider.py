@@ -1,125 +1,264 @@
 import os
 import json
-import logging
-import requests
-import uuid
 import time
-import boto3
+import asyncio
+import logging
 from abc import ABC, abstractmethod
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
+from services.async_inference import get_async_inference_tracker, ASYNC_INFERENCE_TIMEOUT_S
+from services.metrics import LLM_QUEUE_WAIT_SECONDS, LLM_GENERATION_SECONDS, LLM_WAITING, LLM_INFLIGHT
 
 # Set up logging
 logger = logging.getLogger(__name__)
 
+# Shared limits for every MedGemma consumer (SOAP, precautions, FHIR) in this process
+LLM_MAX_INFLIGHT = int(os.getenv("LLM_MAX_INFLIGHT", "4"))
+OLLAMA_TIMEOUT_S = float(os.getenv("OLLAMA_TIMEOUT_S", "300"))
+OLLAMA_CONNECT_TIMEOUT_S = float(os.getenv("OLLAMA_CONNECT_TIMEOUT_S", "5"))
+OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "alibayram/medgemma")
+LLM_AGING_S_PER_LEVEL = float(os.getenv("LLM_AGING_S_PER_LEVEL", "60"))
+
+# ── Priority admission ───────────────────────────────────────────────────────
+# Lower score = admitted first. Zone dominates; job type breaks ties within a zone.
+ZONE_PRIORITY = {"EMERGENCY": 0, "URGENT": 1, "SEMI_URGENT": 2, "ROUTINE": 3}
+JOB_PRIORITY = {"precautions": 0.0, "soap": 0.5, "fhir": 2.0}
+
+
+def llm_priority(zone: Optional[str], job: str) -> float:
+    """Base priority for an LLM job, from the triage zone (vitals or final tier) and job type."""
+    return ZONE_PRIORITY.get((zone or "ROUTINE").upper(), 3) + JOB_PRIORITY.get(job, 1.0)
+
+
+class _Waiter:
+    __slots__ = ("priority", "seq", "enqueued_at", "future")
+
+    def __init__(self, priority: float, seq: int, future: asyncio.Future):
+        self.priority = priority
+        self.seq = seq
+        self.enqueued_at = time.monotonic()
+        self.future = future
+
+    def effective(self, now: float) -> tuple:
+        # Aging: every LLM_AGING_S_PER_LEVEL seconds of waiting promotes a job by one zone level
+        return (self.priority - (now - self.enqueued_at) / LLM_AGING_S_PER_LEVEL, self.seq)
+
+
+class AdmissionQueue:
+    """
+    Bounded-concurrency gate that admits the most urgent waiter first.
+    When a slot frees up, the waiter with the lowest aged priority is woken,
+    so an EMERGENCY SOAP note overtakes a queued ROUTINE FHIR export.
+
+    The queue is per process. SOAP notes and FHIR exports both run as job-queue
+    jobs in the triage workers, so they meet here; the API process only refines
+    precautions (the highest job priority anyway). The backend sees the sum of
+    LLM_MAX_INFLIGHT over every process, so size it per process type
+    (infra_be sets it on the API and worker task definitions).
+    """
+
+    def __init__(self, slots: int):
+        self._free = slots
+        self._waiters: List[_Waiter] = []
+        self._seq = 0
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self, priority: float):
+        if self._free > 0 and not self._waiters:
+            self._free -= 1
+            return
+        self._seq += 1
+        waiter = _Waiter(priority, self._seq, asyncio.get_running_loop().create_future())
+        self._waiters.append(waiter)
+        try:
+            await waiter.future  # slot is handed over directly by release()
+        except asyncio.CancelledError:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+            elif waiter.future.done() and not waiter.future.cancelled():
+                self.release()  # slot was already granted — pass it on
+            raise
+
+    def release(self):
+        if self._waiters:
+            now = time.monotonic()
+            best = min(self._waiters, key=lambda w: w.effective(now))
+            self._waiters.remove(best)
+            best.future.set_result(None)
+        else:
+            self._free += 1
+
+
 class InferenceProvider(ABC):
+    """
+    Async MedGemma client. invoke() admits at most LLM_MAX_INFLIGHT requests
+    per process through a priority queue, so clinically urgent work is served
+    first when the backend is saturated; subclasses implement the transport in _invoke().
+    """
+
+    def __init__(self, max_inflight: int = LLM_MAX_INFLIGHT):
+        self._admission = AdmissionQueue(max_inflight)
+
+    async def invoke(
+        self,
+        prompt: str,
+        max_tokens: int = 512,
+        temperature: float = 0.1,
+        top_p: Optional[float] = None,
+        priority: float = llm_priority(None, "soap"),
+        schema: Optional[Dict[str, Any]] = None
+    ) -> str:
+        """
+        Generate text for `prompt`. With a JSON `schema` (see services/llm_schemas.py) the backend
+        decodes under that constraint, so the result is a single JSON document of that shape.
+        """
+        t_wait = time.time()
+        with LLM_WAITING.track_inprogress():
+            await self._admission.acquire(priority)
+        try:
+            t_start = time.time()
+            LLM_QUEUE_WAIT_SECONDS.observe(t_start - t_wait, backend=self.name)
+            with LLM_INFLIGHT.track_inprogress(), LLM_GENERATION_SECONDS.time(backend=self.name):
+                text = await self._invoke(prompt, max_tokens, temperature, top_p, schema)
+        finally:
+            self._admission.release()
+        logger.info(json.dumps({
+            "event": "llm_invoke_complete",
+            "backend": self.name,
+            "priority": priority,
+            "structured": schema is not None,
+            "queue_wait_s": round(t_start - t_wait, 3),
+            "latency_s": round(time.time() - t_start, 2)
+        }))
+        return text
+
+    @property
+    @abstractmethod
+    def name(self) -> str:
+        pass
+
     @abstractmethod
-    def invoke(self, prompt: str, max_tokens: int = 512) -> str:
+    async def _invoke(
+        self, prompt: str, max_tokens: int, temperature: float, top_p: Optional[float], schema: Optional[Dict[str, Any]]
+    ) -> str:
+        pass
+
+    async def aclose(self):
         pass
 
+
 class OllamaInferenceProvider(InferenceProvider):
-    def __init__(self, host: str, model_name: str = "alibayram/medgemma"):
+    name = "ollama"
+
+    def __init__(self, host: str, model_name: str = OLLAMA_MODEL, max_inflight: int = LLM_MAX_INFLIGHT):
+        import httpx
+
+        super().__init__(max_inflight)
         self.host = host
         self.model_name = model_name
+        # One keep-alive pool for the whole process — no per-call TCP setup
+        self._http = httpx.AsyncClient(
+            base_url=host,
+            timeout=httpx.Timeout(OLLAMA_TIMEOUT_S, connect=OLLAMA_CONNECT_TIMEOUT_S),
+            limits=httpx.Limits(max_connections=max_inflight, max_keepalive_connections=max_inflight)
+        )
         logger.info(f"Initialized OllamaInferenceProvider with model: {model_name}")
 
-    def invoke(self, prompt: str, max_tokens: int = 512) -> str:
+    async def _invoke(
+        self, prompt: str, max_tokens: int, temperature: float, top_p: Optional[float], schema: Optional[Dict[str, Any]]
+    ) -> str:
+        options: Dict[str, Any] = {"num_predict": max_tokens, "temperature": temperature}
+        if top_p is not None:
+            options["top_p"] = top_p
         try:
-            response = requests.post(
-                f"{self.host}/api/generate",
-                json={
-                    "model": self.model_name,
-                    "prompt": prompt,
-                    "stream": False,
-                    "options": {"num_predict": max_tokens, "temperature": 0.1}
-                }
-            )
+            # Ollama handles templating automatically via its Modelfile
+            body: Dict[str, Any] = {"model": self.model_name, "prompt": prompt, "stream": False, "options": options}
+            if schema is not None:
+                body["format"] = schema  # structured outputs: decoding constrained to the JSON schema
+            response = await self._http.post("/api/generate", json=body)
             response.raise_for_status()
             return response.json().get("response", "")
         except Exception as e:
             logger.error(f"Ollama inference failed: {e}")
             raise
 
+    async def aclose(self):
+        await self._http.aclose()
+
+
 class SageMakerInferenceProvider(InferenceProvider):
-    def __init__(self, endpoint_name: str, region: str = "ap-south-1"):
-        self.client = boto3.client("sagemaker-runtime", region_name=region)
-        self.s3 = boto3.client("s3", region_name=region)
+    name = "sagemaker"
+
+    def __init__(self, endpoint_name: str, region: str = "ap-south-1", max_inflight: int = LLM_MAX_INFLIGHT):
+        super().__init__(max_inflight)
         self.endpoint_name = endpoint_name
+        self.region = region
         self.async_bucket = os.getenv("SAGEMAKER_ASYNC_BUCKET", "")
+        self.tracker = get_async_inference_tracker()
         logger.info(f"Initialized SageMakerInferenceProvider with endpoint: {endpoint_name}")
 
-    def invoke(self, prompt: str, max_tokens: int = 512) -> str:
+    async def _invoke(
+        self, prompt: str, max_tokens: int, temperature: float, top_p: Optional[float], schema: Optional[Dict[str, Any]]
+    ) -> str:
         try:
             if not self.async_bucket:
                 logger.error("SAGEMAKER_ASYNC_BUCKET not set for SageMakerInferenceProvider")
                 raise ValueError("SAGEMAKER_ASYNC_BUCKET not set")
 
-            request_id = str(uuid.uuid4())
-            input_key = f"inference-inputs/{request_id}.json"
-            input_location = f"s3://{self.async_bucket}/{input_key}"
-
-            # 1. Upload Payload to S3
-            payload = {
-                "inputs": prompt,
-                "parameters": {"max_new_tokens": max_tokens, "temperature": 0.1}
+            # TGI does not apply the chat template itself — wrap the prompt in Gemma turns
+            formatted_prompt = f"<start_of_turn>user\n{prompt}<end_of_turn>\n<start_of_turn>model\n"
+            parameters: Dict[str, Any] = {
+                "max_new_tokens": max_tokens,
+                "temperature": temperature,
+                "stop": ["<end_of_turn>", "<eos>"]
             }
-            self.s3.put_object(
-                Bucket=self.async_bucket,
-                Key=input_key,
-                Body=json.dumps(payload),
-                ContentType="application/json"
-            )
+            if top_p is not None:
+                parameters.update({"top_p": top_p, "do_sample": True})
+            if schema is not None:
+                parameters["grammar"] = {"type": "json", "value": schema}  # TGI guided decoding
 
-            # 2. Start Async Inference
-            response = self.client.invoke_endpoint_async(
-                EndpointName=self.endpoint_name,
-                ContentType="application/json",
-                InputLocation=input_location
+            # Upload, invoke and await the result via the shared completion tracker (up to 15 minutes)
+            return await self.tracker.invoke(
+                self.endpoint_name,
+                {"inputs": formatted_prompt, "parameters": parameters},
+                input_prefix="inference-inputs",
+                bucket=self.async_bucket,
+                timeout=ASYNC_INFERENCE_TIMEOUT_S
             )
-            
-            output_location = response["OutputLocation"]
-            output_bucket = output_location.split("/")[2]
-            output_key = "/".join(output_location.split("/")[3:])
-            
-            logger.info(f"Async inference requested. Output: {output_location}")
-
-            # 3. Poll for result (up to 15 minutes)
-            max_retries = 180 # 180 * 5s = 900s
-            for attempt in range(max_retries):
-                try:
-                    resp = self.s3.get_object(Bucket=output_bucket, Key=output_key)
-                    result = json.loads(resp["Body"].read().decode("utf-8"))
-                    
-                    # Cleanup
-                    try:
-                        self.s3.delete_object(Bucket=self.async_bucket, Key=input_key)
-                    except: pass
-
-                    if isinstance(result, list) and result:
-                        return result[0].get("generated_text", "")
-                    return result.get("generated_text", str(result))
-                except self.s3.exceptions.NoSuchKey:
-                    if attempt % 6 == 0:
-                        logger.info(f"Polling for inference result... ({attempt * 5}s elapsed)")
-                    time.sleep(5)
-            
-            raise TimeoutError("Asynchronous inference timed out.")
-
         except Exception as e:
             logger.error(f"SageMaker async inference failed: {e}")
             raise
 
+
+_provider: Optional[InferenceProvider] = None
+
+
 def get_inference_provider() -> InferenceProvider:
-    """Centralized factory for environment-aware LLM providers."""
+    """Centralized factory for environment-aware LLM providers (one pooled instance per process)."""
+    global _provider
+    if _provider is not None:
+        return _provider
+
     env = os.getenv("APP_ENV", "dev")
-    
+    host = os.getenv("OLLAMA_HOST", "http://localhost:11434")
     if env == "demo":
         endpoint = os.getenv("SAGEMAKER_MEDGEMMA_ENDPOINT")
         region = os.getenv("AWS_REGION", "ap-south-1")
         if not endpoint:
             logger.warning("SAGEMAKER_MEDGEMMA_ENDPOINT not set, falling back to local Ollama")
-            host = os.getenv("OLLAMA_HOST", "http://localhost:11434")
-            return OllamaInferenceProvider(host)
-        return SageMakerInferenceProvider(endpoint, region)
+            _provider = OllamaInferenceProvider(host)
+        else:
+            _provider = SageMakerInferenceProvider(endpoint, region)
     else:
-        host = os.getenv("OLLAMA_HOST", "http://localhost:11434")
-        return OllamaInferenceProvider(host)
+        _provider = OllamaInferenceProvider(host)
+    return _provider
+
+
+async def close_inference_provider():
+    """Release pooled connections on shutdown."""
+    global _provider
+    if _provider is not None:
+        await _provider.aclose()
+        _provider = None
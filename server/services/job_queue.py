@@ -0,0 +1,303 @@
+"""
+Durable triage job queue.
+
+The API enqueues one job per uploaded (or streamed) recording; triage_worker.py
+consumes jobs and runs the AI pipeline. Workers can run as N replicas, scaled
+separately from the HTTP tier.
+
+Backends:
+- SQSJobQueue     — the `triage-jobs` queue from infra_sqs (SQS_TRIAGE_QUEUE_URL).
+                    Retries and the DLQ come from the queue's redrive policy.
+- SQLiteJobQueue  — local stand-in with the same semantics (visibility timeout,
+                    receive count, dead-letter after TRIAGE_JOB_MAX_RECEIVES).
+                    Safe across processes on one host.
+
+Messages carry only a reference to the audio (S3 URI or local path), never the audio.
+"""
+
+import os
+import json
+import time
+import uuid
+import asyncio
+import logging
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from starlette.concurrency import run_in_threadpool
+
+logger = logging.getLogger(__name__)
+
+AWS_REGION = os.getenv("AWS_REGION", "ap-south-1")
+SQS_TRIAGE_QUEUE_URL = os.getenv("SQS_TRIAGE_QUEUE_URL", "")
+TRIAGE_JOB_DB = os.getenv("TRIAGE_JOB_DB", "storage/triage_jobs.db")
+TRIAGE_JOB_VISIBILITY_S = int(os.getenv("TRIAGE_JOB_VISIBILITY_S", "120"))  # matches infra_sqs
+TRIAGE_JOB_MAX_RECEIVES = int(os.getenv("TRIAGE_JOB_MAX_RECEIVES", "3"))    # matches the redrive policy
+TRIAGE_WORKER_CONCURRENCY = int(os.getenv("TRIAGE_WORKER_CONCURRENCY", "2"))
+TRIAGE_RETRY_BASE_S = int(os.getenv("TRIAGE_RETRY_BASE_S", "10"))
+# Run a worker inside the API process. Default on for the local stand-in (dev's in-memory triage
+# store is only visible in-process, so main.py refuses it with more than one uvicorn worker);
+# off with SQS, where triage_worker.py replicas consume the queue.
+TRIAGE_INLINE_WORKER = os.getenv("TRIAGE_INLINE_WORKER", "0" if SQS_TRIAGE_QUEUE_URL else "1") == "1"
+UVICORN_WORKERS = int(os.getenv("UVICORN_WORKERS", "1"))  # exported by entrypoint.sh
+
+
+@dataclass
+class ReceivedJob:
+    body: Dict[str, Any]
+    receipt: str
+    receive_count: int
+
+
+class JobQueue(ABC):
+    @abstractmethod
+    async def send(self, body: Dict[str, Any]) -> str:
+        """Enqueue a job. Returns the message id."""
+
+    @abstractmethod
+    async def receive(self, max_jobs: int, wait_s: int) -> List[ReceivedJob]:
+        """Long-poll for up to max_jobs; each stays invisible to other workers for the visibility timeout."""
+
+    @abstractmethod
+    async def ack(self, job: ReceivedJob):
+        """Job finished — delete it."""
+
+    @abstractmethod
+    async def extend(self, job: ReceivedJob, seconds: int):
+        """Heartbeat: keep a long-running job invisible for another `seconds`."""
+
+    @abstractmethod
+    async def retry(self, job: ReceivedJob, delay_s: int):
+        """Make the job visible again after delay_s (redelivery counts towards the DLQ limit)."""
+
+
+class SQSJobQueue(JobQueue):
+    def __init__(self, queue_url: str = SQS_TRIAGE_QUEUE_URL, sqs_client=None):
+        import boto3
+
+        self.queue_url = queue_url
+        self._sqs = sqs_client or boto3.client("sqs", region_name=AWS_REGION)
+        logger.info(json.dumps({"event": "job_queue_init", "backend": "sqs", "queue_url": queue_url}))
+
+    async def send(self, body: Dict[str, Any]) -> str:
+        resp = await run_in_threadpool(self._sqs.send_message, QueueUrl=self.queue_url, MessageBody=json.dumps(body))
+        return resp["MessageId"]
+
+    async def receive(self, max_jobs: int, wait_s: int) -> List[ReceivedJob]:
+        resp = await run_in_threadpool(
+            self._sqs.receive_message,
+            QueueUrl=self.queue_url,
+            MaxNumberOfMessages=max(1, min(max_jobs, 10)),
+            WaitTimeSeconds=min(wait_s, 20),
+            VisibilityTimeout=TRIAGE_JOB_VISIBILITY_S,
+            AttributeNames=["ApproximateReceiveCount"]
+        )
+        return [
+            ReceivedJob(
+                body=json.loads(m["Body"]),
+                receipt=m["ReceiptHandle"],
+                receive_count=int(m.get("Attributes", {}).get("ApproximateReceiveCount", 1))
+            )
+            for m in resp.get("Messages", [])
+        ]
+
+    async def ack(self, job: ReceivedJob):
+        await run_in_threadpool(self._sqs.delete_message, QueueUrl=self.queue_url, ReceiptHandle=job.receipt)
+
+    async def extend(self, job: ReceivedJob, seconds: int):
+        await run_in_threadpool(
+            self._sqs.change_message_visibility,
+            QueueUrl=self.queue_url, ReceiptHandle=job.receipt, VisibilityTimeout=seconds
+        )
+
+    async def retry(self, job: ReceivedJob, delay_s: int):
+        await self.extend(job, delay_s)
+
+
+class SQLiteJobQueue(JobQueue):
+    """Single-host stand-in for SQS. Rows past TRIAGE_JOB_MAX_RECEIVES move to the dead-letter state."""
+
+    def __init__(self, path: str = TRIAGE_JOB_DB, max_receives: int = TRIAGE_JOB_MAX_RECEIVES):
+        self.path = path
+        self.max_receives = max_receives
+        self._lock = threading.Lock()
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                body TEXT NOT NULL,
+                visible_at REAL NOT NULL,
+                receive_count INTEGER NOT NULL DEFAULT 0,
+                receipt TEXT,
+                dead INTEGER NOT NULL DEFAULT 0,
+                created_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_visible ON jobs (dead, visible_at)")
+        logger.info(json.dumps({"event": "job_queue_init", "backend": "sqlite", "path": path}))
+
+    def _send(self, body: Dict[str, Any]) -> str:
+        job_id = str(uuid.uuid4())
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, body, visible_at, created_at) VALUES (?, ?, ?, ?)",
+                (job_id, json.dumps(body), now, now)
+            )
+        return job_id
+
+    def _claim(self, max_jobs: int) -> List[ReceivedJob]:
+        now = time.time()
+        claimed: List[ReceivedJob] = []
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")  # serialises claims across worker processes
+            try:
+                rows = self._conn.execute(
+                    "SELECT id, body, receive_count FROM jobs WHERE dead = 0 AND visible_at <= ? ORDER BY created_at LIMIT ?",
+                    (now, max_jobs)
+                ).fetchall()
+                for job_id, body, count in rows:
+                    if count >= self.max_receives:
+                        self._conn.execute("UPDATE jobs SET dead = 1 WHERE id = ?", (job_id,))
+                        logger.error(json.dumps({"event": "triage_job_dead_lettered", "job_id": job_id, "receives": count}))
+                        continue
+                    receipt = f"{job_id}:{uuid.uuid4().hex}"
+                    self._conn.execute(
+                        "UPDATE jobs SET visible_at = ?, receive_count = receive_count + 1, receipt = ? WHERE id = ?",
+                        (now + TRIAGE_JOB_VISIBILITY_S, receipt, job_id)
+                    )
+                    claimed.append(ReceivedJob(body=json.loads(body), receipt=receipt, receive_count=count + 1))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return claimed
+
+    def _update(self, sql: str, params: tuple):
+        with self._lock:
+            self._conn.execute(sql, params)
+
+    async def send(self, body: Dict[str, Any]) -> str:
+        return await run_in_threadpool(self._send, body)
+
+    async def receive(self, max_jobs: int, wait_s: int) -> List[ReceivedJob]:
+        deadline = time.time() + wait_s
+        while True:
+            jobs = await run_in_threadpool(self._claim, max_jobs)
+            if jobs or time.time() >= deadline:
+                return jobs
+            await asyncio.sleep(0.5)
+
+    async def ack(self, job: ReceivedJob):
+        # Receipt check: a worker whose visibility lapsed must not delete a job another worker now owns
+        await run_in_threadpool(self._update, "DELETE FROM jobs WHERE receipt = ?", (job.receipt,))
+
+    async def extend(self, job: ReceivedJob, seconds: int):
+        await run_in_threadpool(
+            self._update, "UPDATE jobs SET visible_at = ? WHERE receipt = ?", (time.time() + seconds, job.receipt)
+        )
+
+    async def retry(self, job: ReceivedJob, delay_s: int):
+        await self.extend(job, delay_s)
+
+
+class TriageWorker:
+    """
+    Pulls jobs and runs `handler(body)` with at most `concurrency` jobs in flight.
+    A heartbeat extends visibility while a job runs, so slow MedGemma cold starts
+    are not redelivered to another replica. Handler exceptions schedule a retry
+    with exponential backoff; the queue dead-letters after the max receive count.
+    """
+
+    def __init__(
+        self,
+        queue: JobQueue,
+        handler: Callable[[Dict[str, Any]], Awaitable[None]],
+        concurrency: int = TRIAGE_WORKER_CONCURRENCY
+    ):
+        self.queue = queue
+        self.handler = handler
+        self.concurrency = concurrency
+        self._slots = asyncio.Semaphore(concurrency)
+        self._tasks: set = set()
+        self._stopping = False
+
+    async def run(self):
+        logger.info(json.dumps({"event": "triage_worker_started", "concurrency": self.concurrency}))
+        while not self._stopping:
+            await self._slots.acquire()
+            free = 1
+            while free < self.concurrency and not self._slots.locked():
+                await self._slots.acquire()
+                free += 1
+            try:
+                jobs = await self.queue.receive(max_jobs=free, wait_s=20)
+            except Exception as e:
+                logger.warning(json.dumps({"event": "triage_job_receive_failed", "error": str(e)}))
+                jobs = []
+                await asyncio.sleep(5)
+            for _ in range(free - len(jobs)):
+                self._slots.release()
+            for job in jobs:
+                task = asyncio.ensure_future(self._run_job(job))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+
+    async def stop(self):
+        """Stop pulling new jobs and wait for in-flight ones (unfinished jobs are redelivered anyway)."""
+        self._stopping = True
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def _heartbeat(self, job: ReceivedJob):
+        while True:
+            await asyncio.sleep(TRIAGE_JOB_VISIBILITY_S / 2)
+            try:
+                await self.queue.extend(job, TRIAGE_JOB_VISIBILITY_S)
+            except Exception as e:
+                logger.warning(json.dumps({"event": "triage_job_heartbeat_failed", "error": str(e)}))
+
+    async def _run_job(self, job: ReceivedJob):
+        heartbeat = asyncio.ensure_future(self._heartbeat(job))
+        t_start = time.time()
+        try:
+            await self.handler(job.body)
+            await self.queue.ack(job)
+            logger.info(json.dumps({
+                "event": "triage_job_complete",
+                "triage_id": job.body.get("triage_id"),
+                "attempt": job.receive_count,
+                "latency_s": round(time.time() - t_start, 2)
+            }))
+        except Exception as e:
+            delay = TRIAGE_RETRY_BASE_S * (2 ** (job.receive_count - 1))
+            logger.error(json.dumps({
+                "event": "triage_job_failed",
+                "triage_id": job.body.get("triage_id"),
+                "attempt": job.receive_count,
+                "retry_in_s": delay,
+                "error": str(e)
+            }))
+            try:
+                await self.queue.retry(job, delay)
+            except Exception:
+                pass  # visibility timeout expires on its own
+        finally:
+            heartbeat.cancel()
+            self._slots.release()
+
+
+_queue: Optional[JobQueue] = None
+
+
+def get_job_queue() -> JobQueue:
+    """SQS when SQS_TRIAGE_QUEUE_URL is set, otherwise the local SQLite stand-in."""
+    global _queue
+    if _queue is None:
+        _queue = SQSJobQueue() if SQS_TRIAGE_QUEUE_URL else SQLiteJobQueue()
+    return _queue
@@ -0,0 +1,152 @@
+"""
+JSON schemas for structured MedGemma output.
+
+Passed to InferenceProvider.invoke(schema=...), which hands them to the backend's
+constrained decoder (Ollama `format`, TGI `grammar`). Output is then guaranteed
+to be a single JSON document of the right shape: no preamble, no markdown
+fences, no failed parses. Schemas stay deliberately small, because TGI compiles
+each one into a grammar and every optional branch costs decode time.
+"""
+
+import os
+from typing import Any, Dict
+from services.triage_service import SOAPNote
+
+# Token budgets sized to the schemas (typical outputs are well under these)
+SOAP_MAX_TOKENS = int(os.getenv("SOAP_MAX_TOKENS", "768"))
+FHIR_MAX_TOKENS = int(os.getenv("FHIR_MAX_TOKENS", "1536"))
+
+TRIAGE_TIERS = ["EMERGENCY", "URGENT", "SEMI_URGENT", "ROUTINE"]
+
+
+def _strip_titles(schema: Any) -> Any:
+    """Drop pydantic's "title" keys — they add grammar states without constraining anything."""
+    if isinstance(schema, dict):
+        return {k: _strip_titles(v) for k, v in schema.items() if k != "title"}
+    if isinstance(schema, list):
+        return [_strip_titles(v) for v in schema]
+    return schema
+
+
+def _soap_note_schema() -> Dict[str, Any]:
+    schema = _strip_titles(SOAPNote.model_json_schema())
+    schema["additionalProperties"] = False
+    return schema
+
+
+SOAP_RESPONSE_SCHEMA: Dict[str, Any] = {
+    "type": "object",
+    "properties": {
+        "soap_note": _soap_note_schema(),
+        "metadata": {
+            "type": "object",
+            "properties": {
+                "symptoms": {
+                    "type": "array",
+                    "maxItems": 8,
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "name": {"type": "string"},
+                            "severity": {"type": "string", "enum": ["MILD", "MODERATE", "SEVERE"]},
+                            "category": {"type": "string"}
+                        },
+                        "required": ["name", "severity", "category"],
+                        "additionalProperties": False
+                    }
+                },
+                "triage_tier": {"type": "string", "enum": TRIAGE_TIERS},
+                "clinical_reasoning": {"type": "string"},
+                "red_flags_present": {"type": "boolean"}
+            },
+            "required": ["symptoms", "triage_tier", "clinical_reasoning", "red_flags_present"],
+            "additionalProperties": False
+        }
+    },
+    "required": ["soap_note", "metadata"],
+    "additionalProperties": False
+}
+
+# FHIR R4 subset actually produced for export: Composition (SOAP), Patient, vital-sign Observations
+_CODING = {
+    "type": "object",
+    "properties": {
+        "system": {"type": "string"},
+        "code": {"type": "string"},
+        "display": {"type": "string"}
+    },
+    "required": ["system", "code"]
+}
+
+_REFERENCE = {"type": "object", "properties": {"reference": {"type": "string"}}, "required": ["reference"]}
+
+FHIR_BUNDLE_SCHEMA: Dict[str, Any] = {
+    "type": "object",
+    "properties": {
+        "resourceType": {"type": "string", "enum": ["Bundle"]},
+        "type": {"type": "string", "enum": ["document", "collection"]},
+        "entry": {
+            "type": "array",
+            "minItems": 2,
+            "maxItems": 10,
+            "items": {
+                "type": "object",
+                "properties": {
+                    "fullUrl": {"type": "string"},
+                    "resource": {
+                        "type": "object",
+                        "properties": {
+                            "resourceType": {"type": "string", "enum": ["Composition", "Patient", "Observation"]},
+                            "id": {"type": "string"},
+                            "status": {"type": "string"},
+                            "identifier": {
+                                "type": "array",
+                                "items": {
+                                    "type": "object",
+                                    "properties": {"system": {"type": "string"}, "value": {"type": "string"}},
+                                    "required": ["value"]
+                                }
+                            },
+                            "code": {
+                                "type": "object",
+                                "properties": {"coding": {"type": "array", "items": _CODING}, "text": {"type": "string"}}
+                            },
+                            "subject": _REFERENCE,
+                            "title": {"type": "string"},
+                            "date": {"type": "string"},
+                            "effectiveDateTime": {"type": "string"},
+                            "valueQuantity": {
+                                "type": "object",
+                                "properties": {
+                                    "value": {"type": "number"},
+                                    "unit": {"type": "string"},
+                                    "system": {"type": "string"},
+                                    "code": {"type": "string"}
+                                },
+                                "required": ["value", "unit"]
+                            },
+                            "section": {
+                                "type": "array",
+                                "items": {
+                                    "type": "object",
+                                    "properties": {
+                                        "title": {"type": "string"},
+                                        "text": {
+                                            "type": "object",
+                                            "properties": {"status": {"type": "string"}, "div": {"type": "string"}},
+                                            "required": ["status", "div"]
+                                        }
+                                    },
+                                    "required": ["title", "text"]
+                                }
+                            }
+                        },
+                        "required": ["resourceType"]
+                    }
+                },
+                "required": ["resource"]
+            }
+        }
+    },
+    "required": ["resourceType", "type", "entry"]
+}
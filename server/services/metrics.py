@@ -0,0 +1,205 @@
+"""
+In-process metrics registry, rendered in Prometheus text format by GET /metrics.
+
+Per-stage latency histograms are what show where the 25-second triage SLA is
+spent under load (decode, ASR, HeAR, LLM queue wait vs generation, DB writes,
+FHIR export). p50/p95/p99 come from histogram_quantile() on the scrape side.
+
+Metrics are per process. With several uvicorn workers, scrape each worker
+(or run one worker per task) — values are not aggregated across processes.
+"""
+
+import time
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Seconds. Covers sub-millisecond DB writes through multi-minute SageMaker cold starts.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 25.0, 60.0, 120.0, 300.0)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, str]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    return "+Inf" if value == float("inf") else repr(float(value))
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        self._lock = threading.Lock()
+        self._series: Dict[LabelKey, List[float]] = {}  # bucket counts..., sum, count
+
+    def observe(self, value: float, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0.0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the wall-clock duration of the enclosed block (sync or async code)."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = {k: list(v) for k, v in self._series.items()}
+        for key, series in sorted(snapshot.items()):
+            for bound, count in zip(self.buckets, series):
+                lines.append(f"{self.name}_bucket{_format_labels(key, ('le', _format_value(bound)))} {int(count)}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {_format_value(series[-2])}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {int(series[-1])}")
+        return lines
+
+
+class Gauge:
+    """Settable gauge, or a callback gauge when `collect` is given (sampled at scrape time)."""
+
+    def __init__(self, name: str, documentation: str, collect: Optional[Callable[[], float]] = None):
+        self.name = name
+        self.documentation = documentation
+        self._collect = collect
+        self._lock = threading.Lock()
+        self._values: Dict[LabelKey, float] = {}
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[_label_key(labels)] = value
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+    @contextmanager
+    def track_inprogress(self, **labels):
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} gauge"]
+        if self._collect is not None:
+            try:
+                self.set(self._collect())
+            except Exception:
+                pass  # a failing probe must never break the scrape
+        with self._lock:
+            snapshot = dict(self._values)
+        for key, value in sorted(snapshot.items()):
+            lines.append(f"{self.name}{_format_labels(key)} {_format_value(value)}")
+        return lines
+
+
+class Counter:
+    """Monotonic counter (requests, cache hits, …)."""
+
+    def __init__(self, name: str, documentation: str):
+        self.name = name
+        self.documentation = documentation
+        self._lock = threading.Lock()
+        self._values: Dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(_label_key(labels), 0.0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            snapshot = dict(self._values)
+        for key, value in sorted(snapshot.items()):
+            lines.append(f"{self.name}{_format_labels(key)} {_format_value(value)}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+
+    def histogram(self, name: str, documentation: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self._metrics.setdefault(name, Histogram(name, documentation, buckets))
+
+    def gauge(self, name: str, documentation: str, collect: Optional[Callable[[], float]] = None) -> Gauge:
+        return self._metrics.setdefault(name, Gauge(name, documentation, collect))
+
+    def counter(self, name: str, documentation: str) -> Counter:
+        return self._metrics.setdefault(name, Counter(name, documentation))
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+# ── Pipeline stages ──────────────────────────────────────────────────────────
+DECODE_SECONDS = REGISTRY.histogram("vaidya_audio_decode_seconds", "Audio upload decode to 16 kHz PCM.")
+ASR_SECONDS = REGISTRY.histogram("vaidya_asr_seconds", "Whisper transcription, submit to transcript.")
+HEAR_SECONDS = REGISTRY.histogram("vaidya_hear_seconds", "HeAR acoustic anomaly analysis.")
+LLM_QUEUE_WAIT_SECONDS = REGISTRY.histogram("vaidya_llm_queue_wait_seconds", "Time a MedGemma call waited for an admission slot.")
+LLM_GENERATION_SECONDS = REGISTRY.histogram("vaidya_llm_generation_seconds", "MedGemma generation time once admitted.")
+DB_WRITE_SECONDS = REGISTRY.histogram("vaidya_db_write_seconds", "Triage store write latency.")
+DB_WRITE_CONFLICTS = REGISTRY.counter("vaidya_db_write_conflicts_total", "Versioned triage saves that raced another write and were rebased.")
+FHIR_EXPORT_SECONDS = REGISTRY.histogram("vaidya_fhir_export_seconds", "FHIR bundle generation and export.")
+PIPELINE_SECONDS = REGISTRY.histogram("vaidya_triage_pipeline_seconds", "End-to-end audio triage pipeline.")
+
+# ── Load ─────────────────────────────────────────────────────────────────────
+PIPELINE_INFLIGHT = REGISTRY.gauge("vaidya_triage_jobs_in_flight", "Audio triage pipelines currently running.")
+LLM_WAITING = REGISTRY.gauge("vaidya_llm_waiting", "MedGemma calls waiting for an admission slot.")
+LLM_INFLIGHT = REGISTRY.gauge("vaidya_llm_in_flight", "MedGemma calls currently generating.")
+
+
+def _threadpool_borrowed() -> float:
+    from anyio import to_thread
+    return to_thread.current_default_thread_limiter().borrowed_tokens
+
+
+def _threadpool_total() -> float:
+    from anyio import to_thread
+    return to_thread.current_default_thread_limiter().total_tokens
+
+
+# Starlette's run_in_threadpool draws from anyio's default limiter; sampled on the event loop at scrape time
+THREADPOOL_BUSY = REGISTRY.gauge("vaidya_threadpool_busy", "Worker threads in use by run_in_threadpool.", _threadpool_borrowed)
+THREADPOOL_SIZE = REGISTRY.gauge("vaidya_threadpool_size", "Capacity of the run_in_threadpool limiter.", _threadpool_total)
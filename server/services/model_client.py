@@ -0,0 +1,169 @@
+"""
+Client for the shared model server (model_server.py).
+
+API workers no longer load Whisper/HeAR themselves. They decode audio locally,
+copy the PCM once into a POSIX shared-memory block and send only its name over
+a Unix socket. The model server maps the same block, runs inference and replies
+with a small JSON result. Frames are length-prefixed JSON (4-byte big-endian).
+"""
+
+import os
+import json
+import time
+import socket
+import struct
+import asyncio
+import logging
+import numpy as np
+from multiprocessing import shared_memory, resource_tracker
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+MODEL_SERVER_SOCKET = os.getenv("MODEL_SERVER_SOCKET", "")
+MODEL_SERVER_CONNECT_TIMEOUT = float(os.getenv("MODEL_SERVER_CONNECT_TIMEOUT", "120"))
+MODEL_SERVER_PING_TIMEOUT = float(os.getenv("MODEL_SERVER_PING_TIMEOUT", "2"))
+
+_HEADER = struct.Struct(">I")
+
+
+class ModelServerError(Exception):
+    """Raised when the model server is unreachable or returns an error."""
+    pass
+
+
+# ── Framing (shared with model_server.py) ────────────────────────────────────
+
+def encode_message(payload: Dict[str, Any]) -> bytes:
+    body = json.dumps(payload).encode("utf-8")
+    return _HEADER.pack(len(body)) + body
+
+
+async def read_message(reader: asyncio.StreamReader) -> Optional[Dict[str, Any]]:
+    try:
+        header = await reader.readexactly(_HEADER.size)
+        body = await reader.readexactly(_HEADER.unpack(header)[0])
+    except asyncio.IncompleteReadError:
+        return None
+    return json.loads(body)
+
+
+def _recv_exact(sock: socket.socket, n: int) -> bytes:
+    buf = bytearray()
+    while len(buf) < n:
+        part = sock.recv(n - len(buf))
+        if not part:
+            raise ModelServerError("Model server closed the connection")
+        buf.extend(part)
+    return bytes(buf)
+
+
+def attach_pcm(name: str, samples: int):
+    """Map a client's shared-memory block as a read-only float32 array (server side)."""
+    shm = shared_memory.SharedMemory(name=name)
+    # The client owns the block's lifetime; stop this process's tracker from unlinking it at exit
+    try:
+        resource_tracker.unregister(shm._name, "shared_memory")
+    except Exception:
+        pass
+    pcm = np.ndarray((samples,), dtype=np.float32, buffer=shm.buf)
+    pcm.flags.writeable = False
+    return shm, pcm
+
+
+# ── Client ───────────────────────────────────────────────────────────────────
+
+class ModelServerClient:
+    def __init__(self, socket_path: str = MODEL_SERVER_SOCKET, connect_timeout: float = MODEL_SERVER_CONNECT_TIMEOUT):
+        self.socket_path = socket_path
+        self.connect_timeout = connect_timeout
+        logger.info(json.dumps({"event": "model_client_init", "socket": socket_path}))
+
+    def _share(self, pcm: np.ndarray) -> shared_memory.SharedMemory:
+        shm = shared_memory.SharedMemory(create=True, size=max(pcm.nbytes, 1))
+        np.ndarray(pcm.shape, dtype=np.float32, buffer=shm.buf)[:] = pcm
+        return shm
+
+    def _request(self, op: str, shm: shared_memory.SharedMemory, samples: int, **params) -> Dict[str, Any]:
+        return {"op": op, "shm": shm.name, "samples": samples, **params}
+
+    def _unwrap(self, response: Optional[Dict[str, Any]]) -> Any:
+        if response is None:
+            raise ModelServerError("Model server closed the connection")
+        if not response.get("ok"):
+            raise ModelServerError(response.get("error", "unknown model server error"))
+        return response["result"]
+
+    def call(self, op: str, pcm: np.ndarray, **params) -> Any:
+        """Blocking call — for code already running in a threadpool thread."""
+        shm = self._share(pcm)
+        try:
+            deadline = time.time() + self.connect_timeout
+            while True:
+                try:
+                    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                    sock.connect(self.socket_path)
+                    break
+                except (FileNotFoundError, ConnectionRefusedError):
+                    sock.close()
+                    if time.time() > deadline:
+                        raise ModelServerError(f"Model server not reachable at {self.socket_path}")
+                    time.sleep(1)  # server may still be loading weights
+            with sock:
+                sock.sendall(encode_message(self._request(op, shm, len(pcm), **params)))
+                size = _HEADER.unpack(_recv_exact(sock, _HEADER.size))[0]
+                return self._unwrap(json.loads(_recv_exact(sock, size)))
+        finally:
+            shm.close()
+            shm.unlink()
+
+    async def call_async(self, op: str, pcm: np.ndarray, **params) -> Any:
+        """Non-blocking call — waits on the socket without holding a threadpool thread."""
+        shm = self._share(pcm)
+        try:
+            deadline = time.time() + self.connect_timeout
+            while True:
+                try:
+                    reader, writer = await asyncio.open_unix_connection(self.socket_path)
+                    break
+                except (FileNotFoundError, ConnectionRefusedError):
+                    if time.time() > deadline:
+                        raise ModelServerError(f"Model server not reachable at {self.socket_path}")
+                    await asyncio.sleep(1)
+            try:
+                writer.write(encode_message(self._request(op, shm, len(pcm), **params)))
+                await writer.drain()
+                return self._unwrap(await read_message(reader))
+            finally:
+                writer.close()
+        finally:
+            shm.close()
+            shm.unlink()
+
+    def ping(self, timeout: float = MODEL_SERVER_PING_TIMEOUT):
+        """Blocking health round trip (no retries). Raises ModelServerError unless the server answers."""
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                sock.settimeout(timeout)
+                sock.connect(self.socket_path)
+                sock.sendall(encode_message({"op": "ping"}))
+                size = _HEADER.unpack(_recv_exact(sock, _HEADER.size))[0]
+                self._unwrap(json.loads(_recv_exact(sock, size)))
+        except OSError as e:  # missing / stale socket, refused, timed out
+            raise ModelServerError(f"Model server not answering at {self.socket_path}: {e}")
+
+    async def ping_async(self, timeout: float = MODEL_SERVER_PING_TIMEOUT):
+        """Non-blocking ping() for the readiness probe."""
+        async def round_trip():
+            reader, writer = await asyncio.open_unix_connection(self.socket_path)
+            try:
+                writer.write(encode_message({"op": "ping"}))
+                await writer.drain()
+                self._unwrap(await read_message(reader))
+            finally:
+                writer.close()
+
+        try:
+            await asyncio.wait_for(round_trip(), timeout)
+        except (OSError, asyncio.TimeoutError) as e:
+            raise ModelServerError(f"Model server not answering at {self.socket_path}: {e!r}")
@@ -3,6 +3,8 @@ from datetime import datetime
 from typing import List, Optional
 from pydantic import BaseModel
 import uuid
+from services.dynamo_async import AsyncTable
+from services.sqlite_store import SQLITE_DB_PATH, get_sqlite_store
 
 APP_ENV = os.getenv("APP_ENV", "dev")
 
@@ -92,15 +94,12 @@ def _deserialize(item: dict) -> Patient:
 
 class DynamoDBPatientService:
     def __init__(self):
-        import boto3
-        region = os.getenv("AWS_REGION", "ap-south-1")
         self.table_name = os.getenv("DYNAMODB_PATIENTS_TABLE", "vaidyasaarathi-demo-v2-patients")
-        self._ddb = boto3.resource("dynamodb", region_name=region)
-        self._table = self._ddb.Table(self.table_name)
+        self._table = AsyncTable(self.table_name)
         print(f"[DEMO] DynamoDBPatientService connected to table: {self.table_name}")
 
     async def get_patient_by_id(self, hospital_id: str) -> Optional[Patient]:
-        response = self._table.get_item(Key={"hospital_id": hospital_id})
+        response = await self._table.get_item(Key={"hospital_id": hospital_id})
         item = response.get("Item")
         return _deserialize(item) if item else None
 
@@ -125,17 +124,66 @@ class DynamoDBPatientService:
         item = patient.model_dump()
         item["created_at"] = item["created_at"].isoformat()
         item["updated_at"] = item["updated_at"].isoformat()
-        self._table.put_item(Item=item)
+        await self._table.put_item(Item=item)
+        return patient
+
+
+# ── SQLite PatientService (single-node, SQLITE_DB_PATH) ──────────────────────
+
+PATIENT_SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS patients (
+        hospital_id TEXT PRIMARY KEY,
+        data TEXT NOT NULL
+    )""",
+)
+
+
+class SQLitePatientService:
+    def __init__(self):
+        self._db = get_sqlite_store(SQLITE_DB_PATH, PATIENT_SCHEMA)
+        print(f"[DB] SQLitePatientService using {SQLITE_DB_PATH}")
+
+    async def get_patient_by_id(self, hospital_id: str) -> Optional[Patient]:
+        row = await self._db.fetchone("SELECT data FROM patients WHERE hospital_id = ?", (hospital_id,))
+        if row is None:
+            return MOCK_PATIENTS.get(hospital_id) if APP_ENV != "demo" else None  # dev seed patients
+        return Patient.model_validate_json(row[0])
+
+    async def get_patient_by_qr_code(self, qr_data: str) -> Optional[Patient]:
+        return await self.get_patient_by_id(qr_data)
+
+    async def create_patient(self, data: dict) -> Patient:
+        hospital_id = data.get("hospital_id", f"P-{uuid.uuid4().hex[:6].upper()}")
+        now = datetime.utcnow()
+        patient = Patient(
+            id=str(uuid.uuid4()),
+            hospital_id=hospital_id,
+            name=data.get("name", "Unknown"),
+            date_of_birth=data.get("date_of_birth", "2000-01-01"),
+            gender=data.get("gender", "Unspecified"),
+            contact_number=data.get("contact_number", ""),
+            address=data.get("address", ""),
+            preferred_language=data.get("preferred_language", "English"),
+            created_at=now,
+            updated_at=now
+        )
+        row = (patient.hospital_id, patient.model_dump_json())
+        await self._db.write(lambda conn: conn.execute("INSERT OR REPLACE INTO patients (hospital_id, data) VALUES (?, ?)", row))
         return patient
 
 
 # ── Factory ──────────────────────────────────────────────────────────────────
 
 def get_patient_service() -> PatientService:
-    """Return the appropriate PatientService based on APP_ENV."""
+    """Return the appropriate PatientService based on APP_ENV (SQLite when SQLITE_DB_PATH is set)."""
     if APP_ENV == "demo":
         try:
             return DynamoDBPatientService()
         except Exception as e:
-            print(f"[WARNING] DynamoDB unavailable, falling back to in-memory: {e}")
+            print(f"[WARNING] DynamoDB unavailable, falling back to {'SQLite' if SQLITE_DB_PATH else 'in-memory'}: {e}")
+    if SQLITE_DB_PATH:
+        try:
+            return SQLitePatientService()
+        except Exception as e:
+            print(f"[WARNING] SQLite unavailable, falling back to in-memory: {e}")
     return PatientService()
@@ -0,0 +1,82 @@
+"""
+Read-through cache of TriageRecords in front of DynamoDBTriageService.
+
+Nurse screens poll GET /triage/{id}, and the pipeline and export paths look
+records up repeatedly. Each lookup was a GetItem round trip plus
+deserialization. The service now keeps the latest deserialized copy of hot
+records in process:
+
+- LRU-bounded to TRIAGE_CACHE_MAX_ENTRIES. An entry is served for at most
+  TRIAGE_CACHE_TTL_S after it was stored; after that it reads through again.
+- Every write path in the service stores the record it wrote (ALL_NEW / the
+  saved record). A write that fails invalidates the entry. A put never
+  replaces a newer version with an older one.
+- Writes made by other processes (triage workers) are not seen here until the
+  entry expires, or until the queue re-sync sees the changed record and
+  refreshes it. The TTL bounds how stale a read can be.
+- Callers mutate the records they get (dirty tracking, pipeline working
+  copies), so reads return a copy and never the cached object.
+
+Lookups are counted in vaidya_triage_cache_lookups_total{result=hit|miss|expired}.
+"""
+
+import os
+import time
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+from services.metrics import REGISTRY
+
+TRIAGE_CACHE_MAX_ENTRIES = int(os.getenv("TRIAGE_CACHE_MAX_ENTRIES", "2048"))
+TRIAGE_CACHE_TTL_S = float(os.getenv("TRIAGE_CACHE_TTL_S", "3"))
+
+CACHE_LOOKUPS = REGISTRY.counter("vaidya_triage_cache_lookups_total", "Triage record cache lookups by outcome.")
+CACHE_ENTRIES = REGISTRY.gauge("vaidya_triage_cache_entries", "Triage records held in the read-through cache.")
+
+
+class RecordCache:
+    def __init__(self, max_entries: int = TRIAGE_CACHE_MAX_ENTRIES, ttl_s: float = TRIAGE_CACHE_TTL_S):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[float, object]]" = OrderedDict()  # id → (expires_at, record)
+
+    def get(self, triage_id: str):
+        """A private copy of the cached record, or None (miss / expired)."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(triage_id)
+            if entry is not None and entry[0] <= now:
+                del self._entries[triage_id]
+                CACHE_ENTRIES.set(len(self._entries))
+                entry = None
+                result = "expired"
+            elif entry is None:
+                result = "miss"
+            else:
+                self._entries.move_to_end(triage_id)
+                result = "hit"
+        CACHE_LOOKUPS.inc(result=result)
+        return entry[1].model_copy(deep=True) if entry is not None else None
+
+    def put(self, record: Optional[object]):
+        if record is None or self.max_entries <= 0 or self.ttl_s <= 0:
+            return
+        snapshot = record.model_copy(deep=True)
+        snapshot.mark_clean()
+        with self._lock:
+            previous = self._entries.pop(record.id, None)
+            if previous is not None and previous[1].version > record.version:
+                snapshot = previous[1]  # never replace with an older read (e.g. a lagging GSI listing)
+            self._entries[record.id] = (time.monotonic() + self.ttl_s, snapshot)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            CACHE_ENTRIES.set(len(self._entries))
+
+    def invalidate(self, triage_id: str):
+        with self._lock:
+            if self._entries.pop(triage_id, None) is not None:
+                CACHE_ENTRIES.set(len(self._entries))
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,186 @@
+"""
+Content-addressed cache for Whisper transcripts and HeAR acoustic analysis.
+
+A nurse retrying after a network hiccup, or the same clip arriving through both
+POST /triage/ and POST /triage/audio/{id}, used to re-run tens of seconds of
+CPU inference. Results are now keyed by:
+
+    (kind, blake2b(decoded 16 kHz PCM), model/config version)
+
+- The digest is taken over the decoded PCM, so the same recording matches
+  whether it arrives as upload bytes, from the job queue or from the model-server
+  shared memory. Hashing 30 s of audio (~2 MB) takes about a millisecond.
+- The version string names the model and every setting that changes the output
+  (Whisper model + language/task, HeAR backend + window/hop). Changing the config
+  gives new keys, so stale entries are never served.
+- Memory tier: LRU bounded by RESULT_CACHE_MAX_MB of serialized JSON.
+- Disk tier (optional, RESULT_CACHE_DIR): one JSON file per key, bounded by
+  RESULT_CACHE_DISK_MAX_MB, least-recently-used files evicted first. It survives
+  restarts and is shared by every process pointing at the same directory.
+
+Only successful results are stored; error fallbacks are never cached.
+"""
+
+import os
+import json
+import hashlib
+import logging
+import threading
+import numpy as np
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
+from services.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+RESULT_CACHE_MAX_MB = float(os.getenv("RESULT_CACHE_MAX_MB", "64"))
+RESULT_CACHE_DIR = os.getenv("RESULT_CACHE_DIR", "")  # empty → memory tier only
+RESULT_CACHE_DISK_MAX_MB = float(os.getenv("RESULT_CACHE_DISK_MAX_MB", "512"))
+
+CACHE_LOOKUPS = REGISTRY.counter("vaidya_result_cache_lookups_total", "ASR / HeAR result cache lookups by outcome.")
+CACHE_BYTES = REGISTRY.gauge("vaidya_result_cache_bytes", "Bytes held by each result cache tier.")
+
+CacheKey = Tuple[str, str, str]  # (kind, audio digest, version)
+
+
+def audio_digest(pcm: np.ndarray) -> str:
+    """Content hash of decoded PCM (float32, 16 kHz mono)."""
+    return hashlib.blake2b(np.ascontiguousarray(pcm, dtype=np.float32).data, digest_size=20).hexdigest()
+
+
+class ResultCache:
+    def __init__(
+        self,
+        max_bytes: int = int(RESULT_CACHE_MAX_MB * 1024 * 1024),
+        disk_dir: str = RESULT_CACHE_DIR,
+        disk_max_bytes: int = int(RESULT_CACHE_DISK_MAX_MB * 1024 * 1024)
+    ):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, str]" = OrderedDict()  # key → serialized value, LRU order
+        self._memory_bytes = 0
+        self._disk: "OrderedDict[str, int]" = OrderedDict()  # file name → size, LRU order
+        self._disk_bytes = 0
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+            self._load_disk_index()
+
+    @staticmethod
+    def _name(key: CacheKey) -> str:
+        kind, digest, version = key
+        return f"{kind}-{digest}-{hashlib.blake2b(version.encode(), digest_size=6).hexdigest()}"
+
+    def get(self, key: CacheKey) -> Optional[Any]:
+        name = self._name(key)
+        with self._lock:
+            payload = self._memory.get(name)
+            if payload is not None:
+                self._memory.move_to_end(name)
+        tier = "memory"
+        if payload is None and self.disk_dir:
+            payload = self._read_disk(name)
+            tier = "disk"
+            if payload is not None:
+                self._put_memory(name, payload)
+        CACHE_LOOKUPS.inc(kind=key[0], result=f"hit_{tier}" if payload is not None else "miss")
+        if payload is None:
+            return None
+        logger.info(json.dumps({"event": "result_cache_hit", "kind": key[0], "tier": tier, "digest": key[1][:12]}))
+        return json.loads(payload)
+
+    def put(self, key: CacheKey, value: Any):
+        name = self._name(key)
+        payload = json.dumps(value)
+        self._put_memory(name, payload)
+        if self.disk_dir:
+            self._write_disk(name, payload)
+
+    # ── Memory tier ──────────────────────────────────────────────────────────
+
+    def _put_memory(self, name: str, payload: str):
+        size = len(payload)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._memory.pop(name, None)
+            if old is not None:
+                self._memory_bytes -= len(old)
+            self._memory[name] = payload
+            self._memory_bytes += size
+            while self._memory_bytes > self.max_bytes:
+                _, evicted = self._memory.popitem(last=False)
+                self._memory_bytes -= len(evicted)
+            CACHE_BYTES.set(self._memory_bytes, tier="memory")
+
+    # ── Disk tier ────────────────────────────────────────────────────────────
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.disk_dir, f"{name}.json")
+
+    def _load_disk_index(self):
+        entries = []
+        for entry in os.scandir(self.disk_dir):
+            if entry.name.endswith(".json"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, entry.name[:-len(".json")], stat.st_size))
+        for _, name, size in sorted(entries):
+            self._disk[name] = size
+            self._disk_bytes += size
+        CACHE_BYTES.set(self._disk_bytes, tier="disk")
+
+    def _read_disk(self, name: str) -> Optional[str]:
+        path = self._path(name)
+        try:
+            with open(path) as f:
+                payload = f.read()
+            os.utime(path)  # mtime doubles as last-access for eviction after a restart
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            logger.warning(json.dumps({"event": "result_cache_read_failed", "error": str(e)}))
+            return None
+        with self._lock:
+            if name in self._disk:
+                self._disk.move_to_end(name)
+        return payload
+
+    def _write_disk(self, name: str, payload: str):
+        path = self._path(name)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp, "w") as f:
+                f.write(payload)
+            os.replace(tmp, path)  # atomic: readers never see a partial file
+        except OSError as e:
+            logger.warning(json.dumps({"event": "result_cache_write_failed", "error": str(e)}))
+            return
+        evict = []
+        with self._lock:
+            self._disk_bytes -= self._disk.pop(name, 0)
+            self._disk[name] = len(payload)
+            self._disk_bytes += len(payload)
+            while self._disk_bytes > self.disk_max_bytes and len(self._disk) > 1:
+                old, size = self._disk.popitem(last=False)
+                self._disk_bytes -= size
+                evict.append(old)
+            CACHE_BYTES.set(self._disk_bytes, tier="disk")
+        for old in evict:
+            try:
+                os.remove(self._path(old))
+            except OSError:
+                pass
+
+
+_cache: Optional[ResultCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_result_cache() -> ResultCache:
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResultCache()
+    return _cache
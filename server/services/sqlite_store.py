@@ -0,0 +1,159 @@
+"""
+SQLite storage for single-node deployments (rural sites without AWS).
+
+Set SQLITE_DB_PATH (e.g. storage/vaidya.db) to keep triages and patients on
+disk instead of MOCK_TRIAGES / MOCK_PATIENTS. The records survive restarts,
+are shared by every worker process on the box, and non-id lookups use indexes
+instead of linear scans. It is also the fallback when DynamoDB is unreachable
+in demo mode.
+
+- WAL journal: readers never block the writer or each other, across processes.
+  synchronous=NORMAL is durable across application crashes; a power cut can
+  lose the last few commits, never corrupt the file.
+- Each I/O thread keeps its own connection. sqlite3 caches compiled statements
+  per connection (SQLITE_STATEMENT_CACHE), and every query here uses constant
+  SQL with ? parameters, so each statement is prepared once per thread.
+- Reads run on a small thread pool. All writes go through one writer thread
+  with group commit: writes queued while a commit is in progress are applied
+  together in the next transaction, so a burst of pipeline updates costs one
+  fsync rather than one per update. Each write is a function run inside that
+  transaction, so a read-modify-write cannot interleave with another.
+"""
+
+import os
+import json
+import sqlite3
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SQLITE_DB_PATH = os.getenv("SQLITE_DB_PATH", "")  # empty → in-memory dicts (dev) / no fallback store
+SQLITE_READ_THREADS = int(os.getenv("SQLITE_READ_THREADS", "4"))
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_STATEMENT_CACHE = 256
+
+WriteFn = Callable[[sqlite3.Connection], Any]
+
+
+class SQLiteStore:
+    def __init__(self, path: str, schema: Iterable[str] = ()):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        self._readers = ThreadPoolExecutor(max_workers=SQLITE_READ_THREADS, thread_name_prefix="sqlite-read")
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite-write")
+        self._lock = threading.Lock()
+        self._pending: List[Tuple[WriteFn, asyncio.AbstractEventLoop, asyncio.Future]] = []
+        self._flush_scheduled = False
+        self._conn().execute("PRAGMA journal_mode=WAL")
+        self.ensure_schema(schema)
+        logger.info(json.dumps({"event": "sqlite_store_opened", "path": path}))
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(
+                self.path,
+                timeout=SQLITE_BUSY_TIMEOUT_MS / 1000,
+                check_same_thread=False,
+                cached_statements=SQLITE_STATEMENT_CACHE,
+                isolation_level=None  # transactions are explicit (see _flush)
+            )
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+            self._local.conn = conn
+        return conn
+
+    def ensure_schema(self, schema: Iterable[str]):
+        """Idempotent DDL (CREATE ... IF NOT EXISTS) — each service adds its own tables."""
+        conn = self._conn()
+        for statement in schema:
+            conn.execute(statement)
+
+    # ── Reads ────────────────────────────────────────────────────────────────
+
+    def _fetch(self, sql: str, params: tuple) -> List[tuple]:
+        return self._conn().execute(sql, params).fetchall()
+
+    async def fetchall(self, sql: str, params: tuple = ()) -> List[tuple]:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._readers, self._fetch, sql, params)
+
+    async def fetchone(self, sql: str, params: tuple = ()) -> Optional[tuple]:
+        rows = await self.fetchall(sql, params)
+        return rows[0] if rows else None
+
+    # ── Writes (group commit) ────────────────────────────────────────────────
+
+    async def write(self, fn: WriteFn) -> Any:
+        """Run fn(conn) in the next write transaction and return its result."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        with self._lock:
+            self._pending.append((fn, loop, future))
+            schedule = not self._flush_scheduled
+            self._flush_scheduled = True
+        if schedule:
+            self._writer.submit(self._flush)
+        return await future
+
+    def _flush(self):
+        with self._lock:
+            batch, self._pending = self._pending, []
+            self._flush_scheduled = False
+        conn = self._conn()
+        results = []
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for fn, _, _ in batch:
+                conn.execute("SAVEPOINT write")
+                try:
+                    results.append((True, fn(conn)))
+                    conn.execute("RELEASE write")
+                except Exception as e:
+                    # One failing write must not take the rest of the batch with it
+                    conn.execute("ROLLBACK TO write")
+                    conn.execute("RELEASE write")
+                    results.append((False, e))
+            conn.execute("COMMIT")
+        except Exception as e:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            logger.error(json.dumps({"event": "sqlite_commit_failed", "writes": len(batch), "error": str(e)}))
+            results = [(False, e)] * len(batch)
+        for (_, loop, future), (ok, value) in zip(batch, results):
+            loop.call_soon_threadsafe(_resolve, future, ok, value)
+
+    def close(self):
+        self._writer.shutdown(wait=True)
+        self._readers.shutdown(wait=True)
+
+
+def _resolve(future: asyncio.Future, ok: bool, value: Any):
+    if future.cancelled():
+        return
+    if ok:
+        future.set_result(value)
+    else:
+        future.set_exception(value)
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_sqlite_store(path: str = SQLITE_DB_PATH, schema: Iterable[str] = ()) -> SQLiteStore:
+    """One store per database file per process; each caller adds its own tables (idempotent DDL)."""
+    with _stores_lock:
+        store = _stores.get(path)
+        if store is None:
+            _stores[path] = SQLiteStore(path, schema)
+            return _stores[path]
+    store.ensure_schema(schema)
+    return store
@@ -0,0 +1,98 @@
+"""
+Process startup: background warm-up and readiness state.
+
+Heavy modules (faster-whisper, TensorFlow, librosa) are imported where they are
+used, so importing main.py is cheap and /health/live answers within seconds.
+The expensive work runs as named warm-up steps, selected by STARTUP_MODE:
+
+- background (default) — steps start after the server is accepting connections.
+                         /health/ready returns 503 until all of them succeed.
+- eager                — the startup hook awaits the steps before uvicorn serves
+                         anything (the old behaviour; no traffic before models).
+- lazy                 — no warm-up. Models load on the first request that needs
+                         them, and readiness does not wait for them (dev reloads).
+
+Each step runs on the default asyncio executor, not Starlette's threadpool, so a
+multi-minute model load never holds a request thread. Per-step durations go to
+the startup gauge on /metrics. For import-time regressions, run
+scripts/profile_startup.py.
+"""
+
+import os
+import json
+import time
+import asyncio
+import logging
+import threading
+from typing import Callable, Dict, List, Tuple
+from services.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+STARTUP_MODE = os.getenv("STARTUP_MODE", "background").lower()
+
+STARTUP_SECONDS = REGISTRY.gauge("vaidya_startup_seconds", "Duration of each startup phase (module import, warm-up steps).")
+READY = REGISTRY.gauge("vaidya_ready", "1 once every warm-up step has completed, else 0.")
+
+
+class Readiness:
+    """Tracks named warm-up steps: pending → ready | failed."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._steps: Dict[str, str] = {}
+        self.started_at = time.time()
+        READY.set(1)
+
+    def register(self, name: str):
+        with self._lock:
+            self._steps[name] = "pending"
+        READY.set(0)
+
+    def mark(self, name: str, state: str):
+        with self._lock:
+            self._steps[name] = state
+            ready = all(s == "ready" for s in self._steps.values())
+        READY.set(1 if ready else 0)
+
+    @property
+    def ready(self) -> bool:
+        with self._lock:
+            return all(s == "ready" for s in self._steps.values())
+
+    def snapshot(self) -> Dict[str, str]:
+        with self._lock:
+            return dict(self._steps)
+
+
+READINESS = Readiness()
+
+
+def record_import_time(seconds: float):
+    STARTUP_SECONDS.set(round(seconds, 3), phase="import")
+    logger.info(json.dumps({"event": "startup_import_complete", "seconds": round(seconds, 3), "mode": STARTUP_MODE}))
+
+
+async def run_warmup(steps: List[Tuple[str, Callable[[], None]]]):
+    """Run blocking warm-up steps in order. A failing step is logged and marked, the rest still run."""
+    for name, _ in steps:
+        READINESS.register(name)
+    loop = asyncio.get_running_loop()
+    t_total = time.perf_counter()
+    for name, step in steps:
+        t_start = time.perf_counter()
+        try:
+            await loop.run_in_executor(None, step)
+            READINESS.mark(name, "ready")
+        except Exception as e:
+            READINESS.mark(name, f"failed: {str(e)[:120]}")
+            logger.error(json.dumps({"event": "warmup_step_failed", "step": name, "error": str(e)}))
+        elapsed = time.perf_counter() - t_start
+        STARTUP_SECONDS.set(round(elapsed, 3), phase=name)
+        logger.info(json.dumps({"event": "warmup_step_complete", "step": name, "seconds": round(elapsed, 3)}))
+    logger.info(json.dumps({
+        "event": "warmup_complete",
+        "ready": READINESS.ready,
+        "steps": READINESS.snapshot(),
+        "seconds": round(time.perf_counter() - t_total, 3)
+    }))
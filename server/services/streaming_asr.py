@@ -0,0 +1,126 @@
+"""
+Incremental ASR for audio streamed over WebSocket while the nurse is still recording.
+
+Protocol (see api/triage.py `/triage/stream/{triage_id}`):
+- Binary frames: 16 kHz mono PCM, little-endian int16.
+- Text frame {"event": "stop"} ends the recording.
+
+Every STREAM_CHECK_SECONDS of new audio, VAD runs over the not-yet-transcribed
+tail. Speech segments followed by at least STREAM_MIN_SILENCE_MS of silence are
+"closed" and sent to the shared Whisper batcher; the still-open segment stays
+buffered until it closes or the recording stops. When the nurse presses stop,
+only the last open segment is left to transcribe.
+"""
+
+import os
+import json
+import asyncio
+import logging
+import numpy as np
+from typing import List, Optional
+from starlette.concurrency import run_in_threadpool
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = 16000
+STREAM_CHECK_SECONDS = float(os.getenv("STREAM_CHECK_SECONDS", "2.0"))
+STREAM_MIN_SILENCE_MS = int(os.getenv("STREAM_MIN_SILENCE_MS", "600"))
+STREAM_MAX_OPEN_SECONDS = 25  # force-cut long monologues before Whisper's 30s window
+
+
+class StreamingTranscriber:
+    def __init__(self, processor, language: str):
+        from faster_whisper.vad import VadOptions
+
+        self.processor = processor
+        self.language = language
+        self._vad_options = VadOptions(min_silence_duration_ms=STREAM_MIN_SILENCE_MS)
+        self._frames: List[np.ndarray] = []     # full recording, for HeAR and storage
+        self._open: List[np.ndarray] = []       # audio not yet sent to Whisper
+        self._since_check = 0
+        self._inflight: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+        self.parts: List[str] = []
+
+    @property
+    def transcript(self) -> str:
+        return " ".join(p for p in self.parts if p).strip()
+
+    @property
+    def duration_s(self) -> float:
+        return sum(len(f) for f in self._frames) / SAMPLE_RATE
+
+    def append(self, frame: bytes):
+        """Add one binary WebSocket frame (int16 PCM) to the buffers."""
+        pcm = np.frombuffer(frame, dtype=np.int16).astype(np.float32)
+        pcm *= 1.0 / 32768.0
+        self._frames.append(pcm)
+        self._open.append(pcm)
+        self._since_check += len(pcm)
+
+    def should_check(self) -> bool:
+        idle = self._inflight is None or self._inflight.done()
+        return idle and self._since_check >= STREAM_CHECK_SECONDS * SAMPLE_RATE
+
+    def schedule(self) -> asyncio.Task:
+        """Transcribe any closed segments in the background; one check at a time."""
+        self._since_check = 0
+        self._inflight = asyncio.ensure_future(self._transcribe_closed(final=False))
+        return self._inflight
+
+    async def finish(self) -> str:
+        """Recording stopped: wait for in-flight work, transcribe the last open segment."""
+        if self._inflight:
+            await self._inflight
+        await self._transcribe_closed(final=True)
+        return self.transcript
+
+    def pcm(self) -> np.ndarray:
+        """The full recording as one read-only 16 kHz float32 buffer (same contract as decode_pcm)."""
+        data = np.concatenate(self._frames) if self._frames else np.zeros(0, dtype=np.float32)
+        data.flags.writeable = False
+        return data
+
+    # ── Internals ────────────────────────────────────────────────────────────
+
+    def _cut_point(self, tail: np.ndarray) -> tuple:
+        """(index up to which the tail holds only closed segments, whether that prefix contains speech)."""
+        from faster_whisper.vad import get_speech_timestamps
+
+        min_silence = int(STREAM_MIN_SILENCE_MS * SAMPLE_RATE / 1000)
+        spans = get_speech_timestamps(tail, self._vad_options)
+        closed = [s for s in spans if len(tail) - s["end"] >= min_silence]
+        if closed:
+            return closed[-1]["end"], True
+        if not spans:
+            # Pure silence — drop all but the last window so a speech onset is never cut
+            return max(0, len(tail) - min_silence), False
+        if len(tail) >= STREAM_MAX_OPEN_SECONDS * SAMPLE_RATE:
+            return len(tail), True
+        return 0, False
+
+    async def _transcribe_closed(self, final: bool) -> Optional[str]:
+        async with self._lock:
+            if not self._open:
+                return None
+            consumed = len(self._open)
+            tail = np.concatenate(self._open[:consumed])
+            cut, has_speech = (len(tail), True) if final else await run_in_threadpool(self._cut_point, tail)
+            if cut == 0:
+                return None
+            segment, rest = tail[:cut], tail[cut:]
+            # Frames that arrived while VAD ran stay queued behind the remainder
+            self._open = ([rest] if len(rest) else []) + self._open[consumed:]
+            if not has_speech:
+                return None
+
+            text = await self.processor.transcribe_async(segment, self.language)
+            if text and text != "Error processing audio.":
+                self.parts.append(text)
+            logger.info(json.dumps({
+                "event": "stream_segment_transcribed",
+                "segment_s": round(len(segment) / SAMPLE_RATE, 2),
+                "final": final,
+                "chars": len(text or "")
+            }))
+            return text
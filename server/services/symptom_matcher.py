@@ -0,0 +1,327 @@
+"""
+Multilingual symptom matcher for the deterministic triage guardrail.
+
+The guardrail used to run `any(kw in transcript_lower for kw in ...)` over a
+handful of English phrases. That is O(keywords × text), and transcripts in
+Hindi, Tamil or Telugu script (or with native terms left in by Whisper) skipped
+it completely. SYMPTOM_MATCHER is an Aho-Corasick automaton compiled once at
+import from SYMPTOM_LEXICON: canonical symptom, category, severity, and the
+English synonyms, romanised Hindi and native-script terms that denote it.
+One linear pass over the text returns every match. That is cheap enough to run
+on each partial streaming transcript as well as the final one.
+
+Text and terms share one normalisation: NFC, casefold, and every run of
+non-letter/mark/digit characters collapsed to a single space. Matches must start
+at a word boundary. Suffixes are allowed ("seizures", "खांसी है"), because
+inflection in all four languages is suffixing.
+"""
+
+import unicodedata
+from collections import deque
+from dataclasses import dataclass
+from typing import Dict, Generic, Iterable, Iterator, List, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+SEVERITY_RANK = {"CRITICAL": 3, "HIGH": 2, "MODERATE": 1}
+# Guardrail floor for each severity (MODERATE never escalates)
+SEVERITY_TIER = {"CRITICAL": "EMERGENCY", "HIGH": "URGENT"}
+
+# (symptom, category, severity, terms: English synonyms, romanised Hindi, हिन्दी, தமிழ், తెలుగు)
+# CRITICAL terms force EMERGENCY on their own, so each must denote the symptom without context:
+# no bare "cannot see" / "cannot move" / "not responding" (see server/test_symptom_matcher.py).
+# Terms that are right on their own but also open everyday phrases keep their place and get
+# NEGATIVE_CONTEXTS instead.
+SYMPTOM_LEXICON: List[Tuple[str, str, str, Tuple[str, ...]]] = [
+    # ── CRITICAL ─────────────────────────────────────────────────────────────
+    ("chest pain", "cardiac", "CRITICAL", (
+        "chest pain", "chest tightness", "pain in chest", "pain in my chest", "crushing chest",
+        "seene mein dard", "chhati mein dard", "chhati me dard",
+        "सीने में दर्द", "छाती में दर्द", "सीने में जकड़न",
+        "நெஞ்சு வலி", "நெஞ்சுவலி", "மார்பு வலி", "மார்புவலி",
+        "ఛాతీ నొప్పి", "ఛాతి నొప్పి", "గుండె నొప్పి",
+    )),
+    ("severe breathlessness", "respiratory", "CRITICAL", (
+        "severe breathlessness", "cannot breathe", "can t breathe", "unable to breathe",
+        "gasping for breath", "gasping for air",
+        "saans nahi aa rahi",
+        "सांस नहीं आ रही", "साँस नहीं आ रही", "सांस लेने में बहुत तकलीफ",
+        "மூச்சு விட முடியவில்லை",
+        "ఊపిరి ఆడటం లేదు",
+    )),
+    ("unconscious", "neurological", "CRITICAL", (
+        "unconscious", "unresponsive", "passed out", "loss of consciousness",
+        "behosh",
+        "बेहोश",
+        "சுயநினைவு இல்லை", "சுயநினைவு இழந்",
+        "స్పృహ కోల్పోయ", "స్పృహ లేదు",
+    )),
+    ("seizure", "neurological", "CRITICAL", (
+        "seizure", "convulsion", "epileptic",
+        "mirgi", "daura pad",
+        "मिर्गी", "दौरा पड़",
+        "வலிப்பு",
+        "మూర్ఛ", "ఫిట్స్",
+    )),
+    ("slurred speech", "neurological", "CRITICAL", (
+        "slurred speech", "slurring", "speech is slurred",
+        "जुबान लड़खड़ा", "ज़ुबान लड़खड़ा", "बोलने में लड़खड़ाहट",
+        "பேச்சு குழறு",
+        "మాట తడబడ",
+    )),
+    ("difficulty speaking", "neurological", "CRITICAL", (
+        "difficulty speaking", "trouble speaking", "cannot speak", "can t speak", "unable to speak",
+        "cannot speak properly", "can t speak properly", "unable to speak properly", "suddenly cannot speak", "suddenly can t speak", "suddenly unable to speak",
+        "theek se bol nahi pa",
+        "ठीक से बोल नहीं पा", "बोलने में दिक्कत",
+        "சரியாக பேச முடியவில்லை",
+        "సరిగా మాట్లాడలేక",
+    )),
+    ("sudden weakness", "neurological", "CRITICAL", (
+        "sudden weakness", "weakness on one side", "one side weakness", "one sided weakness",
+        "face drooping", "facial droop",
+        "अचानक कमजोरी", "अचानक कमज़ोरी", "एक तरफ कमजोरी",
+        "திடீர் பலவீனம்",
+        "అకస్మాత్తుగా బలహీనత",
+    )),
+    ("stroke", "neurological", "CRITICAL", (
+        "stroke",
+        "स्ट्रोक",
+        "பக்கவாதம்",
+        "పక్షవాతం",
+    )),
+    ("paralysis", "neurological", "CRITICAL", (
+        "paralysis", "paralysed", "paralyzed", "cannot move one side", "can t move one side",
+        "lakwa",
+        "लकवा",
+    )),
+    ("vision loss", "neurological", "CRITICAL", (
+        "vision loss", "loss of vision", "lost vision", "sudden blindness",
+        "cannot see anything", "can t see anything", "cannot see out of", "can t see out of",
+        "आंखों से दिखाई नहीं दे", "आँखों से दिखाई नहीं दे", "आंखों की रोशनी चली",
+        "கண் தெரியவில்லை", "பார்வை இழப்பு",
+        "కళ్ళు కనిపించడం లేదు", "చూపు పోయింది",
+    )),
+    # ── HIGH ─────────────────────────────────────────────────────────────────
+    ("breathlessness", "respiratory", "HIGH", (
+        "breathlessness", "breathless", "shortness of breath", "short of breath", "difficulty breathing",
+        "trouble breathing", "saans phool",
+        "सांस फूल", "साँस फूल", "सांस लेने में तकलीफ", "साँस लेने में तकलीफ",
+        "மூச்சுத் திணறல்", "மூச்சு திணறல்",
+        "ఆయాసం", "ఊపిరి ఆడకపోవడం",
+    )),
+    ("persistent vomiting", "general", "HIGH", (
+        "persistent vomiting", "vomiting repeatedly", "keeps vomiting", "continuous vomiting",
+        "vomiting blood", "baar baar ulti",
+        "बार बार उल्टी", "बार-बार उल्टी", "लगातार उल्टी", "खून की उल्टी",
+        "தொடர்ந்து வாந்தி",
+        "వాంతులు ఆగడం లేదు", "పదే పదే వాంతులు",
+    )),
+    ("high fever", "general", "HIGH", (
+        "high fever", "very high fever", "high temperature", "tez bukhar",
+        "तेज बुखार", "तेज़ बुखार",
+        "அதிக காய்ச்சல்", "கடுமையான காய்ச்சல்",
+        "తీవ్ర జ్వరం", "ఎక్కువ జ్వరం",
+    )),
+    ("severe headache", "neurological", "HIGH", (
+        "severe headache", "worst headache", "terrible headache", "tez sir dard",
+        "तेज सिरदर्द", "तेज सिर दर्द", "तेज़ सिरदर्द",
+        "கடுமையான தலைவலி",
+        "తీవ్రమైన తలనొప్పి",
+    )),
+    ("confusion", "neurological", "HIGH", (
+        "confusion", "confused", "disoriented", "disorientated",
+        "भ्रमित",
+        "குழப்பம்",
+        "అయోమయం",
+    )),
+    ("visual disturbances", "neurological", "HIGH", (
+        "visual disturbances", "visual disturbance", "double vision", "seeing double",
+        "दो दो दिख",
+        "இரட்டை பார்வை",
+        "రెండుగా కనిపి",
+    )),
+    ("blurred vision", "neurological", "HIGH", (
+        "blurred vision", "blurry vision", "vision is blurry", "dhundhla",
+        "धुंधला दिख",
+        "மங்கலான பார்வை",
+        "మసకగా కనిపి",
+    )),
+    # ── MODERATE ─────────────────────────────────────────────────────────────
+    ("dizziness", "general", "MODERATE", (
+        "dizziness", "dizzy", "giddiness", "giddy", "vertigo", "chakkar",
+        "चक्कर",
+        "தலைச்சுற்றல்", "தலை சுற்றல்",
+        "తల తిరుగు",
+    )),
+    ("body pain", "general", "MODERATE", (
+        "body pain", "body ache", "badan dard",
+        "बदन दर्द", "शरीर में दर्द",
+        "உடல் வலி",
+        "ఒళ్ళు నొప్పులు",
+    )),
+    ("cough", "respiratory", "MODERATE", (
+        "cough", "khansi",
+        "खांसी", "खाँसी",
+        "இருமல்",
+        "దగ్గు",
+    )),
+    ("fatigue", "general", "MODERATE", (
+        "fatigue", "tiredness", "exhausted", "thakan",
+        "थकान",
+        "சோர்வு",
+        "అలసట",
+    )),
+    ("lightheadedness", "general", "MODERATE", (
+        "lightheadedness", "lightheaded", "light headed",
+    )),
+    ("nausea", "general", "MODERATE", (
+        "nausea", "nauseous", "feel like vomiting", "ji machal",
+        "जी मिचल",
+        "குமட்டல்",
+        "వికారం",
+    )),
+    ("palpitations", "cardiac", "MODERATE", (
+        "palpitations", "heart racing", "heart pounding", "dhadkan tez",
+        "धड़कन तेज",
+        "படபடப்பு",
+        "గుండె దడ",
+    )),
+]
+
+_LANGUAGES = ("english", "hindi", "tamil", "telugu", "the language", "the local language", "your language")
+_CONFUSED_ABOUT = ("about", "by", "with", "regarding", "over", "whether", "if", "which", "how", "what", "when", "where", "why")
+
+# term → words that cancel it when they directly follow it ("can't speak English", "confused about the dose")
+NEGATIVE_CONTEXTS: Dict[str, Tuple[str, ...]] = {
+    "cannot speak": _LANGUAGES + ("to", "with", "on the phone"),
+    "can t speak": _LANGUAGES + ("to", "with", "on the phone"),
+    "unable to speak": _LANGUAGES + ("to", "with", "on the phone"),
+    "confused": _CONFUSED_ABOUT,
+    "confusion": _CONFUSED_ABOUT,
+}
+
+
+def normalize(text: str) -> str:
+    """NFC + casefold; any run of characters that are not letters, combining marks or digits becomes one space."""
+    out = []
+    pending_space = False
+    for ch in unicodedata.normalize("NFC", text).casefold():
+        if unicodedata.category(ch)[0] in ("L", "M", "N"):
+            if pending_space and out:
+                out.append(" ")
+            out.append(ch)
+            pending_space = False
+        else:
+            pending_space = True
+    return "".join(out)
+
+
+class AhoCorasick(Generic[T]):
+    """Multi-pattern automaton: one pass over the text yields every (start, end, payload) occurrence."""
+
+    def __init__(self, patterns: Iterable[Tuple[str, T]]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[Tuple[int, T]]] = [[]]  # (pattern length, payload)
+        for pattern, payload in patterns:
+            self._insert(pattern, payload)
+        self._link()
+
+    def _insert(self, pattern: str, payload: T):
+        state = 0
+        for ch in pattern:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = nxt
+        self._out[state].append((len(pattern), payload))
+
+    def _link(self):
+        # BFS from the root's children (their failure link is the root)
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(ch, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def iter(self, text: str) -> Iterator[Tuple[int, int, T]]:
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for i, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for length, payload in out[state]:
+                yield i - length + 1, i + 1, payload
+
+
+@dataclass(frozen=True)
+class SymptomMatch:
+    symptom: str
+    category: str
+    severity: str
+    term: str   # the lexicon term that matched (normalised)
+    start: int  # offsets into the normalised text
+    end: int
+
+
+@dataclass(frozen=True)
+class SymptomAssessment:
+    symptoms: List[SymptomMatch]  # first occurrence of each symptom, in text order
+    severity: Optional[str]       # highest severity found
+    guardrail_tier: Optional[str] # EMERGENCY / URGENT floor, or None
+    category: Optional[str]       # category of the most severe (then earliest) symptom
+
+
+class SymptomMatcher:
+    def __init__(self, lexicon: List[Tuple[str, str, str, Tuple[str, ...]]] = SYMPTOM_LEXICON):
+        patterns = []
+        for symptom, category, severity, terms in lexicon:
+            for term in terms:
+                term = normalize(term)
+                if term:
+                    patterns.append((term, (symptom, category, severity, term)))
+        self.pattern_count = len(patterns)
+        self._automaton = AhoCorasick(patterns)
+        self._negative = {normalize(term): tuple(" " + normalize(c) for c in contexts)
+                          for term, contexts in NEGATIVE_CONTEXTS.items()}
+
+    def _negated(self, normalized: str, term: str, end: int) -> bool:
+        for context in self._negative.get(term, ()):
+            stop = end + len(context)
+            if normalized.startswith(context, end) and (stop == len(normalized) or normalized[stop] == " "):
+                return True
+        return False
+
+    def find(self, text: str) -> List[SymptomMatch]:
+        """Every occurrence of every lexicon term, word-boundary anchored at the start, minus negative contexts."""
+        normalized = normalize(text)
+        matches = []
+        for start, end, (symptom, category, severity, term) in self._automaton.iter(normalized):
+            if (start == 0 or normalized[start - 1] == " ") and not self._negated(normalized, term, end):
+                matches.append(SymptomMatch(symptom, category, severity, term, start, end))
+        matches.sort(key=lambda m: (m.start, -m.end))
+        return matches
+
+    def assess(self, text: str) -> SymptomAssessment:
+        seen: Dict[str, SymptomMatch] = {}
+        for match in self.find(text):
+            seen.setdefault(match.symptom, match)
+        symptoms = list(seen.values())
+        if not symptoms:
+            return SymptomAssessment([], None, None, None)
+        worst = max(symptoms, key=lambda m: (SEVERITY_RANK[m.severity], -m.start))
+        return SymptomAssessment(symptoms, worst.severity, SEVERITY_TIER.get(worst.severity), worst.category)
+
+
+SYMPTOM_MATCHER = SymptomMatcher()
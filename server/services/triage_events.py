@@ -0,0 +1,438 @@
+"""
+Push channel for triage changes (served as Server-Sent Events by GET /triage/events).
+
+The doctor page polled /triage/queue every 10 s, the EHR page /ehr/records every
+5 s, and the nurse view polled single triages. Now every TriageService write
+publishes an event here, and each open tab holds one SSE stream that only
+receives what matches its filters (specialty, triage ids). When nothing changes,
+no reads happen except a heartbeat comment.
+
+Event types:
+    created · status · preliminary_zone · transcript · soap_ready · soap_updated ·
+    vitals · precautions · seen · finalized · exported · updated
+Each event carries the full record, so clients update in place without a refetch.
+
+Delivery:
+- With a shared store, every process (API workers, triage workers) appends its
+  events to one event log in that store: SQLiteEventLog (SQLITE_DB_PATH) or
+  DynamoDBEventLog (DYNAMODB_TRIAGE_EVENTS_TABLE). Each API process tails the
+  log while it has subscribers (and TRIAGE_EVENT_IDLE_S after the last one
+  leaves), at once after its own appends, and pushes what matches to them.
+  Polls start at TRIAGE_EVENT_POLL_S and back off to TRIAGE_EVENT_POLL_MAX_S
+  while reads come back empty, so an idle process does no reads at all and a
+  quiet one about one per TRIAGE_EVENT_POLL_MAX_S. A pipeline write in a
+  triage worker reaches the doctor's tab within that interval.
+- Event ids are the log's sequence numbers, so they mean the same in every
+  process and survive restarts. On start, and when the first subscriber arrives
+  after an idle spell, an API process loads the last EVENT_HISTORY events, so a
+  reconnecting EventSource (Last-Event-ID) replays what it missed, whichever
+  worker it lands on.
+- Without a log (dev's in-memory store, a single process) events are pushed at
+  once with per-process ids. If an append fails, the events still go to this
+  process's subscribers, without an id.
+- Subscriber queues are bounded. A client too slow to keep up receives a
+  "resync" event and is dropped; it should refetch and reconnect.
+"""
+
+import os
+import json
+import time
+import asyncio
+import logging
+import threading
+from abc import ABC, abstractmethod
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+EVENT_HISTORY = int(os.getenv("TRIAGE_EVENT_HISTORY", "1000"))
+SUBSCRIBER_QUEUE_SIZE = int(os.getenv("TRIAGE_EVENT_QUEUE_SIZE", "256"))
+TRIAGE_EVENT_POLL_S = float(os.getenv("TRIAGE_EVENT_POLL_S", "0.25"))
+TRIAGE_EVENT_POLL_MAX_S = float(os.getenv("TRIAGE_EVENT_POLL_MAX_S", "5"))  # backoff cap while reads come back empty
+TRIAGE_EVENT_IDLE_S = float(os.getenv("TRIAGE_EVENT_IDLE_S", "30"))          # stop tailing this long after the last subscriber
+TRIAGE_EVENT_GAP_S = float(os.getenv("TRIAGE_EVENT_GAP_S", "2"))     # wait this long for a missing id before skipping it
+TRIAGE_EVENT_RETAIN_S = int(os.getenv("TRIAGE_EVENT_RETAIN_S", str(24 * 3600)))
+TRIAGE_EVENT_READ_BATCH = 500
+
+STATUS_EVENTS = {
+    "ready_for_review": "soap_ready",
+    "finalized": "finalized",
+    "exported": "exported",
+}
+
+
+def status_event(status: str) -> str:
+    return STATUS_EVENTS.get(status, "status")
+
+
+def change_event(old, new) -> str:
+    """Best event name for a record seen changed between two listings."""
+    if old is None:
+        return "created" if new.status == "pending" else status_event(new.status)
+    if new.status != old.status:
+        return status_event(new.status)
+    if new.preliminary_zone and new.preliminary_zone != old.preliminary_zone:
+        return "preliminary_zone"
+    if new.transcription != old.transcription:
+        return "transcript"
+    if new.soap_note != old.soap_note:
+        return "soap_updated"
+    return "updated"
+
+
+@dataclass
+class TriageEvent:
+    id: Optional[int]  # None: delivered locally because the shared log was unavailable
+    event: str
+    triage_id: str
+    specialty: str
+    data: Dict[str, Any]
+
+    def to_sse(self) -> str:
+        id_line = f"id: {self.id}\n" if self.id is not None else ""
+        return f"{id_line}event: {self.event}\ndata: {json.dumps(self.data)}\n\n"
+
+
+# ── Shared event logs ────────────────────────────────────────────────────────
+# A payload is {"event", "triage_id", "specialty", "record"}. Ids are dense and
+# increasing; an id can become visible after a higher one (see _tail).
+
+class EventLog(ABC):
+    @abstractmethod
+    async def append(self, payloads: List[Dict[str, Any]]):
+        """Append in order; each payload gets the next id."""
+
+    @abstractmethod
+    async def read_after(self, after_id: int, limit: int) -> List[Tuple[int, Dict[str, Any]]]:
+        """Events with id > after_id, oldest first."""
+
+    @abstractmethod
+    async def latest(self, count: int) -> List[Tuple[int, Dict[str, Any]]]:
+        """The last `count` events, oldest first."""
+
+
+class SQLiteEventLog(EventLog):
+    """Event table in the SQLite triage store; AUTOINCREMENT ids, rows past the retention window are pruned."""
+
+    SCHEMA = (
+        """CREATE TABLE IF NOT EXISTS triage_events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            created_at REAL NOT NULL,
+            data TEXT NOT NULL
+        )""",
+    )
+    PRUNE_EVERY = 200
+
+    def __init__(self, store):
+        self._db = store
+        self._db.ensure_schema(self.SCHEMA)
+        self._appends = 0
+
+    async def append(self, payloads: List[Dict[str, Any]]):
+        now = time.time()
+        rows = [(now, json.dumps(p)) for p in payloads]
+        self._appends += 1
+        prune = self._appends % self.PRUNE_EVERY == 0
+
+        def write(conn):
+            conn.executemany("INSERT INTO triage_events (created_at, data) VALUES (?, ?)", rows)
+            if prune:
+                conn.execute("DELETE FROM triage_events WHERE created_at < ?", (now - TRIAGE_EVENT_RETAIN_S,))
+
+        await self._db.write(write)
+
+    async def read_after(self, after_id: int, limit: int) -> List[Tuple[int, Dict[str, Any]]]:
+        rows = await self._db.fetchall("SELECT id, data FROM triage_events WHERE id > ? ORDER BY id LIMIT ?", (after_id, limit))
+        return [(row[0], json.loads(row[1])) for row in rows]
+
+    async def latest(self, count: int) -> List[Tuple[int, Dict[str, Any]]]:
+        rows = await self._db.fetchall("SELECT id, data FROM triage_events ORDER BY id DESC LIMIT ?", (count,))
+        return [(row[0], json.loads(row[1])) for row in reversed(rows)]
+
+
+class DynamoDBEventLog(EventLog):
+    """
+    One partition ("stream" = "triage") sorted by "seq". Ids come from an atomic
+    counter item, so they are dense across processes; items expire via the
+    table's TTL on expires_at.
+    """
+
+    STREAM = "triage"
+    COUNTER_KEY = {"stream": "counter", "seq": 0}
+
+    def __init__(self, table_name: str):
+        from services.dynamo_async import AsyncTable
+
+        self.table_name = table_name
+        self._table = AsyncTable(table_name)
+
+    async def append(self, payloads: List[Dict[str, Any]]):
+        resp = await self._table.update_item(
+            Key=self.COUNTER_KEY,
+            UpdateExpression="ADD next_seq :n",
+            ExpressionAttributeValues={":n": len(payloads)},
+            ReturnValues="UPDATED_NEW"
+        )
+        first = int(resp["Attributes"]["next_seq"]) - len(payloads) + 1
+        expires_at = int(time.time()) + TRIAGE_EVENT_RETAIN_S
+        await asyncio.gather(*(
+            self._table.put_item(Item={"stream": self.STREAM, "seq": first + i, "data": json.dumps(p), "expires_at": expires_at})
+            for i, p in enumerate(payloads)
+        ))
+
+    async def _query(self, **kwargs) -> List[Tuple[int, Dict[str, Any]]]:
+        resp = await self._table.query(ConsistentRead=True, ExpressionAttributeNames={"#st": "stream", "#seq": "seq"}, **kwargs)
+        return [(int(item["seq"]), json.loads(item["data"])) for item in resp.get("Items", [])]
+
+    async def read_after(self, after_id: int, limit: int) -> List[Tuple[int, Dict[str, Any]]]:
+        return await self._query(
+            KeyConditionExpression="#st = :s AND #seq > :after",
+            ExpressionAttributeValues={":s": self.STREAM, ":after": after_id},
+            Limit=limit
+        )
+
+    async def latest(self, count: int) -> List[Tuple[int, Dict[str, Any]]]:
+        items = await self._query(
+            KeyConditionExpression="#st = :s",
+            ExpressionAttributeValues={":s": self.STREAM},
+            ScanIndexForward=False,
+            Limit=count
+        )
+        return list(reversed(items))
+
+
+@dataclass(eq=False)
+class Subscription:
+    specialty: Optional[str]
+    triage_ids: Optional[Set[str]]
+    loop: asyncio.AbstractEventLoop
+    queue: "asyncio.Queue[Optional[TriageEvent]]" = field(default_factory=lambda: asyncio.Queue(SUBSCRIBER_QUEUE_SIZE))
+    overflowed: bool = False
+
+    def matches(self, event: TriageEvent) -> bool:
+        if self.triage_ids is not None and event.triage_id not in self.triage_ids:
+            return False
+        return self.specialty is None or event.specialty == self.specialty
+
+    def _offer(self, event: TriageEvent):
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+            while not self.queue.empty():  # nothing left in it is worth sending
+                self.queue.get_nowait()
+            self.queue.put_nowait(None)  # → "resync" and close
+
+
+class TriageEventBus:
+    def __init__(self, history: int = EVENT_HISTORY):
+        self._lock = threading.Lock()
+        self._subscribers: Set[Subscription] = set()
+        self._history: Deque[TriageEvent] = deque(maxlen=history)
+        self._next_id = 1
+        self._log: Optional[EventLog] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._outbox: Optional[asyncio.Queue] = None
+        self._poke: Optional[asyncio.Event] = None
+        self._ready: Optional[asyncio.Event] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._demand_at = 0.0
+        self._tasks: List[asyncio.Task] = []
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    @property
+    def shared(self) -> bool:
+        """True once events travel through a shared log (other processes' writes arrive through it)."""
+        return self._log is not None and self._loop is not None
+
+    def attach_log(self, log: EventLog):
+        """Set by the triage service that owns the shared store; takes effect at start()."""
+        self._log = log
+
+    def start(self, tail: bool = True):
+        """
+        Ship this process's events to the shared log from the running loop. API processes
+        also tail the log (tail=True) to serve SSE; triage workers only write.
+        """
+        if self._log is None or self._loop is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._outbox = asyncio.Queue()
+        self._poke = asyncio.Event()
+        self._tasks.append(asyncio.ensure_future(self._ship()))
+        if tail:
+            self._ready = asyncio.Event()
+            self._wake = asyncio.Event()
+            self._demand_at = time.monotonic()
+            self._tasks.append(asyncio.ensure_future(self._tail()))
+        logger.info(json.dumps({"event": "triage_events_started", "log": type(self._log).__name__, "tail": tail}))
+
+    async def stop(self, timeout: float = 5.0):
+        """Ship what is still queued (bounded by `timeout`), then stop the background tasks."""
+        if self._outbox is not None:
+            try:
+                await asyncio.wait_for(self._outbox.join(), timeout)
+            except asyncio.TimeoutError:
+                logger.warning(json.dumps({"event": "triage_events_unshipped", "count": self._outbox.qsize()}))
+        for task in self._tasks:
+            task.cancel()
+
+    async def wait_ready(self, timeout: float = 5.0):
+        """Wake the tail if idle and wait until it has loaded recent history, so Last-Event-ID replay sees it."""
+        if self._ready is not None:
+            self._wake_tail()
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def publish(self, event: str, record) -> None:
+        """Fan a record change out to matching subscribers (via the shared log, if any). Safe to call from any thread."""
+        if record is None:
+            return
+        payload = {"event": event, "triage_id": record.id, "specialty": record.specialty, "record": record.model_dump(mode="json")}
+        if not self.shared:
+            with self._lock:
+                event_id = self._next_id
+                self._next_id += 1
+            self._deliver(event_id, payload)
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self._loop:
+            self._outbox.put_nowait(payload)
+        else:
+            self._loop.call_soon_threadsafe(self._outbox.put_nowait, payload)
+
+    def _wake_tail(self):
+        self._demand_at = time.monotonic()
+        if self._wake is not None:
+            self._wake.set()
+
+    def _deliver(self, event_id: Optional[int], payload: Dict[str, Any], notify: bool = True):
+        item = TriageEvent(
+            id=event_id,
+            event=payload["event"],
+            triage_id=payload["triage_id"],
+            specialty=payload["specialty"],
+            data={"event": payload["event"], "triage_id": payload["triage_id"], "record": payload["record"]}
+        )
+        with self._lock:
+            if event_id is not None:
+                self._history.append(item)
+            subscribers = [s for s in self._subscribers if s.matches(item)] if notify else []
+        for sub in subscribers:
+            try:
+                running = asyncio.get_running_loop()
+            except RuntimeError:
+                running = None
+            if running is sub.loop:
+                sub._offer(item)
+            else:
+                sub.loop.call_soon_threadsafe(sub._offer, item)
+
+    async def _ship(self):
+        while True:
+            payloads = [await self._outbox.get()]
+            while not self._outbox.empty():
+                payloads.append(self._outbox.get_nowait())
+            try:
+                await self._log.append(payloads)
+                self._poke.set()
+            except Exception as e:
+                logger.warning(json.dumps({"event": "triage_event_append_failed", "count": len(payloads), "error": str(e)}))
+                for payload in payloads:
+                    self._deliver(None, payload)
+            finally:
+                for _ in payloads:
+                    self._outbox.task_done()
+
+    async def _tail(self):
+        cursor = 0
+        interval = TRIAGE_EVENT_POLL_S
+        gap_since: Optional[float] = None
+        while True:
+            if not self._ready.is_set():
+                # Startup, or back from idle: (re)load recent history for replay; it is not pushed to anyone
+                try:
+                    for event_id, payload in await self._log.latest(self._history.maxlen or EVENT_HISTORY):
+                        if event_id > cursor:
+                            self._deliver(event_id, payload, notify=False)
+                            cursor = event_id
+                except Exception as e:
+                    logger.warning(json.dumps({"event": "triage_event_history_failed", "error": str(e)}))
+                    await asyncio.sleep(5)
+                    continue
+                self._ready.set()
+                interval, gap_since = TRIAGE_EVENT_POLL_S, None
+
+            try:
+                items = await self._log.read_after(cursor, TRIAGE_EVENT_READ_BATCH)
+            except Exception as e:
+                logger.warning(json.dumps({"event": "triage_event_tail_failed", "error": str(e)}))
+                items = []
+                await asyncio.sleep(5)
+            for event_id, payload in items:
+                if event_id != cursor + 1:
+                    # An id was allocated but is not written yet (or never will be): hold order for a while
+                    now = time.monotonic()
+                    gap_since = gap_since or now
+                    if now - gap_since < TRIAGE_EVENT_GAP_S:
+                        break
+                    logger.warning(json.dumps({"event": "triage_event_gap_skipped", "from": cursor + 1, "to": event_id - 1}))
+                gap_since = None
+                cursor = event_id
+                self._deliver(event_id, payload)
+            if len(items) == TRIAGE_EVENT_READ_BATCH and gap_since is None:
+                continue  # backlog: read on without waiting
+            # Back off while nothing arrives; a gap is re-checked at the fast rate
+            interval = TRIAGE_EVENT_POLL_S if items or gap_since else min(interval * 2, TRIAGE_EVENT_POLL_MAX_S)
+
+            if self._subscribers:
+                self._demand_at = time.monotonic()
+            elif time.monotonic() - self._demand_at > TRIAGE_EVENT_IDLE_S:
+                # Nobody listening: stop reading. History goes stale, so it is reloaded on wake.
+                self._ready.clear()
+                self._wake.clear()
+                await self._wake.wait()
+                continue
+
+            self._poke.clear()
+            try:
+                await asyncio.wait_for(self._poke.wait(), interval)
+                interval = TRIAGE_EVENT_POLL_S  # our own append: read it now and stay fast for a while
+            except asyncio.TimeoutError:
+                pass
+
+    def subscribe(
+        self,
+        specialty: Optional[str] = None,
+        triage_ids: Optional[Set[str]] = None,
+        last_event_id: Optional[int] = None
+    ) -> Subscription:
+        sub = Subscription(specialty=specialty, triage_ids=triage_ids, loop=asyncio.get_running_loop())
+        with self._lock:
+            if last_event_id is not None:
+                for item in self._history:
+                    if item.id > last_event_id and sub.matches(item):
+                        sub._offer(item)
+            self._subscribers.add(sub)
+        self._wake_tail()
+        logger.info(json.dumps({"event": "triage_events_subscribed", "specialty": specialty, "subscribers": len(self._subscribers)}))
+        return sub
+
+    def unsubscribe(self, sub: Subscription):
+        with self._lock:
+            self._subscribers.discard(sub)
+
+
+TRIAGE_EVENTS = TriageEventBus()
@@ -0,0 +1,190 @@
+"""
+Materialized doctor queue, maintained incrementally.
+
+Every doctor dashboard polls GET /triage/queue every 10 s. That used to copy and
+sort all of MOCK_TRIAGES (dev), or run three serial 50-item GSI queries and
+filter by specialty in Python (demo). Now each process keeps one sorted lane per
+specialty, plus one for all specialties:
+
+- Order: effective tier (preliminary_zone while the AI is pending, else
+  triage_tier; highest first), then arrival (newest first), then id.
+- Only active records are queued (pending / in_progress / ready_for_review).
+  Finalize or export removes the entry, except in views built with
+  keep_done_s (dev / SQLite): there finished records stay listed for that long
+  after their last write, because the doctor page shows them alongside the queue.
+- The triage service calls upsert() after every create, status change and
+  record write. Insert/remove is a bisect in a Python list (memmove, no re-sort).
+- A read of the top k is a slice: O(k), with no store round-trip.
+
+Pipeline writes can happen in another process (triage_worker.py, other uvicorn
+workers), so the view is rebuilt from the store at startup and re-synced every
+TRIAGE_QUEUE_RESYNC_S in the background. DynamoDB re-syncs are incremental: only
+records written since the last sync (status-updated-index GSI), merged with
+apply_changes(), so read cost follows the write rate, not the backlog size.
+Stores that are cheap to list in full (SQLite) rebuild with replace_all().
+"""
+
+import os
+import time
+import bisect
+import threading
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+TRIAGE_QUEUE_RESYNC_S = float(os.getenv("TRIAGE_QUEUE_RESYNC_S", "15"))
+TRIAGE_QUEUE_DONE_S = float(os.getenv("TRIAGE_QUEUE_DONE_S", str(12 * 3600)))  # finished triages stay listed (dev / SQLite)
+TRIAGE_QUEUE_SYNC_OVERLAP_S = float(os.getenv("TRIAGE_QUEUE_SYNC_OVERLAP_S", "30"))  # incremental re-sync look-back: clock skew, GSI lag
+
+ACTIVE_STATUSES = ("pending", "in_progress", "ready_for_review")
+DONE_STATUSES = ("finalized", "exported")
+TIER_RANK = {"EMERGENCY": 4, "URGENT": 3, "SEMI_URGENT": 2, "ROUTINE": 1}
+
+_ALL = None  # lane holding every specialty
+
+SortKey = Tuple[int, float, str]
+
+
+def queue_key(record) -> SortKey:
+    tier = record.preliminary_zone or record.triage_tier
+    return (-TIER_RANK.get(tier, 1), -record.created_at.timestamp(), record.id)
+
+
+class MaterializedTriageQueue:
+    def __init__(self, keep_done_s: float = 0):
+        self.keep_done_s = keep_done_s
+        self._lock = threading.Lock()
+        self._records: Dict[str, object] = {}
+        self._entries: Dict[str, Tuple[str, SortKey]] = {}  # id → (specialty, key)
+        self._lanes: Dict[Optional[str], List[SortKey]] = defaultdict(list)
+        self._touched: Dict[str, float] = {}  # id → monotonic time of the last local write
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _listed(self, record, now: float) -> bool:
+        if record.status in ACTIVE_STATUSES:
+            return True
+        return bool(self.keep_done_s) and record.status in DONE_STATUSES and now - record.updated_at.timestamp() < self.keep_done_s
+
+    def _remove_locked(self, triage_id: str):
+        entry = self._entries.pop(triage_id, None)
+        self._records.pop(triage_id, None)
+        if entry is None:
+            return
+        specialty, key = entry
+        for lane_id in (_ALL, specialty):
+            lane = self._lanes[lane_id]
+            i = bisect.bisect_left(lane, key)
+            if i < len(lane) and lane[i] == key:
+                del lane[i]
+
+    def _insert_locked(self, record):
+        key = queue_key(record)
+        self._entries[record.id] = (record.specialty, key)
+        self._records[record.id] = record
+        bisect.insort(self._lanes[_ALL], key)
+        bisect.insort(self._lanes[record.specialty], key)
+
+    def upsert(self, record):
+        """Apply a record's latest state: re-key it, or drop it once it leaves the active statuses."""
+        if record is None:
+            return
+        with self._lock:
+            self._touched[record.id] = time.monotonic()
+            self._remove_locked(record.id)
+            if self._listed(record, time.time()):
+                self._insert_locked(record)
+
+    def remove(self, triage_id: str):
+        with self._lock:
+            self._touched[triage_id] = time.monotonic()
+            self._remove_locked(triage_id)
+
+    def replace_all(self, records: Iterable, listed_at: Optional[float] = None) -> Tuple[List[Tuple[Optional[object], object]], List]:
+        """
+        Rebuild from a full listing (startup / periodic re-sync).
+        `listed_at` (time.monotonic() taken before the listing started): records this
+        process wrote after that moment keep their local state instead of the older listing.
+        Returns (changed: [(previous or None, current)], removed: [previous]) — writes made elsewhere.
+        """
+        now = time.time()
+        listing = {r.id: r for r in records if self._listed(r, now)}
+        with self._lock:
+            if listed_at is not None:
+                for triage_id, touched in self._touched.items():
+                    if touched >= listed_at:
+                        listing.pop(triage_id, None)
+                        if triage_id in self._records:
+                            listing[triage_id] = self._records[triage_id]
+            self._touched = {}
+            changed = [
+                (self._records.get(triage_id), record) for triage_id, record in listing.items()
+                if triage_id not in self._records or self._records[triage_id].updated_at != record.updated_at
+            ]
+            # A finished record ageing out of keep_done_s is not a change made elsewhere
+            removed = [
+                record for triage_id, record in self._records.items()
+                if triage_id not in listing and record.status in ACTIVE_STATUSES
+            ]
+            lanes: Dict[Optional[str], List[SortKey]] = defaultdict(list)
+            entries = {}
+            for record in listing.values():
+                key = queue_key(record)
+                entries[record.id] = (record.specialty, key)
+                lanes[_ALL].append(key)
+                lanes[record.specialty].append(key)
+            for lane in lanes.values():
+                lane.sort()
+            self._records = listing
+            self._entries = entries
+            self._lanes = lanes
+        return changed, removed
+
+    def apply_changes(self, records: Iterable, listed_at: Optional[float] = None) -> Tuple[List[Tuple[Optional[object], object]], List]:
+        """
+        Merge an incremental listing: records written since the last sync, in any status.
+        Records absent from it are left alone; ones already applied (an overlapping
+        listing) are skipped. `listed_at` and the return value are as for replace_all().
+        """
+        now = time.time()
+        changed, removed = [], []
+        with self._lock:
+            for record in records:
+                if listed_at is not None and self._touched.get(record.id, 0.0) >= listed_at:
+                    continue
+                previous = self._records.get(record.id)
+                if previous is not None and previous.updated_at >= record.updated_at:
+                    continue
+                listed = self._listed(record, now)
+                if previous is None and not listed:
+                    continue
+                self._remove_locked(record.id)
+                if listed:
+                    self._insert_locked(record)
+                    changed.append((previous, record))
+                elif previous.status in ACTIVE_STATUSES:
+                    removed.append(previous)
+            if listed_at is not None:
+                self._touched = {triage_id: t for triage_id, t in self._touched.items() if t >= listed_at}
+        return changed, removed
+
+    def top(self, specialty: Optional[str] = None, limit: Optional[int] = None) -> List:
+        """The first `limit` records of a specialty lane (all specialties when None)."""
+        now = time.time()
+        with self._lock:
+            lane = self._lanes.get(specialty, [])
+            if not self.keep_done_s:
+                keys = lane if limit is None else lane[:limit]
+                return [self._records[key[2]] for key in keys]
+            records, expired = [], []
+            for key in lane:
+                record = self._records[key[2]]
+                if not self._listed(record, now):
+                    expired.append(record.id)
+                    continue
+                records.append(record)
+                if limit is not None and len(records) >= limit:
+                    break
+            for triage_id in expired:
+                self._remove_locked(triage_id)
+            return records
@@ -3,12 +3,24 @@ import json
 import logging
 from decimal import Decimal
 from datetime import datetime, timezone
-from typing import List, Optional, Dict
-from pydantic import BaseModel
+from typing import Any, List, Optional, Dict, Set
+from pydantic import BaseModel, PrivateAttr
 import uuid
+import time
+import asyncio
+from services.metrics import DB_WRITE_SECONDS, DB_WRITE_CONFLICTS
+from services.triage_queue import (
+    MaterializedTriageQueue, ACTIVE_STATUSES, DONE_STATUSES, TIER_RANK, TRIAGE_QUEUE_RESYNC_S, TRIAGE_QUEUE_DONE_S,
+    TRIAGE_QUEUE_SYNC_OVERLAP_S
+)
+from services.triage_events import TRIAGE_EVENTS, DynamoDBEventLog, SQLiteEventLog, status_event, change_event
+from services.dynamo_async import AsyncTable, is_conditional_check_failed
+from services.sqlite_store import SQLITE_DB_PATH, get_sqlite_store
+from services.record_cache import RecordCache
 
 logger = logging.getLogger(__name__)
 APP_ENV = os.getenv("APP_ENV", "dev")
+TRIAGE_SAVE_RETRIES = int(os.getenv("TRIAGE_SAVE_RETRIES", "3"))
 
 # ── Models ───────────────────────────────────────────────────────────────────
 
@@ -45,7 +57,8 @@ class TriageRecord(BaseModel):
     risk_score: int = 0
     triage_tier: str = "ROUTINE"
     preliminary_zone: Optional[str] = None  # vitals-only fast estimate before AI completes
-    preliminary_precautions: List[str] = [] # MedGemma-generated first-aid for nurse
+    preliminary_precautions: List[str] = [] # first-aid for nurse — rule table first, then MedGemma
+    precautions_source: str = "rules"       # "rules" or "ai"
     vitals_status: str = "STABLE"           # "STABLE" or "ABNORMAL"
     specialty: str = "General Medicine"
     patient_age: Optional[int] = None
@@ -54,6 +67,41 @@ class TriageRecord(BaseModel):
     idempotency_key: Optional[str] = None  # prevents double-submit duplicates
     created_at: datetime
     updated_at: datetime
+    version: int = 0                       # bumped by every write; guards save_triage_record
+
+    # Dirty tracking: field → value before its first assignment since the record was
+    # loaded or saved. save_triage_record writes only these fields. Assign, don't
+    # mutate in place (record.x = [...], not record.x.append()) — mutations are not seen.
+    _original: Dict[str, Any] = PrivateAttr(default_factory=dict)
+
+    def __setattr__(self, name: str, value: Any):
+        if name in type(self).model_fields and name not in self._original:
+            self._original[name] = getattr(self, name)
+        super().__setattr__(name, value)
+
+    def dirty_fields(self) -> Set[str]:
+        return set(self._original) - {"id", "version", "updated_at"}
+
+    def original_value(self, name: str) -> Any:
+        return self._original.get(name, getattr(self, name))
+
+    def mark_clean(self):
+        self._original.clear()
+
+
+def _rebase(record: TriageRecord, current: TriageRecord, fields: Set[str]) -> Set[str]:
+    """
+    `record` lost a version race against `current`. Fields the other writer also changed
+    keep its value (taken into `record`), so nobody's update is silently overwritten; the
+    rest of ours still apply. Returns the fields left to write.
+    """
+    conflicting = {f for f in fields if getattr(current, f) != record.original_value(f)}
+    for f in conflicting:
+        object.__setattr__(record, f, getattr(current, f))
+    if conflicting:
+        logger.warning(json.dumps({"event": "triage_save_conflict", "triage_id": record.id, "kept_theirs": sorted(conflicting)}))
+    object.__setattr__(record, "version", current.version)
+    return fields - conflicting
 
 
 # ── In-Memory Service (dev mode) ─────────────────────────────────────────────
@@ -61,6 +109,20 @@ class TriageRecord(BaseModel):
 MOCK_TRIAGES: Dict[str, TriageRecord] = {}
 
 class TriageService:
+    shared_store = False  # MOCK_TRIAGES is visible to this process only
+
+    def __init__(self):
+        self.queue = MaterializedTriageQueue(keep_done_s=TRIAGE_QUEUE_DONE_S)
+
+    def _changed(self, event: str, record: Optional[TriageRecord]):
+        """Every write funnels through here: re-rank the materialized queue, then push to SSE subscribers."""
+        if record:
+            # Callers share the stored object, so every write is already "persisted"
+            record.version += 1
+            record.mark_clean()
+        self.queue.upsert(record)
+        TRIAGE_EVENTS.publish(event, record)
+
     async def create_triage_record(
         self,
         patient_id: str,
@@ -85,6 +147,7 @@ class TriageService:
             updated_at=datetime.now(timezone.utc)
         )
         MOCK_TRIAGES[triage_id] = record
+        self._changed("created", record)
         return record
 
     async def get_by_idempotency_key(self, key: str) -> Optional[TriageRecord]:
@@ -102,6 +165,7 @@ class TriageService:
         if record:
             record.status = status
             record.updated_at = datetime.now(timezone.utc)
+            self._changed(status_event(status), record)
         return record
 
     async def mark_as_seen(self, triage_id: str) -> Optional[TriageRecord]:
@@ -109,6 +173,7 @@ class TriageService:
         if record:
             record.is_seen = True
             record.updated_at = datetime.now(timezone.utc)
+            self._changed("seen", record)
         return record
 
     async def add_vitals(self, triage_id: str, vitals: VitalSigns) -> Optional[TriageRecord]:
@@ -116,6 +181,7 @@ class TriageService:
         if record:
             record.vitals = vitals
             record.updated_at = datetime.now(timezone.utc)
+            self._changed("vitals", record)
         return record
 
     async def update_soap_note(self, triage_id: str, soap_note: SOAPNote) -> Optional[TriageRecord]:
@@ -123,20 +189,47 @@ class TriageService:
         if record and record.status != "finalized":
             record.soap_note = soap_note
             record.updated_at = datetime.now(timezone.utc)
+            self._changed("soap_updated", record)
+        return record
+
+    async def update_transcription(self, triage_id: str, transcription: str) -> Optional[TriageRecord]:
+        record = MOCK_TRIAGES.get(triage_id)
+        if record:
+            record.transcription = transcription
+            record.updated_at = datetime.now(timezone.utc)
+            self._changed("transcript", record)
+        return record
+
+    async def update_precautions(self, triage_id: str, precautions: List[str], source: str) -> Optional[TriageRecord]:
+        record = MOCK_TRIAGES.get(triage_id)
+        if record:
+            record.preliminary_precautions = precautions
+            record.precautions_source = source
+            record.updated_at = datetime.now(timezone.utc)
+            self._changed("precautions", record)
         return record
 
     async def save_triage_record(self, record: TriageRecord) -> TriageRecord:
         """Full record save — in dev mode just updates the in-memory dict."""
         record.updated_at = datetime.now(timezone.utc)
         MOCK_TRIAGES[record.id] = record
+        self._changed(status_event(record.status) if record.status != "pending" else "updated", record)
+        return record
+
+    async def update_preliminary_zone(self, triage_id: str, zone: str) -> Optional[TriageRecord]:
+        record = MOCK_TRIAGES.get(triage_id)
+        if record:
+            record.preliminary_zone = zone
+            self._changed("preliminary_zone", record)
         return record
 
-    async def get_triage_queue(self, specialty: Optional[str] = None) -> List[TriageRecord]:
-        records = list(MOCK_TRIAGES.values())
-        if specialty:
-            records = [r for r in records if r.specialty == specialty]
-        # Priority: Highest risk first, then newest first
-        return sorted(records, key=lambda x: (-x.risk_score, x.created_at.timestamp()), reverse=True)
+    async def get_triage_queue(self, specialty: Optional[str] = None, limit: Optional[int] = None) -> List[TriageRecord]:
+        """Active and recently finished records, highest tier then newest first — read from the materialized queue."""
+        return self.queue.top(specialty, limit)
+
+    async def run_queue_sync(self):
+        """Startup rebuild. Everything else in dev mode happens in this process, so no re-sync loop."""
+        self.queue.replace_all(MOCK_TRIAGES.values())
 
 
 # ── DynamoDB Service (demo mode) ─────────────────────────────────────────────
@@ -188,6 +281,32 @@ def _serialize(record: TriageRecord) -> dict:
     return _floats_to_decimal(data)
 
 
+def _versioned_update(record: TriageRecord, fields: Set[str]) -> dict:
+    """update_item kwargs writing only `fields` (None → REMOVE), conditional on record.version."""
+    item = _serialize(record)
+    names = {"#pk": "id", "#ver": "version", "#upd": "updated_at"}
+    values = {":expected": record.version, ":next": record.version + 1, ":u": item["updated_at"]}
+    sets, removes = ["#ver = :next", "#upd = :u"], []
+    for i, field_name in enumerate(sorted(fields)):
+        names[f"#f{i}"] = field_name
+        if field_name in item:
+            values[f":f{i}"] = item[field_name]
+            sets.append(f"#f{i} = :f{i}")
+        else:
+            removes.append(f"#f{i}")
+    expression = "SET " + ", ".join(sets) + (" REMOVE " + ", ".join(removes) if removes else "")
+    # Records written before versioning have no attribute yet; they read back as version 0
+    version_ok = "(#ver = :expected OR attribute_not_exists(#ver))" if record.version == 0 else "#ver = :expected"
+    return {
+        "Key": {"id": record.id},
+        "UpdateExpression": expression,
+        "ConditionExpression": f"attribute_exists(#pk) AND {version_ok}",
+        "ExpressionAttributeNames": names,
+        "ExpressionAttributeValues": values,
+        "ReturnValues": "ALL_NEW"
+    }
+
+
 def _deserialize(item: dict) -> TriageRecord:
     """Convert a DynamoDB item back to a TriageRecord."""
     # Convert Decimal back to float/int before Pydantic validation
@@ -201,14 +320,55 @@ def _deserialize(item: dict) -> TriageRecord:
 
 
 class DynamoDBTriageService:
+    shared_store = True
+
     def __init__(self):
-        import boto3
-        region = os.getenv("AWS_REGION", "ap-south-1")
         self.table_name = os.getenv("DYNAMODB_TRIAGE_TABLE", "vaidyasaarathi-demo-v2-triage")
-        self._ddb = boto3.resource("dynamodb", region_name=region)
-        self._table = self._ddb.Table(self.table_name)
+        self._table = AsyncTable(self.table_name)
+        self.queue = MaterializedTriageQueue()
+        self.cache = RecordCache()
+        events_table = os.getenv("DYNAMODB_TRIAGE_EVENTS_TABLE", "")
+        if events_table:
+            TRIAGE_EVENTS.attach_log(DynamoDBEventLog(events_table))
         print(f"[DEMO] DynamoDBTriageService connected to table: {self.table_name}")
 
+    def _changed(self, event: str, record: Optional[TriageRecord]):
+        """Every write funnels through here: refresh the record cache, re-rank the materialized queue, push to SSE subscribers."""
+        self.cache.put(record)
+        self.queue.upsert(record)
+        TRIAGE_EVENTS.publish(event, record)
+
+    async def _update(
+        self,
+        op: str,
+        triage_id: str,
+        update_expression: str,
+        values: Dict,
+        names: Optional[Dict[str, str]] = None,
+        condition: Optional[str] = None
+    ) -> Optional[TriageRecord]:
+        """
+        Partial update of an existing record. ReturnValues=ALL_NEW hands back the whole
+        item, so no follow-up get_item. None when the record is missing or `condition` fails.
+        """
+        kwargs = {
+            "Key": {"id": triage_id},
+            "UpdateExpression": f"{update_expression}, #ver = if_not_exists(#ver, :zero) + :one",
+            "ConditionExpression": f"attribute_exists(#pk) AND ({condition})" if condition else "attribute_exists(#pk)",
+            "ExpressionAttributeNames": {"#pk": "id", "#ver": "version", **(names or {})},
+            "ExpressionAttributeValues": {**values, ":zero": 0, ":one": 1},
+            "ReturnValues": "ALL_NEW"
+        }
+        try:
+            with DB_WRITE_SECONDS.time(op=op):
+                resp = await self._table.update_item(**kwargs)
+        except Exception as e:
+            if is_conditional_check_failed(e):
+                return None
+            self.cache.invalidate(triage_id)  # outcome unknown
+            raise
+        return _deserialize(resp["Attributes"])
+
     async def create_triage_record(
         self,
         patient_id: str,
@@ -232,14 +392,16 @@ class DynamoDBTriageService:
             created_at=datetime.now(timezone.utc),
             updated_at=datetime.now(timezone.utc)
         )
-        self._table.put_item(Item=_serialize(record))
+        with DB_WRITE_SECONDS.time(op="create"):
+            await self._table.put_item(Item=_serialize(record))
         logger.info(json.dumps({"event": "triage_created", "triage_id": triage_id, "patient_id": patient_id}))
+        self._changed("created", record)
         return record
 
     async def get_by_idempotency_key(self, key: str) -> Optional[TriageRecord]:
         """Query idempotency_key via GSI to prevent duplicate submissions."""
         try:
-            resp = self._table.query(
+            resp = await self._table.query(
                 IndexName="idempotency-key-index",
                 KeyConditionExpression="idempotency_key = :k",
                 ExpressionAttributeValues={":k": key},
@@ -251,35 +413,75 @@ class DynamoDBTriageService:
             return None  # GSI may not exist in dev; safe fallback
 
     async def get_triage(self, triage_id: str) -> Optional[TriageRecord]:
-        response = self._table.get_item(Key={"id": triage_id})
+        """Read-through: served from the record cache while fresh (services/record_cache.py)."""
+        record = self.cache.get(triage_id)
+        if record is not None:
+            return record
+        response = await self._table.get_item(Key={"id": triage_id})
         item = response.get("Item")
-        return _deserialize(item) if item else None
+        record = _deserialize(item) if item else None
+        self.cache.put(record)
+        return record
 
     async def save_triage_record(self, record: TriageRecord) -> TriageRecord:
-        """Full record overwrite — use after pipeline completes to persist all fields."""
+        """
+        Persist the fields changed on `record` since it was read — one UpdateExpression,
+        conditional on the version it was read at. A concurrent write (mark_as_seen, a
+        doctor's SOAP edit) bumps the version; the save is then rebased onto a fresh read
+        and retried, so neither side's fields are lost.
+        """
+        fields = record.dirty_fields()
+        if not fields:
+            return record
         record.updated_at = datetime.now(timezone.utc)
-        self._table.put_item(Item=_serialize(record))
-        logger.info(json.dumps({"event": "triage_saved", "triage_id": record.id, "status": record.status}))
-        return record
+        for attempt in range(TRIAGE_SAVE_RETRIES + 1):
+            try:
+                with DB_WRITE_SECONDS.time(op="save"):
+                    resp = await self._table.update_item(**_versioned_update(record, fields))
+                break
+            except Exception as e:
+                self.cache.invalidate(record.id)  # outcome unknown, or the cached copy lost the race
+                if not is_conditional_check_failed(e) or attempt == TRIAGE_SAVE_RETRIES:
+                    raise
+                current = await self.get_triage(record.id)
+                if current is None:
+                    # Record is gone (or predates the table): write it whole, as before
+                    with DB_WRITE_SECONDS.time(op="save"):
+                        await self._table.put_item(Item=_serialize(record))
+                    resp = {"Attributes": _serialize(record)}
+                    break
+                DB_WRITE_CONFLICTS.inc(store="dynamodb")
+                fields = _rebase(record, current, fields)
+                if not fields:
+                    resp = {"Attributes": _serialize(current)}
+                    break
+        saved = _deserialize(resp["Attributes"])
+        object.__setattr__(record, "version", saved.version)
+        record.mark_clean()
+        logger.info(json.dumps({"event": "triage_saved", "triage_id": record.id, "status": saved.status, "fields": sorted(fields)}))
+        self._changed(status_event(saved.status) if saved.status != "pending" else "updated", saved)
+        return saved
 
     async def mark_as_seen(self, triage_id: str) -> Optional[TriageRecord]:
         now = datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z')
-        self._table.update_item(
-            Key={"id": triage_id},
-            UpdateExpression="SET is_seen = :s, updated_at = :u",
-            ExpressionAttributeValues={":s": True, ":u": now}
+        record = await self._update(
+            "mark_seen", triage_id,
+            "SET is_seen = :s, updated_at = :u",
+            {":s": True, ":u": now}
         )
-        return await self.get_triage(triage_id)
+        self._changed("seen", record)
+        return record
 
     async def update_triage_status(self, triage_id: str, status: str) -> Optional[TriageRecord]:
         now = datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z')
-        self._table.update_item(
-            Key={"id": triage_id},
-            UpdateExpression="SET #s = :s, updated_at = :u",
-            ExpressionAttributeNames={"#s": "status"},
-            ExpressionAttributeValues={":s": status, ":u": now}
+        record = await self._update(
+            "status", triage_id,
+            "SET #s = :s, updated_at = :u",
+            {":s": status, ":u": now},
+            names={"#s": "status"}
         )
-        return await self.get_triage(triage_id)
+        self._changed(status_event(status), record)
+        return record
 
     async def add_vitals(self, triage_id: str, vitals: VitalSigns) -> Optional[TriageRecord]:
         vitals_data = vitals.model_dump()
@@ -287,66 +489,398 @@ class DynamoDBTriageService:
             rv = vitals_data["recorded_at"]
             vitals_data["recorded_at"] = rv.isoformat().replace('+00:00', 'Z') if rv.tzinfo else rv.isoformat() + 'Z'
         now = datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z')
-        self._table.update_item(
-            Key={"id": triage_id},
-            UpdateExpression="SET vitals = :v, updated_at = :u",
-            ExpressionAttributeValues={":v": vitals_data, ":u": now}
+        record = await self._update(
+            "vitals", triage_id,
+            "SET vitals = :v, updated_at = :u",
+            {":v": vitals_data, ":u": now}
         )
-        return await self.get_triage(triage_id)
+        self._changed("vitals", record)
+        return record
 
     async def update_soap_note(self, triage_id: str, soap_note: SOAPNote) -> Optional[TriageRecord]:
         now = datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z')
-        self._table.update_item(
-            Key={"id": triage_id},
-            UpdateExpression="SET soap_note = :n, updated_at = :u",
-            ConditionExpression="attribute_not_exists(#s) OR #s <> :finalized",
-            ExpressionAttributeNames={"#s": "status"},
-            ExpressionAttributeValues={
-                ":n": soap_note.model_dump(),
-                ":u": now,
-                ":finalized": "finalized"
-            }
+        record = await self._update(
+            "soap", triage_id,
+            "SET soap_note = :n, updated_at = :u",
+            {":n": soap_note.model_dump(), ":u": now, ":finalized": "finalized"},
+            names={"#s": "status"},
+            condition="attribute_not_exists(#s) OR #s <> :finalized"
+        )
+        self._changed("soap_updated", record)
+        return record
+
+    async def update_transcription(self, triage_id: str, transcription: str) -> Optional[TriageRecord]:
+        """Partial write of the live transcript while audio is still streaming in."""
+        now = datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z')
+        record = await self._update(
+            "transcription", triage_id,
+            "SET transcription = :t, updated_at = :u",
+            {":t": transcription, ":u": now}
         )
-        return await self.get_triage(triage_id)
+        self._changed("transcript", record)
+        return record
 
-    async def get_triage_queue(self, specialty: Optional[str] = None) -> List[TriageRecord]:
+    async def update_precautions(self, triage_id: str, precautions: List[str], source: str) -> Optional[TriageRecord]:
+        """Partial write so background precaution refinement never clobbers pipeline fields."""
+        now = datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z')
+        record = await self._update(
+            "precautions", triage_id,
+            "SET preliminary_precautions = :p, precautions_source = :s, updated_at = :u",
+            {":p": precautions, ":s": source, ":u": now}
+        )
+        self._changed("precautions", record)
+        return record
+
+    async def update_preliminary_zone(self, triage_id: str, zone: str) -> Optional[TriageRecord]:
+        """Write the vitals-only zone without touching status (shown while MedGemma is still running)."""
+        now = datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z')
+        record = await self._update(
+            "preliminary_zone", triage_id,
+            "SET preliminary_zone = :z, updated_at = :u",
+            {":z": zone, ":u": now}
+        )
+        self._changed("preliminary_zone", record)
+        return record
+
+    async def get_triage_queue(self, specialty: Optional[str] = None, limit: Optional[int] = None) -> List[TriageRecord]:
+        """Active records, highest tier then newest first — read from the materialized queue, no DynamoDB call."""
+        return self.queue.top(specialty, limit)
+
+    async def _query_status(self, status_val: str) -> List[TriageRecord]:
+        from boto3.dynamodb.conditions import Key
+        kwargs = {
+            "IndexName": "status-created-index",
+            "KeyConditionExpression": Key("status").eq(status_val),
+            "ScanIndexForward": False,  # newest first
+        }
+        records = []
+        while True:
+            resp = await self._table.query(**kwargs)
+            records.extend(_deserialize(item) for item in resp.get("Items", []))
+            if "LastEvaluatedKey" not in resp:
+                return records
+            kwargs["ExclusiveStartKey"] = resp["LastEvaluatedKey"]
+
+    async def _list_active(self) -> List[TriageRecord]:
         """
-        Query the triage queue using the status-created-index GSI.
-        Fetches records with status in [pending, in_progress, ready_for_review].
-        Falls back to scan() if GSI is not available (first-deploy scenario).
+        Every active record via the status-created-index GSI (paginated), one query per
+        status, all in flight at once. Falls back to scan() if GSI is not available
+        (first-deploy scenario).
         """
-        active_statuses = ["pending", "in_progress", "ready_for_review"]
-        records = []
-
         try:
-            from boto3.dynamodb.conditions import Key
-            for status_val in active_statuses:
-                resp = self._table.query(
-                    IndexName="status-created-index",
-                    KeyConditionExpression=Key("status").eq(status_val),
-                    ScanIndexForward=False,  # newest first
-                    Limit=50
-                )
-                records.extend([_deserialize(item) for item in resp.get("Items", [])])
+            per_status = await asyncio.gather(*(self._query_status(s) for s in ACTIVE_STATUSES))
+            return [record for records in per_status for record in records]
         except Exception as e:
             logger.warning(json.dumps({"event": "gsi_query_failed_fallback_to_scan", "error": str(e)}))
-            response = self._table.scan()
-            records = [_deserialize(item) for item in response.get("Items", [])]
+            response = await self._table.scan()
+            return [_deserialize(item) for item in response.get("Items", [])]
 
-        if specialty:
-            records = [r for r in records if r.specialty == specialty]
+    async def _list_changed(self, since: float) -> Optional[List[TriageRecord]]:
+        """
+        Records written after `since` (epoch seconds), in every status a record can move to,
+        via the status-updated-index GSI. None when the GSI is not available (first deploy):
+        the caller falls back to a full rebuild.
+        """
+        from boto3.dynamodb.conditions import Key
+        since_iso = datetime.fromtimestamp(since, timezone.utc).isoformat().replace("+00:00", "Z")
 
-        # Priority: Highest risk first, then newest first
-        return sorted(records, key=lambda x: (-x.risk_score, x.created_at.timestamp()), reverse=True)
+        async def query(status_val: str) -> List[TriageRecord]:
+            kwargs = {
+                "IndexName": "status-updated-index",
+                "KeyConditionExpression": Key("status").eq(status_val) & Key("updated_at").gt(since_iso),
+            }
+            records = []
+            while True:
+                resp = await self._table.query(**kwargs)
+                records.extend(_deserialize(item) for item in resp.get("Items", []))
+                if "LastEvaluatedKey" not in resp:
+                    return records
+                kwargs["ExclusiveStartKey"] = resp["LastEvaluatedKey"]
+
+        try:
+            per_status = await asyncio.gather(*(query(s) for s in _SYNC_STATUSES))
+        except Exception as e:
+            logger.warning(json.dumps({"event": "gsi_query_failed_fallback_to_full_sync", "error": str(e)}))
+            return None
+        return [record for records in per_status for record in records]
+
+    async def run_queue_sync(self, interval_s: float = TRIAGE_QUEUE_RESYNC_S):
+        """Rebuild the materialized queue from the GSI now, then apply changed records every `interval_s`."""
+        await _run_queue_sync(self, interval_s)
+
+
+# Statuses an active record can move to (an incremental sync must see it leave)
+_SYNC_STATUSES = ACTIVE_STATUSES + DONE_STATUSES + ("failed",)
+
+
+async def _run_queue_sync(service, interval_s: float):
+    """
+    Rebuild the materialized queue from the store now, then every `interval_s`.
+    Picks up writes made by other processes (triage workers, other uvicorn workers).
+    Services with `_list_changed` (DynamoDB) rebuild only at startup and afterwards
+    merge the records written since the previous sync.
+    """
+    initial = True
+    synced_at = 0.0
+    while True:
+        listed_at = time.monotonic()
+        started_at = time.time()
+        try:
+            records = None
+            if not initial and hasattr(service, "_list_changed"):
+                records = await service._list_changed(synced_at - TRIAGE_QUEUE_SYNC_OVERLAP_S)
+            if records is not None:
+                changed, removed = service.queue.apply_changes(records, listed_at=listed_at)
+            else:
+                records = await service._list_active()
+                changed, removed = service.queue.replace_all(records, listed_at=listed_at)
+            synced_at = started_at
+            cache = getattr(service, "cache", None)  # DynamoDB service only
+            if cache is not None:
+                for previous, record in changed:
+                    cache.put(record)
+                for previous in removed:
+                    cache.invalidate(previous.id)  # left the active set elsewhere; re-read below
+            if not initial and not TRIAGE_EVENTS.shared:
+                # No shared event log: writes made by other processes reach SSE subscribers here
+                for previous, record in changed:
+                    TRIAGE_EVENTS.publish(change_event(previous, record), record)
+                for record in await asyncio.gather(*(service.get_triage(previous.id) for previous in removed)):
+                    if record:
+                        TRIAGE_EVENTS.publish(status_event(record.status), record)
+            initial = False
+            logger.info(json.dumps({
+                "event": "triage_queue_synced",
+                "active": len(service.queue),
+                "changed": len(changed),
+                "removed": len(removed)
+            }))
+        except Exception as e:
+            logger.warning(json.dumps({"event": "triage_queue_sync_failed", "error": str(e)}))
+        if interval_s <= 0:
+            return
+        await asyncio.sleep(interval_s)
+
+
+# ── SQLite Service (single-node, SQLITE_DB_PATH) ─────────────────────────────
+
+# Indexed columns are copies of record fields; the record itself is the JSON in `data`.
+TRIAGE_SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS triages (
+        id TEXT PRIMARY KEY,
+        patient_id TEXT NOT NULL,
+        idempotency_key TEXT,
+        status TEXT NOT NULL,
+        specialty TEXT NOT NULL,
+        tier_rank INTEGER NOT NULL,
+        created_at TEXT NOT NULL,
+        updated_at TEXT NOT NULL,
+        data TEXT NOT NULL
+    )""",
+    "CREATE INDEX IF NOT EXISTS triages_idempotency_key ON triages (idempotency_key) WHERE idempotency_key IS NOT NULL",
+    "CREATE INDEX IF NOT EXISTS triages_patient ON triages (patient_id, created_at)",
+    "CREATE INDEX IF NOT EXISTS triages_status ON triages (status, created_at)",
+    "CREATE INDEX IF NOT EXISTS triages_specialty_tier ON triages (specialty, tier_rank, created_at)",
+)
+
+_SQL_UPSERT = (
+    "INSERT OR REPLACE INTO triages "
+    "(id, patient_id, idempotency_key, status, specialty, tier_rank, created_at, updated_at, data) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+_SQL_BY_ID = "SELECT data FROM triages WHERE id = ?"
+_SQL_BY_IDEMPOTENCY_KEY = "SELECT data FROM triages WHERE idempotency_key = ? LIMIT 1"
+_SQL_ACTIVE = f"SELECT data FROM triages WHERE status IN ({', '.join('?' * len(ACTIVE_STATUSES))})"
+_SQL_RECENTLY_DONE = f"SELECT data FROM triages WHERE status IN ({', '.join('?' * len(DONE_STATUSES))}) AND updated_at >= ?"
+
+
+def _row(record: TriageRecord) -> tuple:
+    return (
+        record.id,
+        record.patient_id,
+        record.idempotency_key,
+        record.status,
+        record.specialty,
+        TIER_RANK.get(record.preliminary_zone or record.triage_tier, 1),
+        record.created_at.isoformat(),
+        record.updated_at.isoformat(),
+        record.model_dump_json()
+    )
+
+
+class SQLiteTriageService:
+    shared_store = True
+
+    def __init__(self):
+        self._db = get_sqlite_store(SQLITE_DB_PATH, TRIAGE_SCHEMA)
+        self.queue = MaterializedTriageQueue(keep_done_s=TRIAGE_QUEUE_DONE_S)
+        TRIAGE_EVENTS.attach_log(SQLiteEventLog(self._db))
+        print(f"[DB] SQLiteTriageService using {SQLITE_DB_PATH}")
+
+    def _changed(self, event: str, record: Optional[TriageRecord]):
+        """Every write funnels through here: re-rank the materialized queue, then push to SSE subscribers."""
+        self.queue.upsert(record)
+        TRIAGE_EVENTS.publish(event, record)
+
+    async def _patch(self, op: str, triage_id: str, changes: Dict, unless_status: Optional[str] = None) -> Optional[TriageRecord]:
+        """Read-modify-write inside the writer's transaction. None when missing or in `unless_status`."""
+        def apply(conn) -> Optional[TriageRecord]:
+            row = conn.execute(_SQL_BY_ID, (triage_id,)).fetchone()
+            if row is None:
+                return None
+            record = TriageRecord.model_validate_json(row[0])
+            if unless_status and record.status == unless_status:
+                return None
+            for field_name, value in changes.items():
+                setattr(record, field_name, value)
+            record.updated_at = datetime.now(timezone.utc)
+            record.version += 1
+            record.mark_clean()
+            conn.execute(_SQL_UPSERT, _row(record))
+            return record
+
+        with DB_WRITE_SECONDS.time(op=op):
+            return await self._db.write(apply)
+
+    async def create_triage_record(
+        self,
+        patient_id: str,
+        audio_file_path: str,
+        language: str,
+        vitals: Optional[VitalSigns] = None,
+        idempotency_key: Optional[str] = None,
+        patient_age: Optional[int] = None
+    ) -> TriageRecord:
+        triage_id = str(uuid.uuid4())
+        record = TriageRecord(
+            id=triage_id,
+            patient_id=patient_id,
+            audio_file_url=audio_file_path,
+            language=language,
+            vitals=vitals,
+            patient_age=patient_age,
+            idempotency_key=idempotency_key,
+            status="pending",
+            is_seen=False,
+            created_at=datetime.now(timezone.utc),
+            updated_at=datetime.now(timezone.utc)
+        )
+        row = _row(record)
+        with DB_WRITE_SECONDS.time(op="create"):
+            await self._db.write(lambda conn: conn.execute(_SQL_UPSERT, row))
+        logger.info(json.dumps({"event": "triage_created", "triage_id": triage_id, "patient_id": patient_id}))
+        self._changed("created", record)
+        return record
+
+    async def get_by_idempotency_key(self, key: str) -> Optional[TriageRecord]:
+        row = await self._db.fetchone(_SQL_BY_IDEMPOTENCY_KEY, (key,))
+        return TriageRecord.model_validate_json(row[0]) if row else None
+
+    async def get_triage(self, triage_id: str) -> Optional[TriageRecord]:
+        row = await self._db.fetchone(_SQL_BY_ID, (triage_id,))
+        return TriageRecord.model_validate_json(row[0]) if row else None
+
+    async def save_triage_record(self, record: TriageRecord) -> TriageRecord:
+        """
+        Persist the fields changed on `record` since it was read. The version check and
+        rebase (see _rebase) run inside the writer's transaction, so no retry loop is needed.
+        """
+        fields = record.dirty_fields()
+        if not fields:
+            return record
+        changes = {f: getattr(record, f) for f in fields}
+        originals = {f: record.original_value(f) for f in fields}
+
+        def apply(conn) -> TriageRecord:
+            row = conn.execute(_SQL_BY_ID, (record.id,)).fetchone()
+            current = TriageRecord.model_validate_json(row[0]) if row else record.model_copy()
+            for field_name, value in changes.items():
+                if current.version != record.version and getattr(current, field_name) != originals[field_name]:
+                    continue  # changed by the other writer too — theirs stays
+                setattr(current, field_name, value)
+            current.updated_at = datetime.now(timezone.utc)
+            current.version += 1
+            current.mark_clean()
+            conn.execute(_SQL_UPSERT, _row(current))
+            return current
+
+        with DB_WRITE_SECONDS.time(op="save"):
+            saved = await self._db.write(apply)
+        if saved.version != record.version + 1:
+            DB_WRITE_CONFLICTS.inc(store="sqlite")
+        for field_name in fields:
+            object.__setattr__(record, field_name, getattr(saved, field_name))
+        object.__setattr__(record, "version", saved.version)
+        record.mark_clean()
+        logger.info(json.dumps({"event": "triage_saved", "triage_id": record.id, "status": saved.status, "fields": sorted(fields)}))
+        self._changed(status_event(saved.status) if saved.status != "pending" else "updated", saved)
+        return saved
+
+    async def mark_as_seen(self, triage_id: str) -> Optional[TriageRecord]:
+        record = await self._patch("mark_seen", triage_id, {"is_seen": True})
+        self._changed("seen", record)
+        return record
+
+    async def update_triage_status(self, triage_id: str, status: str) -> Optional[TriageRecord]:
+        record = await self._patch("status", triage_id, {"status": status})
+        self._changed(status_event(status), record)
+        return record
+
+    async def add_vitals(self, triage_id: str, vitals: VitalSigns) -> Optional[TriageRecord]:
+        record = await self._patch("vitals", triage_id, {"vitals": vitals})
+        self._changed("vitals", record)
+        return record
+
+    async def update_soap_note(self, triage_id: str, soap_note: SOAPNote) -> Optional[TriageRecord]:
+        record = await self._patch("soap", triage_id, {"soap_note": soap_note}, unless_status="finalized")
+        self._changed("soap_updated", record)
+        return record
+
+    async def update_transcription(self, triage_id: str, transcription: str) -> Optional[TriageRecord]:
+        record = await self._patch("transcription", triage_id, {"transcription": transcription})
+        self._changed("transcript", record)
+        return record
+
+    async def update_precautions(self, triage_id: str, precautions: List[str], source: str) -> Optional[TriageRecord]:
+        record = await self._patch("precautions", triage_id, {"preliminary_precautions": precautions, "precautions_source": source})
+        self._changed("precautions", record)
+        return record
+
+    async def update_preliminary_zone(self, triage_id: str, zone: str) -> Optional[TriageRecord]:
+        record = await self._patch("preliminary_zone", triage_id, {"preliminary_zone": zone})
+        self._changed("preliminary_zone", record)
+        return record
+
+    async def get_triage_queue(self, specialty: Optional[str] = None, limit: Optional[int] = None) -> List[TriageRecord]:
+        """Active and recently finished records, highest tier then newest first — read from the materialized queue."""
+        return self.queue.top(specialty, limit)
+
+    async def _list_active(self) -> List[TriageRecord]:
+        """Active records plus those finished within the queue's keep_done_s window."""
+        cutoff = datetime.fromtimestamp(time.time() - self.queue.keep_done_s, timezone.utc).isoformat()
+        active, done = await asyncio.gather(
+            self._db.fetchall(_SQL_ACTIVE, ACTIVE_STATUSES),
+            self._db.fetchall(_SQL_RECENTLY_DONE, (*DONE_STATUSES, cutoff))
+        )
+        return [TriageRecord.model_validate_json(row[0]) for row in active + done]
+
+    async def run_queue_sync(self, interval_s: float = TRIAGE_QUEUE_RESYNC_S):
+        """Other processes share the database file, so re-sync like the DynamoDB service."""
+        await _run_queue_sync(self, interval_s)
 
 
 # ── Factory ──────────────────────────────────────────────────────────────────
 
 def get_triage_service() -> TriageService:
-    """Return the appropriate TriageService based on APP_ENV."""
+    """Return the appropriate TriageService based on APP_ENV (SQLite when SQLITE_DB_PATH is set)."""
     if APP_ENV == "demo":
         try:
             return DynamoDBTriageService()
         except Exception as e:
             logger.warning(json.dumps({"event": "dynamodb_unavailable_fallback", "error": str(e)}))
+    if SQLITE_DB_PATH:
+        try:
+            return SQLiteTriageService()
+        except Exception as e:
+            logger.warning(json.dumps({"event": "sqlite_unavailable_fallback", "error": str(e)}))
     return TriageService()
@@ -0,0 +1,95 @@
+"""
+Per-triage write-behind buffer for pipeline state.
+
+One audio triage used to write the record up to five times: an in_progress
+status write (usually redundant after the upload), every live partial
+transcript, the preliminary zone and the final result, with get_triage reads
+in between. The pipeline now keeps one working copy of the record and sends
+its changes through this buffer:
+
+- stage(**fields): non-critical updates (status bookkeeping, live partial
+  transcripts). They are applied to the working copy and written together
+  WRITE_BEHIND_WINDOW_S later; a value equal to the current one costs nothing.
+- flush(**fields): clinically significant transitions (preliminary zone,
+  ready_for_review, failed). Written at once, together with anything staged.
+
+Each write is one save_triage_record, a versioned partial update of the dirty
+fields (see TriageRecord), so concurrent clinician edits are still never
+overwritten. Staged values reach the doctor queue and SSE subscribers at most
+one window late. Clinically significant changes are never delayed.
+"""
+
+import os
+import json
+import asyncio
+import logging
+from typing import Any, Dict, Optional
+from services.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+WRITE_BEHIND_WINDOW_S = float(os.getenv("WRITE_BEHIND_WINDOW_S", "2.0"))
+
+WRITES_COALESCED = REGISTRY.counter("vaidya_db_writes_coalesced_total", "Staged triage updates folded into another write.")
+
+
+class TriageWriteBehind:
+    def __init__(self, service, record, window_s: float = WRITE_BEHIND_WINDOW_S):
+        self.service = service
+        self.record = record
+        self.window_s = window_s
+        self._pending: Dict[str, Any] = {}
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._flush_task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+        self._closed = False
+
+    def stage(self, **fields):
+        """Buffer non-critical changes; they go out with the next flush (at most window_s from now)."""
+        if self._closed:
+            return  # a late partial must not land after the final write
+        for name, value in fields.items():
+            if name in self._pending:
+                WRITES_COALESCED.inc(reason="superseded")
+            self._pending[name] = value
+        if self._pending and self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.window_s, self._window_elapsed)
+
+    def _window_elapsed(self):
+        self._timer = None
+        self._flush_task = asyncio.ensure_future(self._flush_quietly())
+
+    async def _flush_quietly(self):
+        try:
+            await self.flush()
+        except Exception as e:
+            # Staged values stay on the working copy's dirty set and go out with the next flush
+            logger.warning(json.dumps({"event": "write_behind_flush_failed", "triage_id": self.record.id, "error": str(e)}))
+
+    async def flush(self, **fields):
+        """Write everything staged plus `fields` now, as a single update. Returns the saved record."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        async with self._lock:
+            changes, self._pending = {**self._pending, **fields}, {}
+            for name, value in changes.items():
+                if getattr(self.record, name) != value:
+                    setattr(self.record, name, value)
+            if not self.record.dirty_fields():
+                if changes:
+                    WRITES_COALESCED.inc(len(changes), reason="unchanged")
+                return self.record
+            if len(changes) > 1:
+                WRITES_COALESCED.inc(len(changes) - 1, reason="batched")
+            return await self.service.save_triage_record(self.record)
+
+    async def close(self, **fields):
+        """Final write (staged changes plus `fields`, if any); later stage() calls are dropped."""
+        self._closed = True
+        if self._pending or fields or self.record.dirty_fields():
+            return await self.flush(**fields)
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        return self.record
@@ -1,5 +1,6 @@
 import os
 import time
+import asyncio
 import json
 import logging
 import sys
@@ -59,7 +60,7 @@ def test_latency():
     mock_age = 45
     
     start_p2 = time.time()
-    soap_result = processor.generate_soap_note(transcript, anomalies, mock_vitals, mock_age)
+    soap_result = asyncio.run(processor.generate_soap_note(transcript, anomalies, mock_vitals, mock_age))
     p2_time = time.time() - start_p2
     print(f"✅ Phase 2 complete in {p2_time:.2f}s")
 
@@ -0,0 +1,54 @@
+"""
+Regression checks for the guardrail lexicon (services/symptom_matcher.py).
+
+    cd server && python -m pytest test_symptom_matcher.py
+    cd server && python test_symptom_matcher.py
+"""
+
+from services.symptom_matcher import SYMPTOM_MATCHER
+
+# Everyday phrases that once hit a CRITICAL or HIGH term and forced EMERGENCY / URGENT
+BENIGN = [
+    "Fever not responding to paracetamol",
+    "The fitting of my shoe hurts my heel",
+    "I can't see the doctor today",
+    "I cannot move my leg due to knee pain",
+    "I can't speak English very well",
+    "She cannot speak Tamil, only Telugu",
+    "I couldn't come because I can't speak to my manager about leave",
+    "I am confused about the dosage of my tablets",
+    "He was gasping after climbing the stairs",
+]
+
+# The same symptoms, said plainly, must still escalate
+EMERGENCIES = [
+    ("She is unresponsive since morning", "unconscious"),
+    ("He had a seizure at home", "seizure"),
+    ("I suddenly can't see anything from my left eye", "vision loss"),
+    ("He cannot move one side of his body", "paralysis"),
+    ("Since an hour she can't speak properly", "difficulty speaking"),
+    ("She cannot speak", "difficulty speaking"),
+    ("He can't speak since morning", "difficulty speaking"),
+    ("Patient unable to speak", "difficulty speaking"),
+    ("The child is gasping for breath", "severe breathlessness"),
+    ("सीने में दर्द हो रहा है", "chest pain"),
+]
+
+
+def test_benign_phrases_do_not_escalate():
+    for text in BENIGN:
+        assessment = SYMPTOM_MATCHER.assess(text)
+        assert assessment.guardrail_tier is None, (text, assessment.symptoms)
+
+
+def test_critical_symptoms_escalate():
+    for text, symptom in EMERGENCIES:
+        assessment = SYMPTOM_MATCHER.assess(text)
+        assert assessment.guardrail_tier == "EMERGENCY", (text, assessment.symptoms)
+        assert symptom in [m.symptom for m in assessment.symptoms], (text, assessment.symptoms)
+
+
+if __name__ == "__main__":
+    test_benign_phrases_do_not_escalate()
+    test_critical_symptoms_escalate()
+    print("symptom matcher: ok")
@@ -0,0 +1,84 @@
+"""
+Materialized doctor queue (services/triage_queue.py): ordering, keep_done expiry
+and incremental merges.
+
+    cd server && python -m pytest test_triage_queue.py
+    cd server && python test_triage_queue.py
+"""
+
+from datetime import datetime, timedelta, timezone
+
+from services.triage_queue import MaterializedTriageQueue
+from services.triage_service import TriageRecord
+
+NOW = datetime.now(timezone.utc)
+
+
+def _record(triage_id: str, status: str = "pending", tier: str = "ROUTINE", age_s: float = 0,
+            updated_s: float = 0, zone=None, specialty: str = "General Medicine") -> TriageRecord:
+    return TriageRecord(
+        id=triage_id, patient_id="P-1", audio_file_url="a", language="English", status=status,
+        triage_tier=tier, preliminary_zone=zone, specialty=specialty,
+        created_at=NOW - timedelta(seconds=age_s), updated_at=NOW - timedelta(seconds=updated_s)
+    )
+
+
+def test_orders_by_tier_then_newest():
+    queue = MaterializedTriageQueue()
+    queue.replace_all([
+        _record("old-routine", age_s=30),
+        _record("new-routine", age_s=10),
+        _record("urgent", tier="URGENT", age_s=60),
+        _record("prelim-emergency", zone="EMERGENCY", age_s=90),  # preliminary zone counts while the AI is pending
+        _record("cardio", tier="URGENT", specialty="Cardiology", age_s=5),
+    ])
+    assert [r.id for r in queue.top()] == ["prelim-emergency", "cardio", "urgent", "new-routine", "old-routine"]
+    assert [r.id for r in queue.top("Cardiology")] == ["cardio"]
+    assert [r.id for r in queue.top(limit=2)] == ["prelim-emergency", "cardio"]
+
+    queue.upsert(_record("old-routine", tier="EMERGENCY", age_s=30))
+    assert queue.top()[0].id == "old-routine"
+    queue.upsert(_record("urgent", status="finalized", tier="URGENT", age_s=60))
+    assert "urgent" not in [r.id for r in queue.top()]
+
+
+def test_keep_done_lists_finished_records_until_they_age_out():
+    queue = MaterializedTriageQueue(keep_done_s=3600)
+    queue.replace_all([
+        _record("active"),
+        _record("done-recently", status="finalized", updated_s=60),
+        _record("done-long-ago", status="exported", updated_s=7200),
+    ])
+    assert {r.id for r in queue.top()} == {"active", "done-recently"}
+
+    queue.upsert(_record("done-recently", status="exported", updated_s=60))
+    assert {r.id for r in queue.top()} == {"active", "done-recently"}
+
+    queue.keep_done_s = 30  # the record is now past its window: dropped on read
+    assert [r.id for r in queue.top()] == ["active"]
+    assert len(queue) == 1
+
+
+def test_apply_changes_merges_an_incremental_listing():
+    queue = MaterializedTriageQueue()
+    queue.replace_all([_record("a", updated_s=100), _record("b", updated_s=100)])
+
+    changed, removed = queue.apply_changes([
+        _record("a", status="ready_for_review", tier="URGENT", updated_s=5),
+        _record("b", status="finalized", updated_s=5),
+        _record("c", status="exported", updated_s=5),  # never queued here: nothing to do
+        _record("d", updated_s=5),
+    ])
+    assert [r.id for r in queue.top()] == ["a", "d"]
+    assert [(previous and previous.status, record.id) for previous, record in changed] == [("pending", "a"), (None, "d")]
+    assert [previous.id for previous in removed] == ["b"]
+
+    # The overlap window lists the same writes again
+    assert queue.apply_changes([_record("a", status="ready_for_review", tier="URGENT", updated_s=5)]) == ([], [])
+
+
+if __name__ == "__main__":
+    test_orders_by_tier_then_newest()
+    test_keep_done_lists_finished_records_until_they_age_out()
+    test_apply_changes_merges_an_incremental_listing()
+    print("triage queue: ok")
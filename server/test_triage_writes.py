@@ -0,0 +1,103 @@
+"""
+Versioned triage writes and the SQLite group-commit writer
+(services/triage_service.py, services/sqlite_store.py).
+
+    cd server && python -m pytest test_triage_writes.py
+    cd server && python test_triage_writes.py
+"""
+
+import os
+import asyncio
+import tempfile
+import threading
+from datetime import datetime, timezone
+
+import services.triage_service as triage_service
+from services.sqlite_store import SQLiteStore
+from services.triage_events import TRIAGE_EVENTS
+from services.triage_service import SQLiteTriageService, TriageRecord, _rebase, _versioned_update
+
+
+def _sqlite_service(directory: str) -> SQLiteTriageService:
+    triage_service.SQLITE_DB_PATH = os.path.join(directory, "triage.db")
+    return SQLiteTriageService()
+
+
+def test_concurrent_saves_merge_disjoint_fields_and_keep_theirs():
+    async def run(service: SQLiteTriageService):
+        created = await service.create_triage_record("P-1", "audio.webm", "English")
+        ours, theirs = await service.get_triage(created.id), await service.get_triage(created.id)
+        theirs.transcription = "chest pain since morning"
+        theirs.triage_tier = "EMERGENCY"
+        ours.risk_score = 7
+        ours.triage_tier = "ROUTINE"
+        # Both read the same version; the first save in the batch wins the race
+        await asyncio.gather(service.save_triage_record(theirs), service.save_triage_record(ours))
+        return created, await service.get_triage(created.id), ours
+
+    saved_log, saved_path = TRIAGE_EVENTS._log, triage_service.SQLITE_DB_PATH
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            created, stored, ours = asyncio.run(run(_sqlite_service(directory)))
+    finally:
+        TRIAGE_EVENTS._log, triage_service.SQLITE_DB_PATH = saved_log, saved_path
+
+    assert stored.transcription == "chest pain since morning"
+    assert stored.risk_score == 7
+    assert stored.triage_tier == "EMERGENCY"  # theirs stays on the shared field
+    assert stored.version == created.version + 2
+    assert ours.triage_tier == "EMERGENCY" and ours.version == stored.version
+
+
+def test_rebase_keeps_theirs_on_shared_fields():
+    now = datetime.now(timezone.utc)
+    base = dict(id="T-1", patient_id="P-1", audio_file_url="a", language="English", status="pending",
+                created_at=now, updated_at=now, version=1)
+    ours = TriageRecord(**base)
+    ours.risk_score = 7
+    ours.triage_tier = "ROUTINE"
+    current = TriageRecord(**{**base, "version": 2, "transcription": "cough", "triage_tier": "EMERGENCY"})
+
+    fields = _rebase(ours, current, ours.dirty_fields())
+
+    assert fields == {"risk_score"}
+    assert ours.triage_tier == "EMERGENCY" and ours.version == 2
+    update = _versioned_update(ours, fields)
+    assert update["ExpressionAttributeValues"][":expected"] == 2
+    assert update["ExpressionAttributeValues"][":next"] == 3
+    assert "triage_tier" not in update["ExpressionAttributeNames"].values()
+    assert "risk_score" in update["ExpressionAttributeNames"].values()
+
+
+def test_failing_write_does_not_roll_back_its_batch():
+    def insert(value):
+        return lambda conn: conn.execute("INSERT INTO t (v) VALUES (?)", (value,))
+
+    def fail(conn):
+        conn.execute("INSERT INTO t (v) VALUES ('rolled back')")
+        raise ValueError("boom")
+
+    async def run(store: SQLiteStore):
+        gate = threading.Event()
+        store._writer.submit(gate.wait)  # hold the writer so all three land in one batch
+        writes = asyncio.gather(store.write(insert("a")), store.write(fail), store.write(insert("b")), return_exceptions=True)
+        asyncio.get_running_loop().call_later(0.05, gate.set)
+        results = await writes
+        rows = await store.fetchall("SELECT v FROM t ORDER BY v")
+        store.close()
+        return results, [row[0] for row in rows]
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = SQLiteStore(os.path.join(directory, "batch.db"), ["CREATE TABLE t (v TEXT)"])
+        results, rows = asyncio.run(run(store))
+
+    assert isinstance(results[1], ValueError)
+    assert not isinstance(results[0], Exception) and not isinstance(results[2], Exception)
+    assert rows == ["a", "b"]
+
+
+if __name__ == "__main__":
+    test_concurrent_saves_merge_disjoint_fields_and_keep_theirs()
+    test_rebase_keeps_theirs_on_shared_fields()
+    test_failing_write_does_not_roll_back_its_batch()
+    print("triage writes: ok")
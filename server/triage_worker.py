@@ -0,0 +1,73 @@
+"""
+Standalone triage worker — consumes the durable job queue (services/job_queue.py)
+and runs the AI pipeline and FHIR exports, so inference scales separately
+from the HTTP tier.
+
+    SQS_TRIAGE_QUEUE_URL=https://sqs... python triage_worker.py     # N replicas, one per task
+    python triage_worker.py                                          # local SQLite queue (TRIAGE_JOB_DB)
+
+Run the API with TRIAGE_INLINE_WORKER=0 when dedicated workers are deployed.
+The worker needs the same triage store as the API (DynamoDB in demo mode, or
+SQLITE_DB_PATH); it refuses to start on the in-memory dev store.
+"""
+
+try:
+    from dotenv import load_dotenv
+    load_dotenv()
+except ImportError:
+    pass
+
+import sys
+import json
+import signal
+import asyncio
+import logging
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
+    handlers=[logging.StreamHandler(sys.stdout)]
+)
+
+from api.triage import run_triage_job, warm_up_ai_processor, triage_service
+from services.job_queue import TriageWorker, get_job_queue
+from services.inference_provider import close_inference_provider
+from services.triage_events import TRIAGE_EVENTS
+
+logger = logging.getLogger("triage_worker")
+
+
+async def main():
+    if not triage_service.shared_store:
+        # The API's records are in its own memory; every job would be orphaned here
+        logger.error(json.dumps({"event": "triage_worker_needs_shared_store", "hint": "set APP_ENV=demo or SQLITE_DB_PATH"}))
+        sys.exit(1)
+    # Load models before pulling jobs, so the first job doesn't burn its visibility timeout on the load
+    try:
+        await asyncio.get_running_loop().run_in_executor(None, warm_up_ai_processor)
+    except Exception as e:
+        logger.error(json.dumps({"event": "triage_worker_warmup_failed", "error": str(e)}))
+    TRIAGE_EVENTS.start(tail=False)  # pipeline writes reach the API's SSE streams through the shared log
+    worker = TriageWorker(get_job_queue(), run_triage_job)
+    run_task = asyncio.ensure_future(worker.run())
+
+    def _shutdown():
+        # Stop pulling; jobs still running past the container stop timeout are redelivered
+        logger.info(json.dumps({"event": "triage_worker_stopping"}))
+        run_task.cancel()
+
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, _shutdown)
+
+    try:
+        await run_task
+    except asyncio.CancelledError:
+        pass
+    await worker.stop()
+    await TRIAGE_EVENTS.stop()
+    await close_inference_provider()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())